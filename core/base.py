@@ -6,7 +6,7 @@ Core abstractions for blueprints and mutation engines
 from abc import ABC, abstractmethod
 import random
 import hashlib
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, field
 
 
@@ -63,6 +63,9 @@ class MachineConfig:
     # Metadata
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    # UI theme id (see templates/theme_library.py), chosen from the seed
+    theme: Optional[str] = None
+    
     def to_dict(self) -> Dict:
         return {
             'machine_id': self.machine_id,
@@ -74,7 +77,8 @@ class MachineConfig:
             'constraints': self.constraints,
             'flag': self.flag,
             'behavior': self.behavior,
-            'metadata': self.metadata
+            'metadata': self.metadata,
+            'theme': self.theme
         }
 
 
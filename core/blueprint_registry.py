@@ -0,0 +1,187 @@
+"""
+Blueprint Registry
+Parses each blueprint YAML once and serves lookups by blueprint_id from memory
+"""
+
+import os
+import threading
+import yaml
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+from base import VulnerabilityBlueprint, BlueprintLoader
+
+
+class _BlueprintEntry:
+    """Parsed state of one blueprint file"""
+
+    __slots__ = ('path', 'mtime_ns', 'data', 'blueprint', 'error')
+
+    def __init__(self, path: str, mtime_ns: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.data: Dict[str, Any] = {}
+        self.blueprint: Optional[VulnerabilityBlueprint] = None
+        self.error: Optional[str] = None
+
+
+class BlueprintRegistry:
+    """
+    Blueprint index keyed by blueprint_id
+
+    Files are re-parsed only when their mtime changes, and the directory is
+    re-listed only when its own mtime changes (a file was added or removed),
+    so a lookup costs at most two stat calls.
+    """
+
+    PATTERN = "*_blueprint.yaml"
+
+    def __init__(self, blueprints_dir: str):
+        self.blueprints_dir = Path(blueprints_dir)
+
+        self._entries: Dict[str, _BlueprintEntry] = {}   # path -> entry
+        self._paths_by_id: Dict[str, str] = {}            # blueprint_id -> path
+        self._dir_mtime_ns: Optional[int] = None
+        self._lock = threading.RLock()
+
+        # Number of YAML parses performed (useful to verify caching)
+        self.parse_count = 0
+
+    def blueprints(self) -> Dict[str, VulnerabilityBlueprint]:
+        """All valid blueprints, revalidating every file against its mtime"""
+        with self._lock:
+            self._scan_directory()
+            for path in list(self._entries):
+                self._revalidate(path)
+
+            return {
+                blueprint_id: self._entries[path].blueprint
+                for blueprint_id, path in self._paths_by_id.items()
+                if self._entries[path].blueprint is not None
+            }
+
+    def errors(self) -> Dict[str, str]:
+        """Files that failed to load, keyed by file name"""
+        with self._lock:
+            return {
+                Path(entry.path).name: entry.error
+                for entry in self._entries.values()
+                if entry.error
+            }
+
+    def get(self, blueprint_id: str) -> Optional[VulnerabilityBlueprint]:
+        """Get a valid blueprint by ID"""
+        entry = self._lookup(blueprint_id)
+        return entry.blueprint if entry else None
+
+    def get_category(self, blueprint_id: str) -> Optional[str]:
+        """Get the category declared by a blueprint file"""
+        entry = self._lookup(blueprint_id)
+        return entry.data.get('category') if entry else None
+
+    def invalidate(self):
+        """Forget everything; the next lookup re-reads the directory"""
+        with self._lock:
+            self._entries.clear()
+            self._paths_by_id.clear()
+            self._dir_mtime_ns = None
+
+    def _lookup(self, blueprint_id: str) -> Optional[_BlueprintEntry]:
+        with self._lock:
+            path = self._paths_by_id.get(blueprint_id)
+            if path is not None:
+                self._revalidate(path)
+                path = self._paths_by_id.get(blueprint_id)
+
+            if path is None:
+                self._scan_directory()
+                path = self._paths_by_id.get(blueprint_id)
+
+            return self._entries.get(path) if path else None
+
+    def _scan_directory(self):
+        try:
+            dir_mtime_ns = os.stat(self.blueprints_dir).st_mtime_ns
+        except FileNotFoundError:
+            self._entries.clear()
+            self._paths_by_id.clear()
+            self._dir_mtime_ns = None
+            return
+
+        if dir_mtime_ns == self._dir_mtime_ns:
+            return
+
+        current = {str(p) for p in self.blueprints_dir.glob(self.PATTERN)}
+
+        for path in set(self._entries) - current:
+            self._drop(path)
+
+        for path in current:
+            self._revalidate(path)
+
+        self._dir_mtime_ns = dir_mtime_ns
+
+    def _revalidate(self, path: str):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._drop(path)
+            return
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == mtime_ns:
+            return
+
+        self._drop(path)
+        self._entries[path] = self._parse(path, mtime_ns)
+
+        blueprint_id = self._entries[path].data.get('blueprint_id')
+        if blueprint_id:
+            self._paths_by_id[blueprint_id] = path
+
+    def _parse(self, path: str, mtime_ns: int) -> _BlueprintEntry:
+        entry = _BlueprintEntry(path, mtime_ns)
+        self.parse_count += 1
+
+        try:
+            with open(path, 'r') as f:
+                entry.data = yaml.safe_load(f) or {}
+
+            blueprint = BlueprintLoader.load_from_dict(entry.data)
+            if BlueprintLoader.validate_blueprint(blueprint):
+                entry.blueprint = blueprint
+            else:
+                entry.error = "Blueprint failed validation"
+        except Exception as e:
+            entry.error = str(e)
+
+        return entry
+
+    def _drop(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is None:
+            return
+
+        blueprint_id = entry.data.get('blueprint_id')
+        if blueprint_id and self._paths_by_id.get(blueprint_id) == path:
+            del self._paths_by_id[blueprint_id]
+
+
+_registries: Dict[str, BlueprintRegistry] = {}
+_registries_by_arg: Dict[str, BlueprintRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_blueprint_registry(blueprints_dir: str) -> BlueprintRegistry:
+    """Get the shared registry for a blueprints directory"""
+    # Fast path: skip resolving the path again for an argument seen before
+    registry = _registries_by_arg.get(str(blueprints_dir))
+    if registry is not None:
+        return registry
+
+    key = str(Path(blueprints_dir).resolve())
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = BlueprintRegistry(key)
+        _registries_by_arg[str(blueprints_dir)] = _registries[key]
+        return _registries[key]
@@ -5,16 +5,75 @@ Automatically discovers and loads all mutation engines and blueprints
 """
 
 import os
-import sys
-import yaml
 import json
 import time
-import importlib
+import contextlib
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
 
 # Import base classes
-from base import VulnerabilityBlueprint, MachineConfig, BlueprintLoader
+from base import VulnerabilityBlueprint, MachineConfig
+from blueprint_registry import get_blueprint_registry
+from plugin_registry import get_mutation_registry
+from templates.theme_library import ThemeLibrary
+
+
+class MachineSpec(NamedTuple):
+    """One machine to generate in a batch"""
+    blueprint_id: str
+    difficulty: int
+    seed: str
+
+
+# Specs handed to a worker process per task
+BATCH_CHUNK_SIZE = 256
+
+# Generator instance owned by each batch worker process
+_batch_generator = None
+
+
+def _init_batch_worker(core_dir: str):
+    """Load blueprints and mutation engines once per worker process"""
+    global _batch_generator
+    with contextlib.redirect_stdout(io.StringIO()):
+        _batch_generator = DynamicHackforgeGenerator(core_dir)
+
+
+def _generate_chunk(generator, specs: List[MachineSpec], output_path: Path = None) -> List:
+    """
+    Generate a chunk of specs, returning one result per spec
+
+    A result is the MachineConfig, or its manifest entry once written to
+    `output_path`, or an error string.
+    """
+    results = []
+    for spec in specs:
+        try:
+            machine = generator._mutate(*spec)
+            if output_path is not None:
+                generator._write_machine_files(machine, output_path / machine.machine_id)
+                machine = _manifest_entry(machine)
+            results.append(machine)
+        except Exception as e:
+            results.append(f"{type(e).__name__}: {e}")
+    return results
+
+
+def _generate_batch_chunk(specs: List[MachineSpec], output_path: Path = None) -> List:
+    return _generate_chunk(_batch_generator, specs, output_path)
+
+
+def _manifest_entry(machine: MachineConfig) -> Dict:
+    return {
+        'machine_id': machine.machine_id,
+        'blueprint_id': machine.blueprint_id,
+        'variant': machine.variant,
+        'difficulty': machine.difficulty,
+        'seed': machine.seed,
+    }
 
 
 class DynamicHackforgeGenerator:
@@ -36,100 +95,39 @@ class DynamicHackforgeGenerator:
         self.blueprints_dir = self.core_dir / "blueprints"
         self.mutations_dir = self.core_dir / "mutations"
 
-        print(f"\n{'='*60}")
-        print(f"GENERATOR INITIALIZATION")
-        print(f"{'='*60}")
-        print(f"Core directory: {self.core_dir}")
-        print(f"Blueprints directory: {self.blueprints_dir}")
-        print(f"Mutations directory: {self.mutations_dir}")
-        print(f"Blueprints exists: {self.blueprints_dir.exists()}")
-        print(f"Mutations exists: {self.mutations_dir.exists()}")
-        print(f"{'='*60}\n")
-
-        self.blueprints: Dict[str, VulnerabilityBlueprint] = {}
-        self.mutation_engines: Dict[str, type] = {}
-
-        # Auto-discover everything
-        self._discover_blueprints()
-        self._discover_mutations()
-
-        print(f"✓ Loaded {len(self.blueprints)} blueprints")
-        print(f"✓ Loaded {len(self.mutation_engines)} mutation engines\n")
-
-        # DIAGNOSTIC: Print what was loaded
-        if self.blueprints:
-            print("Blueprints loaded:")
-            for bp_id, bp in self.blueprints.items():
-                print(f"  - {bp_id}: {bp.name} (category: {bp.category})")
-        else:
-            print("⚠️  WARNING: No blueprints loaded!")
-
-        if self.mutation_engines:
-            print("\nMutation engines loaded:")
-            for cat, eng in self.mutation_engines.items():
-                print(f"  - {cat}: {eng.__name__}")
-        else:
-            print("⚠️  WARNING: No mutation engines loaded!")
-        print()
-
-    def _discover_blueprints(self):
-        """Automatically discover all blueprint YAML files"""
+        # Shared registries: blueprints are parsed once and mutation modules are
+        # imported on first use, each revalidated against its file's mtime
+        self.blueprint_registry = get_blueprint_registry(self.blueprints_dir)
+        self.mutation_registry = get_mutation_registry(self.mutations_dir)
 
         if not self.blueprints_dir.exists():
             print(f"⚠️  Blueprints directory not found: {self.blueprints_dir}")
-            return
-
-        for yaml_file in self.blueprints_dir.glob("*_blueprint.yaml"):
-            try:
-                with open(yaml_file, 'r') as f:
-                    data = yaml.safe_load(f)
-
-                blueprint = BlueprintLoader.load_from_dict(data)
-
-                if BlueprintLoader.validate_blueprint(blueprint):
-                    self.blueprints[blueprint.blueprint_id] = blueprint
-                    print(f"  ✓ Loaded blueprint: {blueprint.name} (category: {blueprint.category})")
-
-            except Exception as e:
-                print(f"  ✗ Error loading {yaml_file.name}: {e}")
-
-    def _discover_mutations(self):
-        """Automatically discover all mutation engine Python files"""
-
         if not self.mutations_dir.exists():
             print(f"⚠️  Mutations directory not found: {self.mutations_dir}")
-            return
-
-        # Add mutations directory to Python path
-        sys.path.insert(0, str(self.mutations_dir.parent))
 
-        for py_file in self.mutations_dir.glob("*_mutation.py"):
-            try:
-                # Import the module dynamically
-                module_name = f"mutations.{py_file.stem}"
-                module = importlib.import_module(module_name)
+        for file_name, error in self.blueprint_registry.errors().items():
+            print(f"  ✗ Error loading {file_name}: {error}")
 
-                # Find the mutation class (should end with "Mutation")
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
+        print(f"✓ Found {len(self.blueprints)} blueprints, "
+              f"{len(self.mutation_registry.categories())} mutation engines (imported on first use)")
 
-                    # Check if it's a class and ends with "Mutation"
-                    if (isinstance(attr, type) and
-                        attr_name.endswith("Mutation") and
-                        attr_name != "MutationEngine"):
+    @property
+    def blueprints(self) -> Dict[str, VulnerabilityBlueprint]:
+        """All valid blueprints, picking up files added or changed on disk"""
+        return self.blueprint_registry.blueprints()
 
-                        # FIXED: Extract category from filename instead of class name
-                        # Filename: cross_site_scripting_mutation.py -> cross_site_scripting
-                        category = py_file.stem.replace('_mutation', '')
+    @property
+    def mutation_engines(self) -> Dict[str, type]:
+        """Every mutation engine class (imports any module not loaded yet)"""
+        return self.mutation_registry.load_all()
 
-                        self.mutation_engines[category] = attr
-                        print(f"  ✓ Loaded mutation: {attr_name} (category: {category})")
-                        break
+    def get_mutation_engine(self, category: str) -> Optional[type]:
+        """Mutation engine class for a category, imported on first use"""
+        return self.mutation_registry.get(category)
 
-            except Exception as e:
-                print(f"  ✗ Error loading {py_file.name}: {e}")
-                import traceback
-                traceback.print_exc()
+    def plugin_timings(self) -> Dict[str, Dict]:
+        """Import timings of the mutation engine modules"""
+        return self.mutation_registry.timings()
 
     def _camel_to_snake(self, name: str) -> str:
         """Convert CamelCase to snake_case"""
@@ -155,21 +153,21 @@ class DynamicHackforgeGenerator:
 
     def get_blueprint(self, blueprint_id: str) -> Optional[VulnerabilityBlueprint]:
         """Get specific blueprint by ID"""
-        return self.blueprints.get(blueprint_id)
+        return self.blueprint_registry.get(blueprint_id)
 
     def generate_machine(self, blueprint_id: str, seed: str, difficulty: int) -> Optional[MachineConfig]:
         """Generate a machine from blueprint"""
 
-        blueprint = self.blueprints.get(blueprint_id)
+        blueprint = self.blueprint_registry.get(blueprint_id)
         if not blueprint:
             print(f"✗ Blueprint not found: {blueprint_id}")
             return None
 
         # Get mutation engine for this category
-        engine_class = self.mutation_engines.get(blueprint.category)
+        engine_class = self.get_mutation_engine(blueprint.category)
         if not engine_class:
             print(f"✗ No mutation engine for category: {blueprint.category}")
-            print(f"  Available engines: {list(self.mutation_engines.keys())}")
+            print(f"  Available engines: {self.mutation_registry.categories()}")
             print(f"  Blueprint category: '{blueprint.category}'")
             return None
 
@@ -177,6 +175,7 @@ class DynamicHackforgeGenerator:
         try:
             engine = engine_class(seed)
             config = engine.mutate(blueprint, difficulty)
+            config.theme = config.theme or ThemeLibrary.select_theme(config.seed)
             return config
         except Exception as e:
             print(f"✗ Error generating machine: {e}")
@@ -184,22 +183,143 @@ class DynamicHackforgeGenerator:
             traceback.print_exc()
             return None
 
+    def _mutate(self, blueprint_id: str, difficulty: int, seed: str) -> MachineConfig:
+        """Generate a machine, raising instead of printing on failure"""
+        blueprint = self.blueprint_registry.get(blueprint_id)
+        if not blueprint:
+            raise KeyError(f"Blueprint not found: {blueprint_id}")
+
+        engine_class = self.get_mutation_engine(blueprint.category)
+        if not engine_class:
+            raise KeyError(f"No mutation engine for category: {blueprint.category}")
+
+        config = engine_class(seed).mutate(blueprint, difficulty)
+        config.theme = config.theme or ThemeLibrary.select_theme(config.seed)
+        return config
+
+    def plan_batch(self, count: int, difficulty: int, seed_prefix: str,
+                   blueprint_ids: List[str] = None) -> Iterator[MachineSpec]:
+        """
+        Specs for `count` machines, cycling through the blueprints
+
+        Seeds are derived from the prefix and position, so the same call
+        always plans the same machines.
+        """
+        blueprint_ids = sorted(blueprint_ids or self.blueprints.keys())
+        if not blueprint_ids:
+            return
+
+        for i in range(count):
+            blueprint_id = blueprint_ids[i % len(blueprint_ids)]
+            yield MachineSpec(blueprint_id, difficulty, f"{seed_prefix}_{blueprint_id}_{i}")
+
+    def generate_batch(self, specs: Iterable[MachineSpec], workers: int = None,
+                       chunk_size: int = BATCH_CHUNK_SIZE,
+                       on_error: Callable[[MachineSpec, str], None] = None) -> Iterator[MachineConfig]:
+        """
+        Generate machines for (blueprint_id, difficulty, seed) specs
+
+        Machines are yielded in spec order as chunks complete. Failed specs
+        are skipped and reported through `on_error`.
+        """
+        yield from self._run_batch(specs, workers, chunk_size, on_error)
+
+    def generate_and_export_batch(self, specs: Iterable[MachineSpec], output_dir: str,
+                                  workers: int = None, chunk_size: int = BATCH_CHUNK_SIZE,
+                                  on_error: Callable[[MachineSpec, str], None] = None) -> Dict:
+        """
+        Generate machines and write their files from the worker processes
+
+        Only manifest entries travel back to this process, and the manifest
+        is written once at the end.
+        """
+        output_path = self.core_dir / output_dir
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        started = time.time()
+        entries = []
+        for entry in self._run_batch(specs, workers, chunk_size, on_error, output_path):
+            entries.append(entry)
+            if len(entries) % 1000 == 0:
+                print(f"  ✓ {len(entries)} machines generated ({time.time() - started:.1f}s)")
+
+        manifest = self._write_batch_manifest(output_path, entries)
+        print(f"✓ Generated {len(entries)} machines into {output_path} in {time.time() - started:.1f}s")
+        return manifest
+
+    def _run_batch(self, specs: Iterable[MachineSpec], workers: int, chunk_size: int,
+                   on_error: Callable, output_path: Path = None) -> Iterator:
+        """
+        Fan chunks of specs out over a process pool, yielding results in order
+
+        Only a couple of chunks per worker are in flight at a time, so
+        arbitrarily long spec streams run in bounded memory.
+        """
+        workers = workers or os.cpu_count() or 1
+        chunks = self._chunk_specs(specs, chunk_size)
+
+        if workers == 1:
+            results = ((chunk, _generate_chunk(self, chunk, output_path)) for chunk in chunks)
+            yield from self._unpack_batch_results(results, on_error)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(str(self.core_dir),)
+        ) as executor:
+            pending = deque()
+
+            def completed():
+                for chunk in chunks:
+                    pending.append((chunk, executor.submit(_generate_batch_chunk, chunk, output_path)))
+                    if len(pending) >= workers * 2:
+                        done_chunk, future = pending.popleft()
+                        yield done_chunk, future.result()
+                while pending:
+                    done_chunk, future = pending.popleft()
+                    yield done_chunk, future.result()
+
+            yield from self._unpack_batch_results(completed(), on_error)
+
+    @staticmethod
+    def _chunk_specs(specs: Iterable[MachineSpec], chunk_size: int) -> Iterator[List[MachineSpec]]:
+        chunk = []
+        for spec in specs:
+            chunk.append(MachineSpec(*spec))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _unpack_batch_results(results, on_error) -> Iterator:
+        for chunk, outcomes in results:
+            for spec, outcome in zip(chunk, outcomes):
+                if not isinstance(outcome, str):
+                    yield outcome
+                elif on_error:
+                    on_error(spec, outcome)
+
     def generate_single_machine(self, blueprint_id: str = None, difficulty: int = 2, 
                                 user_id: str = "user") -> Optional[MachineConfig]:
         """Generate a single machine and export to generated_machines directory"""
         
+        blueprints = self.blueprints
+
         # If no blueprint specified, pick a random one
         if blueprint_id is None:
-            if not self.blueprints:
+            if not blueprints:
                 print("✗ No blueprints available!")
                 return None
             import random
-            blueprint_id = random.choice(list(self.blueprints.keys()))
+            blueprint_id = random.choice(list(blueprints.keys()))
         
-        blueprint = self.blueprints.get(blueprint_id)
+        blueprint = blueprints.get(blueprint_id)
         if not blueprint:
             print(f"✗ Blueprint not found: {blueprint_id}")
-            print(f"Available blueprints: {list(self.blueprints.keys())}")
+            print(f"Available blueprints: {list(blueprints.keys())}")
             return None
 
         timestamp = int(time.time())
@@ -290,12 +410,13 @@ class DynamicHackforgeGenerator:
     def generate_campaign(self, user_id: str, difficulty: int = 2, count: int = None) -> List[MachineConfig]:
         """Generate a campaign with multiple machines"""
 
-        if not self.blueprints:
+        blueprints = self.blueprints
+        if not blueprints:
             print("✗ No blueprints available!")
             return []
 
         if count is None:
-            count = min(len(self.blueprints), 5)
+            count = min(len(blueprints), 5)
 
         machines = []
         timestamp = int(time.time())
@@ -310,13 +431,13 @@ class DynamicHackforgeGenerator:
 
         # Select random blueprints
         import random
-        selected_ids = random.sample(list(self.blueprints.keys()),
-                                     min(count, len(self.blueprints)))
+        selected_ids = random.sample(list(blueprints.keys()),
+                                     min(count, len(blueprints)))
 
         for i, blueprint_id in enumerate(selected_ids, 1):
             seed = f"{user_id}_{blueprint_id}_{timestamp}_{i}"
 
-            blueprint = self.blueprints[blueprint_id]
+            blueprint = blueprints[blueprint_id]
             print(f"[{i}/{count}] Generating: {blueprint.name}")
 
             machine = self.generate_machine(blueprint_id, seed, difficulty)
@@ -357,30 +478,7 @@ class DynamicHackforgeGenerator:
 
         # Export each machine
         for machine in machines:
-            machine_dir = output_path / machine.machine_id
-            machine_dir.mkdir(parents=True, exist_ok=True)
-
-            # Export config
-            config_file = machine_dir / "config.json"
-            with open(config_file, 'w') as f:
-                json.dump(machine.to_dict(), f, indent=2)
-
-            # Export flag
-            flag_file = machine_dir / "flag.txt"
-            with open(flag_file, 'w') as f:
-                f.write(machine.flag['content'])
-
-            # Export hints
-            hints_file = machine_dir / "hints.txt"
-            with open(hints_file, 'w') as f:
-                hints = machine.metadata.get('exploit_hints', [])
-                f.write(f"Machine: {machine.machine_id}\n")
-                f.write(f"Variant: {machine.variant}\n")
-                f.write(f"Difficulty: {machine.difficulty}/5\n\n")
-                f.write("Hints:\n")
-                for hint in hints:
-                    f.write(f"  • {hint}\n")
-
+            self._write_machine_files(machine, output_path / machine.machine_id)
             print(f"  ✓ {machine.machine_id}")
 
         # Export manifest with campaign_id
@@ -401,6 +499,61 @@ class DynamicHackforgeGenerator:
 
         return str(output_path)
 
+    def export_batch(self, machines: Iterable[MachineConfig], output_dir: str,
+                     progress_every: int = 1000) -> Dict:
+        """
+        Export a stream of machines with a single manifest write at the end
+
+        The manifest lists a summary per machine; the full config of each
+        machine is in its own config.json.
+        """
+        output_path = self.core_dir / output_dir
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        started = time.time()
+        entries = []
+        for machine in machines:
+            self._write_machine_files(machine, output_path / machine.machine_id)
+            entries.append(_manifest_entry(machine))
+            if progress_every and len(entries) % progress_every == 0:
+                print(f"  ✓ {len(entries)} machines exported ({time.time() - started:.1f}s)")
+
+        manifest = self._write_batch_manifest(output_path, entries)
+        print(f"✓ Exported {len(entries)} machines to {output_path} in {time.time() - started:.1f}s")
+        return manifest
+
+    def _write_batch_manifest(self, output_path: Path, entries: List[Dict]) -> Dict:
+        manifest = {
+            'batch_id': output_path.name,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'machines': entries,
+            'total': len(entries),
+        }
+
+        with open(output_path / "manifest.json", 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+
+        return manifest
+
+    def _write_machine_files(self, machine: MachineConfig, machine_dir: Path):
+        """Write config.json, flag.txt and hints.txt for one machine"""
+        machine_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(machine_dir / "config.json", 'w') as f:
+            json.dump(machine.to_dict(), f, indent=2)
+
+        with open(machine_dir / "flag.txt", 'w') as f:
+            f.write(machine.flag['content'])
+
+        with open(machine_dir / "hints.txt", 'w') as f:
+            hints = machine.metadata.get('exploit_hints', [])
+            f.write(f"Machine: {machine.machine_id}\n")
+            f.write(f"Variant: {machine.variant}\n")
+            f.write(f"Difficulty: {machine.difficulty}/5\n\n")
+            f.write("Hints:\n")
+            for hint in hints:
+                f.write(f"  • {hint}\n")
+
 
 def main():
     """Main entry point"""
@@ -418,7 +571,7 @@ def main():
         print("  Generate them with: python3 vuln_generator.py <config.json>")
         return
 
-    if not generator.mutation_engines:
+    if not generator.mutation_registry.categories():
         print("\n✗ No mutation engines found!")
         print("  Make sure you have *_mutation.py files in mutations/")
         print("  Generate them with: python3 vuln_generator.py <config.json>")
@@ -435,8 +588,8 @@ def main():
     # Parse command line arguments
     import argparse
     parser = argparse.ArgumentParser(description='Hackforge Machine Generator')
-    parser.add_argument('--mode', choices=['single', 'campaign', 'all'], default='all',
-                       help='Generation mode: single machine, campaign, or all blueprints')
+    parser.add_argument('--mode', choices=['single', 'campaign', 'all', 'batch'], default='all',
+                       help='Generation mode: single machine, campaign, all blueprints, or a large batch')
     parser.add_argument('--blueprint', type=str, help='Blueprint ID for single machine')
     parser.add_argument('--difficulty', type=int, default=2, choices=[1,2,3,4,5],
                        help='Difficulty level (1-5)')
@@ -444,6 +597,10 @@ def main():
                        help='Number of machines for campaign')
     parser.add_argument('--user', type=str, default='demo_user',
                        help='User ID for generation')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes for batch mode (default: CPU count)')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Output directory (relative to core/) for batch mode')
 
     args = parser.parse_args()
 
@@ -520,6 +677,25 @@ def main():
             print(f"   cd generated_machines && for dir in */; do (cd \"$dir\" && docker-compose up -d); done")
             print()
 
+    elif args.mode == 'batch':
+        # Seed-driven bulk generation, e.g. a semester's worth of machines
+        seed_prefix = f"{args.user}_{int(time.time())}"
+        output_dir = args.output or f"batches/{seed_prefix}"
+        failures = []
+
+        print(f"\nGenerating {args.count} machines (difficulty {args.difficulty}) into {output_dir}")
+        generator.generate_and_export_batch(
+            generator.plan_batch(args.count, args.difficulty, seed_prefix),
+            output_dir,
+            workers=args.workers,
+            on_error=lambda spec, error: failures.append((spec, error))
+        )
+
+        for spec, error in failures[:10]:
+            print(f"✗ {spec.blueprint_id} ({spec.seed}): {error}")
+        if failures:
+            print(f"✗ {len(failures)} machines failed to generate")
+
     else:
         # Generate campaign
         machines = generator.generate_campaign(
@@ -0,0 +1,182 @@
+"""
+Plugin Registry
+Records plugin modules by category and imports each one only when it is first used
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+class _PluginEntry:
+    """Discovery and import state of one plugin module"""
+
+    __slots__ = ('path', 'module_name', 'mtime_ns', 'module', 'plugin', 'error',
+                 'import_ms', 'imported_at', 'imports')
+
+    def __init__(self, path: str, module_name: str):
+        self.path = path
+        self.module_name = module_name
+        self.mtime_ns: Optional[int] = None     # mtime of the imported version
+        self.module = None
+        self.plugin = None
+        self.error: Optional[str] = None
+        self.import_ms: Optional[float] = None
+        self.imported_at: Optional[float] = None
+        self.imports = 0
+
+
+class PluginRegistry:
+    """
+    Plugin classes keyed by category, e.g. mutations/sql_injection_mutation.py
+
+    Discovery only lists the directory. A module is imported the first time
+    its category is requested, and re-imported when its file's mtime changes;
+    other modules are untouched. Import time is recorded per plugin.
+    """
+
+    def __init__(self, directory: str, package: str, suffix: str,
+                 resolve: Callable[[object, str], Optional[type]]):
+        self.directory = Path(directory)
+        self.package = package
+        self.suffix = suffix
+        self.resolve = resolve
+
+        self._entries: Dict[str, _PluginEntry] = {}   # category -> entry
+        self._dir_mtime_ns: Optional[int] = None
+        self._lock = threading.RLock()
+
+    def categories(self) -> List[str]:
+        """Categories with a plugin file (nothing is imported)"""
+        with self._lock:
+            self._scan_directory()
+            return sorted(self._entries)
+
+    def get(self, category: str) -> Optional[type]:
+        """Plugin class for a category, importing or reloading its module as needed"""
+        with self._lock:
+            entry = self._entries.get(category)
+            if entry is None:
+                self._scan_directory()
+                entry = self._entries.get(category)
+                if entry is None:
+                    return None
+
+            try:
+                mtime_ns = os.stat(entry.path).st_mtime_ns
+            except FileNotFoundError:
+                del self._entries[category]
+                return None
+
+            if entry.mtime_ns != mtime_ns:
+                self._import(entry, mtime_ns)
+
+            return entry.plugin
+
+    def load_all(self) -> Dict[str, type]:
+        """Import every plugin (e.g. for a listing); returns the ones that loaded"""
+        plugins = {}
+        for category in self.categories():
+            plugin = self.get(category)
+            if plugin is not None:
+                plugins[category] = plugin
+        return plugins
+
+    def error(self, category: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(category)
+            return entry.error if entry else None
+
+    def timings(self) -> Dict[str, Dict]:
+        """Import timings and state per plugin"""
+        with self._lock:
+            self._scan_directory()
+            return {
+                category: {
+                    'module': entry.module_name,
+                    'loaded': entry.plugin is not None,
+                    'import_ms': entry.import_ms,
+                    'imported_at': entry.imported_at,
+                    'imports': entry.imports,
+                    'error': entry.error,
+                }
+                for category, entry in sorted(self._entries.items())
+            }
+
+    def _scan_directory(self):
+        try:
+            dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            self._entries.clear()
+            self._dir_mtime_ns = None
+            return
+
+        if dir_mtime_ns == self._dir_mtime_ns:
+            return
+
+        found = {}
+        for path in self.directory.glob(f"*{self.suffix}.py"):
+            category = path.stem[:-len(self.suffix)]
+            found[category] = str(path)
+
+        for category in set(self._entries) - set(found):
+            del self._entries[category]
+
+        for category, path in found.items():
+            entry = self._entries.get(category)
+            if entry is None or entry.path != path:
+                self._entries[category] = _PluginEntry(path, f"{self.package}.{Path(path).stem}")
+
+        self._dir_mtime_ns = dir_mtime_ns
+
+    def _import(self, entry: _PluginEntry, mtime_ns: int):
+        parent = str(self.directory.parent)
+        if parent not in sys.path:
+            sys.path.insert(0, parent)
+
+        started = time.perf_counter()
+        try:
+            module = sys.modules.get(entry.module_name)
+            if module is not None and entry.module is not None:
+                module = importlib.reload(module)
+            else:
+                module = importlib.import_module(entry.module_name)
+
+            entry.module = module
+            entry.plugin = self.resolve(module, entry.path)
+            entry.error = None if entry.plugin else f"No plugin class in {Path(entry.path).name}"
+        except Exception as e:
+            entry.plugin = None
+            entry.error = f"{type(e).__name__}: {e}"
+            print(f"  ✗ Error loading {Path(entry.path).name}: {entry.error}")
+
+        entry.import_ms = round((time.perf_counter() - started) * 1000, 2)
+        entry.imported_at = time.time()
+        entry.imports += 1
+        entry.mtime_ns = mtime_ns
+
+
+def _resolve_mutation(module, path: str) -> Optional[type]:
+    """First class whose name ends with "Mutation" (other than the base class)"""
+    for attr_name in dir(module):
+        attr = getattr(module, attr_name)
+        if isinstance(attr, type) and attr_name.endswith("Mutation") and attr_name != "MutationEngine":
+            return attr
+    return None
+
+
+_registries: Dict[str, PluginRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_mutation_registry(mutations_dir: str) -> PluginRegistry:
+    """Shared registry of mutation engines for a mutations directory"""
+    key = str(Path(mutations_dir).resolve())
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = PluginRegistry(key, "mutations", "_mutation", _resolve_mutation)
+        return _registries[key]
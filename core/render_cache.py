@@ -0,0 +1,182 @@
+"""
+Render Cache
+Content-addressed on-disk cache of rendered machine templates
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class RenderCache:
+    """
+    Rendered template output keyed by a hash of its inputs
+
+    The key covers the template source (the category module plus the shared
+    modules it renders with), the full config payload and the theme, so any
+    change to one of them is a miss. Entries are JSON files under a two-level
+    fan-out; once the total size exceeds max_bytes the least recently used
+    entries are evicted. Hits refresh the entry's mtime, so LRU order
+    survives restarts and is shared by every process using the directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+        self._lru: "OrderedDict[str, int]" = OrderedDict()   # key -> size, oldest first
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        # Source hash per file, revalidated against (mtime_ns, size)
+        self._source_hashes: Dict[str, tuple] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source_files: Iterable[str], payload: Dict, theme: Optional[str]) -> str:
+        """Cache key for rendering `payload` with the given template sources"""
+        digest = hashlib.sha256()
+        for path in source_files:
+            digest.update(self._source_hash(path).encode())
+        digest.update(json.dumps(payload, sort_keys=True, default=str).encode())
+        digest.update(str(theme).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                rendered = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if key in self._lru:
+                self._lru.move_to_end(key)
+        return rendered
+
+    def put(self, key: str, rendered: Dict):
+        path = self._path(key)
+        data = json.dumps(rendered, separators=(',', ':'))
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_file.write_text(data)
+            os.replace(tmp_file, path)
+        except OSError as e:
+            print(f"⚠️ Could not write render cache entry: {e}")
+            return
+
+        with self._lock:
+            self._load_index()
+            self._total_bytes -= self._lru.pop(key, 0)
+            self._lru[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._lru):
+                self._remove(key)
+            self._lru.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._load_index()
+            return {
+                'entries': len(self._lru),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _source_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        cached = self._source_hashes.get(path)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+
+        with open(path, 'rb') as f:
+            source_hash = hashlib.sha256(f.read()).hexdigest()
+        self._source_hashes[path] = ((stat.st_mtime_ns, stat.st_size), source_hash)
+        return source_hash
+
+    def _load_index(self):
+        """Pick up entries left by earlier runs, oldest first (caller holds the lock)"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if not self.cache_dir.exists():
+            return
+
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, path.stem, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            if key not in self._lru:
+                self._lru[key] = size
+                self._total_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._lru) > 1:
+            key, size = self._lru.popitem(last=False)
+            self._total_bytes -= size
+            self._remove(key)
+
+    def _remove(self, key: str):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+
+_render_cache: Optional[RenderCache] = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> Optional[RenderCache]:
+    """
+    Shared render cache configured from the environment
+
+    HACKFORGE_RENDER_CACHE_DIR sets the directory (default core/.render_cache)
+    and HACKFORGE_RENDER_CACHE_MB its size; a size of 0 disables caching.
+    """
+    global _render_cache
+    with _render_cache_lock:
+        if _render_cache is None:
+            max_mb = float(os.getenv('HACKFORGE_RENDER_CACHE_MB', DEFAULT_MAX_BYTES // (1024 * 1024)))
+            if max_mb <= 0:
+                return None
+
+            cache_dir = os.getenv(
+                'HACKFORGE_RENDER_CACHE_DIR',
+                str(Path(__file__).parent / ".render_cache")
+            )
+            _render_cache = RenderCache(cache_dir, int(max_mb * 1024 * 1024))
+        return _render_cache
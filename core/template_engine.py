@@ -8,14 +8,38 @@ import os
 import sys
 import json
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from base import MachineConfig
 from templates.base_template import TemplateRenderer
+from templates.theme_library import ThemeLibrary
+
+
+def _write_if_changed(path: Path, content: str) -> bool:
+    """Write a file only if its content differs, keeping mtimes stable for Docker's build cache"""
+    try:
+        if path.read_text() == content:
+            return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    path.write_text(content)
+    return True
+
+
+def _ingress_url(machine_id: str) -> str:
+    """Where players reach a machine: the ingress routes /<machine_id>/ to it"""
+    return f"http://localhost:{os.getenv('HACKFORGE_INGRESS_PORT', '8880')}/{machine_id}/"
+
+
+def _render_machine(config_dict: Dict) -> Dict:
+    """Render one machine config (runs inside render worker processes)"""
+    return TemplateRenderer.render(MachineConfig(**config_dict))
 
 
 class TemplateEngine:
@@ -23,9 +47,18 @@ class TemplateEngine:
     Main template engine that converts configs to code
     """
 
-    def __init__(self, machines_dir: str = "generated_machines"):
+    def __init__(self, machines_dir: str = "generated_machines", workers: int = None,
+                 network: str = "hackforge_machines"):
         self.machines_dir = Path(machines_dir)
         
+        # Docker network machines join; the ingress reaches them there
+        self.network = network
+        
+        # Worker count for campaign rendering; 1 renders sequentially in-process
+        if workers is None:
+            workers = int(os.getenv('HACKFORGE_RENDER_WORKERS', '1'))
+        self.workers = max(1, workers)
+        
         if not self.machines_dir.exists():
             print(f"⚠️  Machines directory not found: {self.machines_dir}")
             self.machines_dir.mkdir(parents=True, exist_ok=True)
@@ -46,32 +79,51 @@ class TemplateEngine:
         print(f"   Variant: {config.variant}")
         print(f"   Difficulty: {config.difficulty}/5")
 
+        try:
+            # Render templates
+            rendered = TemplateRenderer.render(config)
+            return self._write_machine_files(config, machine_dir, rendered)
+
+        except Exception as e:
+            print(f"   ✗ Error generating machine: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def _write_machine_files(self, config: MachineConfig, machine_dir: Path, rendered: Dict) -> Dict[str, str]:
+        """Write rendered templates into a machine directory"""
+
         # Create app directory
         app_dir = machine_dir / "app"
         app_dir.mkdir(exist_ok=True)
 
-        try:
-            # Render templates
-            rendered = TemplateRenderer.render(config)
+        # Write application code
+        app_file = app_dir / "index.php"
+        written = _write_if_changed(app_file, rendered['code'])
+        print(f"   ✓ {'Generated' if written else 'Unchanged'}: {app_file}")
+
+        # Theme stylesheet referenced by the app
+        if rendered.get('theme'):
+            stylesheet = ThemeLibrary.write_stylesheet(rendered['theme'], app_dir)
+            print(f"   ✓ Generated: {stylesheet}")
 
-            # Write application code
-            app_file = app_dir / "index.php"
-            app_file.write_text(rendered['code'])
-            print(f"   ✓ Generated: {app_file}")
+        # Write Dockerfile (FROM the shared base image) and the base image recipe
+        dockerfile = machine_dir / "Dockerfile"
+        written = _write_if_changed(dockerfile, rendered['dockerfile'])
+        print(f"   ✓ {'Generated' if written else 'Unchanged'}: {dockerfile}")
 
-            # Write Dockerfile
-            dockerfile = machine_dir / "Dockerfile"
-            dockerfile.write_text(rendered['dockerfile'])
-            print(f"   ✓ Generated: {dockerfile}")
+        base_dockerfile = machine_dir / "Dockerfile.base"
+        written = _write_if_changed(base_dockerfile, rendered['base_dockerfile'])
+        print(f"   ✓ {'Generated' if written else 'Unchanged'}: {base_dockerfile} ({rendered['base_image']})")
 
-            # Write flag (already exists, but update it)
-            flag_file = machine_dir / "flag.txt"
-            flag_file.write_text(rendered['flag'])
-            print(f"   ✓ Updated: {flag_file}")
+        # Write flag (already exists, but update it)
+        flag_file = machine_dir / "flag.txt"
+        written = _write_if_changed(flag_file, rendered['flag'])
+        print(f"   ✓ {'Updated' if written else 'Unchanged'}: {flag_file}")
 
-            # Write hints
-            hints_file = machine_dir / "HINTS.md"
-            hints_content = f"""# Exploitation Hints
+        # Write hints
+        hints_file = machine_dir / "HINTS.md"
+        hints_content = f"""# Exploitation Hints
 
 **Machine ID:** `{config.machine_id}`
 **Variant:** {config.variant}
@@ -80,81 +132,131 @@ class TemplateEngine:
 ## Hints
 
 """
-            for i, hint in enumerate(rendered['hints'], 1):
-                hints_content += f"{i}. {hint}\n"
-
-            hints_content += f"\n## Flag\n\n`{rendered['flag']}`\n"
-            hints_file.write_text(hints_content)
-            print(f"   ✓ Generated: {hints_file}")
-
-            return {
-                'machine_id': config.machine_id,
-                'machine_dir': str(machine_dir),
-                'app_file': str(app_file),
-                'dockerfile': str(dockerfile),
-                'flag_file': str(flag_file),
-                'hints_file': str(hints_file),
-            }
+        for i, hint in enumerate(rendered['hints'], 1):
+            hints_content += f"{i}. {hint}\n"
+
+        hints_content += f"\n## Flag\n\n`{rendered['flag']}`\n"
+        written = _write_if_changed(hints_file, hints_content)
+        print(f"   ✓ {'Generated' if written else 'Unchanged'}: {hints_file}")
+
+        return {
+            'machine_id': config.machine_id,
+            'machine_dir': str(machine_dir),
+            'app_file': str(app_file),
+            'dockerfile': str(dockerfile),
+            'base_dockerfile': str(base_dockerfile),
+            'base_image': rendered['base_image'],
+            'flag_file': str(flag_file),
+            'hints_file': str(hints_file),
+        }
+
+    def _load_machine_configs(self, root_dir: Path) -> List[Tuple[Path, Dict]]:
+        """Parse every machine config.json under a directory exactly once"""
+
+        entries = []
+        for item in sorted(root_dir.iterdir()):
+            if item.is_dir() and not item.name.startswith('.'):
+                config_file = item / "config.json"
+                if not config_file.exists():
+                    continue
 
-        except Exception as e:
-            print(f"   ✗ Error generating machine: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+                try:
+                    with open(config_file, 'r') as f:
+                        entries.append((item, json.load(f)))
+                except Exception as e:
+                    print(f"   ✗ Error reading {config_file}: {e}")
 
-    def process_all_machines(self, start_port: int = 8080) -> List[Dict]:
-        """
-        Process all machine configs in the machines directory
+        return entries
 
-        Args:
-            start_port: Starting port number
+    def _generate_apps(self, entries: List[Tuple[Path, Dict]]) -> List[Dict]:
+        """
+        Generate applications for parsed machine configs
 
-        Returns:
-            List of generated machine info
+        With more than one worker, rendering fans out over a process pool and
+        file writes over a thread pool.
         """
 
-        print(f"\n{'='*60}")
-        print(f"Processing Machines in: {self.machines_dir}")
-        print(f"{'='*60}")
+        if self.workers > 1 and len(entries) > 1:
+            results = self._generate_apps_parallel(entries)
+        else:
+            results = []
+            for machine_dir, config_dict in entries:
+                print(f"\nProcessing: {machine_dir.name}")
+                try:
+                    config = MachineConfig(**config_dict)
+                    results.append(self.generate_machine_app(config, machine_dir))
+                except Exception as e:
+                    print(f"   ✗ Error processing {machine_dir.name}: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    results.append(None)
 
         machines_generated = []
-        port = start_port
+        for (machine_dir, config_dict), result in zip(entries, results):
+            if result:
+                result['config'] = config_dict
+                machines_generated.append(result)
 
-        # Find all machine directories with config.json
-        machine_dirs = []
-        for item in self.machines_dir.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                config_file = item / "config.json"
-                if config_file.exists():
-                    machine_dirs.append(item)
+        return machines_generated
 
-        print(f"\nFound {len(machine_dirs)} machine(s) to process")
+    def _generate_apps_parallel(self, entries: List[Tuple[Path, Dict]]) -> List[Optional[Dict]]:
+        """Render in worker processes, write files in worker threads"""
 
-        for machine_dir in machine_dirs:
-            config_file = machine_dir / "config.json"
-            
-            print(f"\nProcessing: {machine_dir.name}")
+        workers = min(self.workers, len(entries))
+        print(f"\nRendering with {workers} worker process(es)")
+
+        # spawn: the API calls this from worker threads, where fork is unsafe
+        context = multiprocessing.get_context('spawn')
+        results: List[Optional[Dict]] = [None] * len(entries)
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as render_pool, \
+                ThreadPoolExecutor(max_workers=workers) as write_pool:
 
-            try:
-                # Load config
-                with open(config_file, 'r') as f:
-                    config_dict = json.load(f)
+            render_futures = [
+                render_pool.submit(_render_machine, config_dict)
+                for _, config_dict in entries
+            ]
+
+            write_futures = {}
+            for index, future in enumerate(render_futures):
+                machine_dir, config_dict = entries[index]
+                try:
+                    rendered = future.result()
+                except Exception as e:
+                    print(f"   ✗ Error rendering {machine_dir.name}: {e}")
+                    continue
 
-                # Convert dict to MachineConfig
                 config = MachineConfig(**config_dict)
+                write_futures[index] = write_pool.submit(
+                    self._write_machine_files, config, machine_dir, rendered
+                )
+
+            for index, future in write_futures.items():
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"   ✗ Error writing {entries[index][0].name}: {e}")
+
+        return results
+
+    def process_all_machines(self) -> List[Dict]:
+        """
+        Process all machine configs in the machines directory
+
+        Returns:
+            List of generated machine info
+        """
 
-                # Generate application
-                result = self.generate_machine_app(config, machine_dir)
+        print(f"\n{'='*60}")
+        print(f"Processing Machines in: {self.machines_dir}")
+        print(f"{'='*60}")
 
-                if result:
-                    result['port'] = port
-                    machines_generated.append(result)
-                    port += 1
+        # Parse every config once; compose/README generation reuses them
+        entries = self._load_machine_configs(self.machines_dir)
 
-            except Exception as e:
-                print(f"   ✗ Error processing {machine_dir.name}: {e}")
-                import traceback
-                traceback.print_exc()
+        print(f"\nFound {len(entries)} machine(s) to process")
+
+        machines_generated = self._generate_apps(entries)
 
         # Generate master docker-compose if we have machines
         if machines_generated:
@@ -168,19 +270,20 @@ class TemplateEngine:
         return machines_generated
 
     def _generate_master_compose(self, machines: List[Dict]):
-        """Generate master docker-compose.yml"""
+        """
+        Generate master docker-compose.yml
+
+        Like campaign compose files, it publishes no host ports: machines join
+        the shared machine network and are served through the ingress.
+        """
 
         compose_content = "version: '3.8'\n\nservices:\n"
 
         for machine in machines:
             machine_dir = Path(machine['machine_dir'])
             machine_id = machine['machine_id']
-            port = machine['port']
 
-            # Read config to get flag location
-            config_file = machine_dir / "config.json"
-            with open(config_file, 'r') as f:
-                config = json.load(f)
+            config = machine['config']
 
             # Get flag location from config, default to /var/www/html/flag.txt
             flag_location = config['flag'].get('location', '/var/www/html/flag.txt')
@@ -194,17 +297,26 @@ class TemplateEngine:
   {machine_id}:
     build: ./{machine_dir.name}
     container_name: hackforge_{machine_id}
-    ports:
-      - "{port}:80"
+    networks:
+      - machines
     volumes:
       - ./{machine_dir.name}/app:/var/www/html
       - ./{machine_dir.name}/flag.txt:{flag_location}:ro
     environment:
       - MACHINE_ID={machine_id}
       - FLAG_LOCATION={flag_location}
+    labels:
+      - hackforge.machine_id={machine_id}
     restart: unless-stopped
 """
 
+        compose_content += f"""
+networks:
+  machines:
+    name: {self.network}
+    external: true
+"""
+
         # Write compose file
         compose_file = self.machines_dir / "docker-compose.yml"
         compose_file.write_text(compose_content)
@@ -220,6 +332,9 @@ Generated: {len(machines)} machine(s)
 ## Quick Start
 
 ```bash
+# Create the shared machine network (once)
+docker network create {self.network}
+
 # Build and start all machines
 docker-compose up -d --build
 
@@ -239,12 +354,9 @@ docker-compose up -d --build <machine_id>
 
         for i, machine in enumerate(machines, 1):
             machine_dir = Path(machine['machine_dir'])
-            config_file = machine_dir / "config.json"
+            config = machine['config']
 
-            with open(config_file, 'r') as f:
-                config = json.load(f)
-
-            readme_content += f"""### Machine {i} - http://localhost:{machine['port']}
+            readme_content += f"""### Machine {i} - {_ingress_url(config['machine_id'])}
 
 - **Variant:** {config['variant']}
 - **Difficulty:** {config['difficulty']}/5
@@ -263,16 +375,15 @@ docker-compose up -d --build <machine_id>
         print(f"✓ Generated: {readme_file}")
 
 
-    def generate_campaign_apps(self, campaign_path: str, start_port: int = 8080) -> List[Dict]:
+    def generate_campaign_apps(self, campaign_path: str) -> List[Dict]:
         """
         Generate apps for all machines in a campaign directory
         
         Args:
             campaign_path: Path to campaign directory (e.g., "forge/core/campaigns/campaign_123")
-            start_port: Starting port number
             
         Returns:
-            List of generated machine info with ports
+            List of generated machine info
         """
         campaign_dir = Path(campaign_path)
         
@@ -284,44 +395,12 @@ docker-compose up -d --build <machine_id>
         print(f"Generating Apps for Campaign: {campaign_dir.name}")
         print(f"{'='*60}")
         
-        machines_generated = []
-        port = start_port
+        # Parse every config once; compose generation reuses them
+        entries = self._load_machine_configs(campaign_dir)
         
-        # Find all machine directories with config.json
-        machine_dirs = []
-        for item in campaign_dir.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                config_file = item / "config.json"
-                if config_file.exists():
-                    machine_dirs.append(item)
+        print(f"\nFound {len(entries)} machine(s) to process")
         
-        print(f"\nFound {len(machine_dirs)} machine(s) to process")
-        
-        for machine_dir in machine_dirs:
-            config_file = machine_dir / "config.json"
-            
-            print(f"\nProcessing: {machine_dir.name}")
-            
-            try:
-                # Load config
-                with open(config_file, 'r') as f:
-                    config_dict = json.load(f)
-                
-                # Convert dict to MachineConfig
-                config = MachineConfig(**config_dict)
-                
-                # Generate application
-                result = self.generate_machine_app(config, machine_dir)
-                
-                if result:
-                    result['port'] = port
-                    machines_generated.append(result)
-                    port += 1
-                    
-            except Exception as e:
-                print(f"   ✗ Error processing {machine_dir.name}: {e}")
-                import traceback
-                traceback.print_exc()
+        machines_generated = self._generate_apps(entries)
         
         # Generate docker-compose for this campaign
         if machines_generated:
@@ -334,19 +413,20 @@ docker-compose up -d --build <machine_id>
         return machines_generated
 
     def _generate_campaign_compose(self, campaign_dir: Path, machines: List[Dict]):
-        """Generate docker-compose.yml for a specific campaign"""
+        """
+        Generate docker-compose.yml for a specific campaign
+
+        Machines publish no host ports; they join the shared machine network
+        and are served through the ingress.
+        """
         
         compose_content = "version: '3.8'\n\nservices:\n"
         
         for machine in machines:
             machine_dir = Path(machine['machine_dir'])
             machine_id = machine['machine_id']
-            port = machine['port']
             
-            # Read config to get flag location
-            config_file = machine_dir / "config.json"
-            with open(config_file, 'r') as f:
-                config = json.load(f)
+            config = machine['config']
             
             flag_location = config['flag'].get('location', '/var/www/html/flag.txt')
             flag_location = flag_location.replace(':', '_').replace('//', '/')
@@ -360,17 +440,27 @@ docker-compose up -d --build <machine_id>
   {machine_id}:
     build: ./{rel_path}
     container_name: hackforge_{machine_id}
-    ports:
-      - "{port}:80"
+    networks:
+      - machines
     volumes:
       - ./{rel_path}/app:/var/www/html
       - ./{rel_path}/flag.txt:{flag_location}:ro
     environment:
       - MACHINE_ID={machine_id}
       - FLAG_LOCATION={flag_location}
+    labels:
+      - hackforge.machine_id={machine_id}
+      - hackforge.campaign_id={campaign_dir.name}
     restart: unless-stopped
 """
         
+        compose_content += f"""
+networks:
+  machines:
+    name: {self.network}
+    external: true
+"""
+        
         # Write compose file
         compose_file = campaign_dir / "docker-compose.yml"
         compose_file.write_text(compose_content)
@@ -385,10 +475,10 @@ def main():
         help='Directory containing machine configs (default: generated_machines)'
     )
     parser.add_argument(
-        '--port',
+        '--workers',
         type=int,
-        default=8080,
-        help='Starting port number (default: 8080)'
+        default=None,
+        help='Render worker processes (default: $HACKFORGE_RENDER_WORKERS or 1)'
     )
 
     args = parser.parse_args()
@@ -398,7 +488,7 @@ def main():
     print("="*60)
 
     # Initialize template engine
-    engine = TemplateEngine(machines_dir=args.machines_dir)
+    engine = TemplateEngine(machines_dir=args.machines_dir, workers=args.workers)
 
     # Check if machines exist
     if not engine.machines_dir.exists():
@@ -415,7 +505,7 @@ def main():
         return
 
     # Process all machines
-    machines = engine.process_all_machines(start_port=args.port)
+    machines = engine.process_all_machines()
 
     if machines:
         print("\n" + "="*60)
@@ -423,10 +513,11 @@ def main():
         print("="*60)
         print("\nNext steps:")
         print(f"  1. cd {args.machines_dir}")
-        print("  2. docker-compose up -d --build")
-        print("  3. Access machines:")
+        print(f"  2. docker network create {engine.network}  (once)")
+        print("  3. docker-compose up -d --build")
+        print("  4. Start the ingress (the API does this) and access machines:")
         for i, machine in enumerate(machines, 1):
-            print(f"     - Machine {i}: http://localhost:{machine['port']}")
+            print(f"     - Machine {i}: {_ingress_url(machine['machine_id'])}")
         print("\n🎯 Try to exploit each machine and capture the flag!")
     else:
         print("\n✗ No machines generated")
@@ -7,7 +7,9 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any
 import sys
 import os
+import hashlib
 import importlib
+import inspect
 
 # Add paths for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +17,17 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 from base import MachineConfig
+from blueprint_registry import get_blueprint_registry
+from render_cache import get_render_cache
+from templates import theme_library
+
+BLUEPRINTS_DIR = os.path.join(parent_dir, "blueprints")
+
+# Repository for shared toolset images; tags are content hashes of the base Dockerfile
+BASE_IMAGE_REPOSITORY = "hackforge-base"
+
+# (compiled variant page, theme id) -> page with the theme's slots folded in
+_themed_pages: Dict[Any, Any] = {}
 
 
 class BaseTemplate(ABC):
@@ -22,6 +35,9 @@ class BaseTemplate(ABC):
     Abstract base class for all templates
     """
 
+    # Compiled challenge page per variant (see templates/compiled_template.py)
+    PAGES: Dict[str, Any] = {}
+
     def __init__(self, config: MachineConfig):
         self.config = config
         self.machine_id = config.machine_id
@@ -33,11 +49,62 @@ class BaseTemplate(ABC):
         """Generate the vulnerable application code"""
         pass
 
+    def render_variant_page(self) -> str:
+        """Fill the compiled page for this machine's variant (unknown variants use the first page)"""
+        page = self.PAGES.get(self.variant) or next(iter(self.PAGES.values()))
+
+        # Theme slots are the same for every machine with this theme; fold them in once
+        themed_page = _themed_pages.get((page, self.theme_name))
+        if themed_page is None:
+            themed_page = page.bind(
+                theme_name=self.theme['name'],
+                theme_stylesheet=theme_library.ThemeLibrary.stylesheet_link(self.theme_name),
+                placeholder=self.theme.get('placeholder', 'Enter input'),
+                button_text=self.theme.get('button_text', 'Submit'),
+            )
+            _themed_pages[(page, self.theme_name)] = themed_page
+
+        filter_code = self._generate_filter_code(self.config.constraints.get('filters', []), 'php')
+        return themed_page.render({
+            'machine_id': self.machine_id,
+            'difficulty': str(self.difficulty),
+            'context': str(self.config.application.get('context', 'default')),
+            'filter_code': filter_code or '// No filters',
+        })
+
     @abstractmethod
     def generate_dockerfile(self) -> str:
-        """Generate Dockerfile for the application"""
+        """
+        Generate the toolset Dockerfile for this vulnerability category
+
+        It contains nothing machine-specific, so it is built once as a
+        shared base image (see generate_machine_dockerfile)
+        """
         pass
 
+    def get_base_image(self) -> str:
+        """Content-addressed tag of the base image built from generate_dockerfile()"""
+        digest = hashlib.sha256(self.generate_dockerfile().encode()).hexdigest()[:12]
+        return f"{BASE_IMAGE_REPOSITORY}:{digest}"
+
+    def generate_machine_dockerfile(self) -> str:
+        """Per-machine Dockerfile: the cached base image plus this machine's app and flag"""
+        return f"""FROM {self.get_base_image()}
+
+COPY app/ /var/www/html/
+COPY flag.txt {self.get_flag_location()}
+
+EXPOSE 80
+"""
+
+    def get_flag_location(self) -> str:
+        """Absolute flag path inside the container"""
+        flag_location = self.config.flag.get('location', '/var/www/html/flag.txt')
+        flag_location = flag_location.replace(':', '_').replace('//', '/')
+        if not flag_location.startswith('/'):
+            flag_location = '/' + flag_location
+        return flag_location
+
     def generate_docker_compose(self, port: int) -> str:
         """Generate docker-compose.yml entry"""
         flag_location = self.config.flag.get('location', '/var/www/html/flag.txt')
@@ -70,10 +137,13 @@ class TemplateRenderer:
     Factory class for rendering templates based on vulnerability type
     """
 
+    # Resolved template classes, memoized per category
+    _template_classes: Dict[str, type] = {}
+
     @staticmethod
     def _get_category_from_blueprint(blueprint_id: str) -> str:
         """
-        Load blueprint and extract category
+        Look up a blueprint's category in the shared blueprint registry
         
         Args:
             blueprint_id: Blueprint identifier (e.g., 'xss_001')
@@ -81,24 +151,10 @@ class TemplateRenderer:
         Returns:
             Category name (e.g., 'cross_site_scripting')
         """
-        import yaml
-        from pathlib import Path
-        
-        # Look for blueprint file in blueprints directory
-        blueprints_dir = Path(parent_dir) / "blueprints"
-        
-        # Try to find blueprint by ID
-        for blueprint_file in blueprints_dir.glob("*_blueprint.yaml"):
-            try:
-                with open(blueprint_file, 'r') as f:
-                    data = yaml.safe_load(f)
-                    if data.get('blueprint_id') == blueprint_id:
-                        return data.get('category')
-            except Exception as e:
-                continue
+        category = get_blueprint_registry(BLUEPRINTS_DIR).get_category(blueprint_id)
         
         # If not found, return blueprint_id as fallback
-        return blueprint_id
+        return category or blueprint_id
 
     @staticmethod
     def get_template_class(config: MachineConfig):
@@ -115,6 +171,17 @@ class TemplateRenderer:
         # Get category from blueprint
         category = TemplateRenderer._get_category_from_blueprint(config.blueprint_id)
         
+        template_class = TemplateRenderer._template_classes.get(category)
+        if template_class is None:
+            template_class = TemplateRenderer._load_template_class(category)
+            TemplateRenderer._template_classes[category] = template_class
+        
+        return template_class
+
+    @staticmethod
+    def _load_template_class(category: str):
+        """Import the template module for a category and return its class"""
+        
         # Convert category to template module name
         # e.g., 'cross_site_scripting' -> 'cross_site_scripting_templates'
         template_module_name = f"{category}_templates"
@@ -147,25 +214,62 @@ class TemplateRenderer:
                 f"Error: {e}"
             )
 
+    @staticmethod
+    def clear_cache():
+        """Forget memoized template classes (e.g. after regenerating a template module)"""
+        TemplateRenderer._template_classes.clear()
+
+    @staticmethod
+    def reload_category(category: str):
+        """Re-import one category's template module after it was regenerated"""
+        TemplateRenderer._template_classes.pop(category, None)
+        module = sys.modules.get(f"templates.{category}_templates")
+        if module is not None:
+            importlib.reload(module)
+
     @staticmethod
     def render(config: MachineConfig) -> Dict[str, str]:
         """
-        Render machine config to code
+        Render machine config to code, reusing cached output for unchanged inputs
 
         Args:
             config: MachineConfig object
 
         Returns:
-            Dict with 'code', 'dockerfile', 'docker_compose', 'flag', 'hints'
+            Dict with 'code', 'dockerfile', 'base_dockerfile', 'base_image',
+            'docker_compose', 'flag', 'hints', 'theme'
         """
 
         template_class = TemplateRenderer.get_template_class(config)
+
+        cache = get_render_cache()
+        if cache is None:
+            return TemplateRenderer._render_with(template_class, config)
+
+        theme_name, _ = theme_library.ThemeLibrary.theme_for(config)
+        key = cache.key(
+            [inspect.getsourcefile(template_class), __file__, theme_library.__file__],
+            config.to_dict(),
+            theme_name
+        )
+
+        rendered = cache.get(key)
+        if rendered is None:
+            rendered = TemplateRenderer._render_with(template_class, config)
+            cache.put(key, rendered)
+        return rendered
+
+    @staticmethod
+    def _render_with(template_class, config: MachineConfig) -> Dict[str, str]:
         template = template_class(config)
 
         return {
             'code': template.generate_code(),
-            'dockerfile': template.generate_dockerfile(),
+            'dockerfile': template.generate_machine_dockerfile(),
+            'base_dockerfile': template.generate_dockerfile(),
+            'base_image': template.get_base_image(),
             'docker_compose': template.generate_docker_compose(8080),
             'flag': template.get_flag_content(),
             'hints': template.get_hints(),
+            'theme': getattr(template, 'theme_name', None),
         }
@@ -0,0 +1,130 @@
+"""
+Compiled Templates
+Page skeletons split once into static fragments and slots, filled by substitution
+"""
+
+from string import Formatter
+from typing import Dict, Iterable, List, Tuple
+
+
+class CompiledTemplate:
+    """
+    A template source parsed into static fragments and named slots
+
+    Uses str.format syntax ("{slot}", with "{{" / "}}" for literal braces).
+    Slots given as keyword arguments at compile time are folded into the
+    static fragments. The remaining slots are filled by a generated function
+    that joins constant fragments with the per-machine values.
+    """
+
+    __slots__ = ('fragments', 'slots', '_render')
+
+    def __init__(self, source: str = None, _parts: Tuple[Tuple[str, ...], Tuple[str, ...]] = None, **static):
+        if _parts is None:
+            fragments, slots = self._parse(source)
+        else:
+            fragments, slots = _parts
+
+        if static:
+            fragments, slots = self._fold(fragments, slots, static)
+
+        self.fragments: Tuple[str, ...] = fragments
+        self.slots: Tuple[str, ...] = slots
+        self._render = self._compile(fragments, slots)
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Fill every slot; raises KeyError for a missing value"""
+        return self._render(values)
+
+    def bind(self, **static) -> 'CompiledTemplate':
+        """New template with more slots folded into the static fragments"""
+        return CompiledTemplate(_parts=(self.fragments, self.slots), **static)
+
+    @staticmethod
+    def _parse(source: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        fragments: List[str] = []
+        slots: List[str] = []
+        literal = []
+
+        for text, field, spec, conversion in Formatter().parse(source):
+            literal.append(text)
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f"Format specs are not supported in compiled templates: {{{field}}}")
+            fragments.append(''.join(literal))
+            slots.append(field)
+            literal = []
+
+        fragments.append(''.join(literal))
+        return tuple(fragments), tuple(slots)
+
+    @staticmethod
+    def _fold(fragments, slots, static: Dict) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        new_fragments = [fragments[0]]
+        new_slots = []
+        for slot, fragment in zip(slots, fragments[1:]):
+            if slot in static:
+                new_fragments[-1] += str(static[slot]) + fragment
+            else:
+                new_slots.append(slot)
+                new_fragments.append(fragment)
+        return tuple(new_fragments), tuple(new_slots)
+
+    @staticmethod
+    def _compile(fragments, slots):
+        # ''.join over a tuple of constants and dict lookups, built once
+        parts = [repr(fragments[0])]
+        for slot, fragment in zip(slots, fragments[1:]):
+            parts.append(f"values[{slot!r}]")
+            parts.append(repr(fragment))
+        return eval(f"lambda values: ''.join(({', '.join(parts)},))", {})
+
+
+# Challenge page shared by every category; {variant} is bound at compile time
+VARIANT_PAGE = '''<?php
+/**
+ * Hackforge Machine: {machine_id}
+ * Vulnerability: {variant}
+ * Theme: {theme_name}
+ * Difficulty: {difficulty}/5
+ */
+?>
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{variant} Challenge</title>
+    {theme_stylesheet}
+</head>
+<body>
+    <div class="container">
+        <h1>{variant}</h1>
+        <p>Context: {context}</p>
+
+        <form method="GET">
+            <input type="text" name="input" placeholder="{placeholder}">
+            <button type="submit">{button_text}</button>
+        </form>
+
+        <?php
+        if (isset($_GET['input'])) {{
+            $input = $_GET['input'];
+            {filter_code}
+            echo '<div class="result">';
+            echo '<h3>Results:</h3>';
+            echo '<div>' . $input . '</div>';
+            echo '</div>';
+        }}
+        ?>
+
+        <div class="hint">
+            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
+        </div>
+    </div>
+</body>
+</html>'''
+
+
+def compile_variant_pages(variants: Iterable[str], source: str = VARIANT_PAGE) -> Dict[str, CompiledTemplate]:
+    """Compile a page per variant, in order (the first one is the fallback)"""
+    return {variant: CompiledTemplate(source, variant=variant) for variant in variants}
@@ -10,6 +10,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 from templates.base_template import BaseTemplate
+from templates.compiled_template import compile_variant_pages
 from templates.theme_library import ThemeLibrary  # ← THEME SUPPORT
 from typing import Dict
 
@@ -19,218 +20,22 @@ class CrossSiteScriptingTemplate(BaseTemplate):
     Template generator for cross-site scripting vulnerabilities
     """
 
+    # Challenge page per variant, compiled once at import (the first is the fallback)
+    PAGES = compile_variant_pages([
+        "Reflected XSS",
+        "Stored XSS",
+        "DOM-based XSS"
+    ])
+
     def __init__(self, config):
         super().__init__(config)
-        # Pick random theme for this machine
-        self.theme_name, self.theme = ThemeLibrary.get_random_theme()
+        # Theme comes from the config (or its seed), so rendering is deterministic
+        self.theme_name, self.theme = ThemeLibrary.theme_for(config)
         print(f"  🎨 Theme: {self.theme['name']}")
 
     def generate_code(self) -> str:
         """Generate vulnerable application based on variant"""
-
-        variant = self.config.variant
-
-        if variant == "Reflected XSS":
-            return self._generate_reflected_xss()
-        elif variant == "Stored XSS":
-            return self._generate_stored_xss()
-        elif variant == "DOM-based XSS":
-            return self._generate_dom_based_xss()
-        else:
-            return self._generate_reflected_xss()
-
-    def _generate_reflected_xss(self) -> str:
-        """Generate Reflected XSS vulnerable application with themed UI"""
-
-        app = self.config.application
-        constraints = self.config.constraints
-
-        context = app.get('context', 'default')
-        filters = constraints.get('filters', [])
-
-        filter_code = self._generate_filter_code(filters, 'php')
-
-        # Get theme CSS and properties
-        theme_css = self.theme['css']
-        fonts_import = self.theme.get('fonts_import', '')
-        placeholder = self.theme.get('placeholder', 'Enter input')
-        button_text = self.theme.get('button_text', 'Submit')
-
-        php_code = f'''<?php
-/**
- * Hackforge Machine: {self.machine_id}
- * Vulnerability: Reflected XSS
- * Theme: {self.theme['name']}
- * Difficulty: {self.difficulty}/5
- */
-?>
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Reflected XSS Challenge</title>
-    {fonts_import}
-    <style>
-{theme_css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Reflected XSS</h1>
-        <p>Context: {context}</p>
-
-        <form method="GET">
-            <input type="text" name="input" placeholder="{placeholder}">
-            <button type="submit">{button_text}</button>
-        </form>
-
-        <?php
-        if (isset($_GET['input'])) {{
-            $input = $_GET['input'];
-            {filter_code if filter_code else '// No filters'}
-            echo '<div class="result">';
-            echo '<h3>Results:</h3>';
-            echo '<div>' . $input . '</div>';
-            echo '</div>';
-        }}
-        ?>
-
-        <div class="hint">
-            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
-        </div>
-    </div>
-</body>
-</html>'''
-
-        return php_code
-
-    def _generate_stored_xss(self) -> str:
-        """Generate Stored XSS vulnerable application with themed UI"""
-
-        app = self.config.application
-        constraints = self.config.constraints
-
-        context = app.get('context', 'default')
-        filters = constraints.get('filters', [])
-
-        filter_code = self._generate_filter_code(filters, 'php')
-
-        # Get theme CSS and properties
-        theme_css = self.theme['css']
-        fonts_import = self.theme.get('fonts_import', '')
-        placeholder = self.theme.get('placeholder', 'Enter input')
-        button_text = self.theme.get('button_text', 'Submit')
-
-        php_code = f'''<?php
-/**
- * Hackforge Machine: {self.machine_id}
- * Vulnerability: Stored XSS
- * Theme: {self.theme['name']}
- * Difficulty: {self.difficulty}/5
- */
-?>
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Stored XSS Challenge</title>
-    {fonts_import}
-    <style>
-{theme_css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Stored XSS</h1>
-        <p>Context: {context}</p>
-
-        <form method="GET">
-            <input type="text" name="input" placeholder="{placeholder}">
-            <button type="submit">{button_text}</button>
-        </form>
-
-        <?php
-        if (isset($_GET['input'])) {{
-            $input = $_GET['input'];
-            {filter_code if filter_code else '// No filters'}
-            echo '<div class="result">';
-            echo '<h3>Results:</h3>';
-            echo '<div>' . $input . '</div>';
-            echo '</div>';
-        }}
-        ?>
-
-        <div class="hint">
-            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
-        </div>
-    </div>
-</body>
-</html>'''
-
-        return php_code
-
-    def _generate_dom_based_xss(self) -> str:
-        """Generate DOM-based XSS vulnerable application with themed UI"""
-
-        app = self.config.application
-        constraints = self.config.constraints
-
-        context = app.get('context', 'default')
-        filters = constraints.get('filters', [])
-
-        filter_code = self._generate_filter_code(filters, 'php')
-
-        # Get theme CSS and properties
-        theme_css = self.theme['css']
-        fonts_import = self.theme.get('fonts_import', '')
-        placeholder = self.theme.get('placeholder', 'Enter input')
-        button_text = self.theme.get('button_text', 'Submit')
-
-        php_code = f'''<?php
-/**
- * Hackforge Machine: {self.machine_id}
- * Vulnerability: DOM-based XSS
- * Theme: {self.theme['name']}
- * Difficulty: {self.difficulty}/5
- */
-?>
-<!DOCTYPE html>
-<html>
-<head>
-    <title>DOM-based XSS Challenge</title>
-    {fonts_import}
-    <style>
-{theme_css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>DOM-based XSS</h1>
-        <p>Context: {context}</p>
-
-        <form method="GET">
-            <input type="text" name="input" placeholder="{placeholder}">
-            <button type="submit">{button_text}</button>
-        </form>
-
-        <?php
-        if (isset($_GET['input'])) {{
-            $input = $_GET['input'];
-            {filter_code if filter_code else '// No filters'}
-            echo '<div class="result">';
-            echo '<h3>Results:</h3>';
-            echo '<div>' . $input . '</div>';
-            echo '</div>';
-        }}
-        ?>
-
-        <div class="hint">
-            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
-        </div>
-    </div>
-</body>
-</html>'''
-
-        return php_code
-
+        return self.render_variant_page()
 
     def _generate_filter_code(self, filters: list, language: str) -> str:
         """Generate filter code from filter list"""
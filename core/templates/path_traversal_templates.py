@@ -10,6 +10,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 from templates.base_template import BaseTemplate
+from templates.compiled_template import compile_variant_pages
 from templates.theme_library import ThemeLibrary  # ← THEME SUPPORT
 from typing import Dict
 
@@ -19,152 +20,21 @@ class PathTraversalTemplate(BaseTemplate):
     Template generator for path traversal vulnerabilities
     """
 
+    # Challenge page per variant, compiled once at import (the first is the fallback)
+    PAGES = compile_variant_pages([
+        "Basic Path Traversal",
+        "Encoded Path Traversal"
+    ])
+
     def __init__(self, config):
         super().__init__(config)
-        # Pick random theme for this machine
-        self.theme_name, self.theme = ThemeLibrary.get_random_theme()
+        # Theme comes from the config (or its seed), so rendering is deterministic
+        self.theme_name, self.theme = ThemeLibrary.theme_for(config)
         print(f"  🎨 Theme: {self.theme['name']}")
 
     def generate_code(self) -> str:
         """Generate vulnerable application based on variant"""
-
-        variant = self.config.variant
-
-        if variant == "Basic Path Traversal":
-            return self._generate_basic_path_traversal()
-        elif variant == "Encoded Path Traversal":
-            return self._generate_encoded_path_traversal()
-        else:
-            return self._generate_basic_path_traversal()
-
-    def _generate_basic_path_traversal(self) -> str:
-        """Generate Basic Path Traversal vulnerable application with themed UI"""
-
-        app = self.config.application
-        constraints = self.config.constraints
-
-        context = app.get('context', 'default')
-        filters = constraints.get('filters', [])
-
-        filter_code = self._generate_filter_code(filters, 'php')
-
-        # Get theme CSS and properties
-        theme_css = self.theme['css']
-        fonts_import = self.theme.get('fonts_import', '')
-        placeholder = self.theme.get('placeholder', 'Enter input')
-        button_text = self.theme.get('button_text', 'Submit')
-
-        php_code = f'''<?php
-/**
- * Hackforge Machine: {self.machine_id}
- * Vulnerability: Basic Path Traversal
- * Theme: {self.theme['name']}
- * Difficulty: {self.difficulty}/5
- */
-?>
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Basic Path Traversal Challenge</title>
-    {fonts_import}
-    <style>
-{theme_css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Basic Path Traversal</h1>
-        <p>Context: {context}</p>
-
-        <form method="GET">
-            <input type="text" name="input" placeholder="{placeholder}">
-            <button type="submit">{button_text}</button>
-        </form>
-
-        <?php
-        if (isset($_GET['input'])) {{
-            $input = $_GET['input'];
-            {filter_code if filter_code else '// No filters'}
-            echo '<div class="result">';
-            echo '<h3>Results:</h3>';
-            echo '<div>' . $input . '</div>';
-            echo '</div>';
-        }}
-        ?>
-
-        <div class="hint">
-            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
-        </div>
-    </div>
-</body>
-</html>'''
-
-        return php_code
-
-    def _generate_encoded_path_traversal(self) -> str:
-        """Generate Encoded Path Traversal vulnerable application with themed UI"""
-
-        app = self.config.application
-        constraints = self.config.constraints
-
-        context = app.get('context', 'default')
-        filters = constraints.get('filters', [])
-
-        filter_code = self._generate_filter_code(filters, 'php')
-
-        # Get theme CSS and properties
-        theme_css = self.theme['css']
-        fonts_import = self.theme.get('fonts_import', '')
-        placeholder = self.theme.get('placeholder', 'Enter input')
-        button_text = self.theme.get('button_text', 'Submit')
-
-        php_code = f'''<?php
-/**
- * Hackforge Machine: {self.machine_id}
- * Vulnerability: Encoded Path Traversal
- * Theme: {self.theme['name']}
- * Difficulty: {self.difficulty}/5
- */
-?>
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Encoded Path Traversal Challenge</title>
-    {fonts_import}
-    <style>
-{theme_css}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Encoded Path Traversal</h1>
-        <p>Context: {context}</p>
-
-        <form method="GET">
-            <input type="text" name="input" placeholder="{placeholder}">
-            <button type="submit">{button_text}</button>
-        </form>
-
-        <?php
-        if (isset($_GET['input'])) {{
-            $input = $_GET['input'];
-            {filter_code if filter_code else '// No filters'}
-            echo '<div class="result">';
-            echo '<h3>Results:</h3>';
-            echo '<div>' . $input . '</div>';
-            echo '</div>';
-        }}
-        ?>
-
-        <div class="hint">
-            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
-        </div>
-    </div>
-</body>
-</html>'''
-
-        return php_code
-
+        return self.render_variant_page()
 
     def _generate_filter_code(self, filters: list, language: str) -> str:
         """Generate filter code from filter list"""
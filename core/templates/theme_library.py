@@ -3,13 +3,21 @@ Complete Theme Library with Integration Guide
 Save as: core/templates/theme_library.py
 """
 
+import hashlib
 import random
+import re
+from pathlib import Path
+
+
+# Directory (relative to the app root) holding pre-rendered theme stylesheets
+THEME_ASSETS_DIR = "assets"
 
 
 class ThemeLibrary:
     """
     Centralized theme library for generating diverse UIs
-    Each machine randomly picks a theme for unique appearance
+    Each machine's theme is derived from its seed, so re-rendering a config
+    always produces the same UI
     """
     
     THEMES = {
@@ -817,11 +825,67 @@ button:hover {
         }
     }
     
+    # theme_id -> (asset filename, stylesheet), rendered once per process
+    _stylesheets = {}
+
     @classmethod
     def get_random_theme(cls):
         """Get a random theme"""
         theme_name = random.choice(list(cls.THEMES.keys()))
         return theme_name, cls.THEMES[theme_name]
+
+    @classmethod
+    def select_theme(cls, seed: str) -> str:
+        """Theme id derived from a machine seed"""
+        names = sorted(cls.THEMES)
+        digest = hashlib.sha256(f"{seed}_theme".encode()).hexdigest()
+        return names[int(digest, 16) % len(names)]
+
+    @classmethod
+    def theme_for(cls, config):
+        """Theme recorded in a machine config, or the one its seed selects"""
+        theme_name = getattr(config, 'theme', None)
+        if theme_name not in cls.THEMES:
+            theme_name = cls.select_theme(config.seed)
+        return theme_name, cls.THEMES[theme_name]
+
+    @classmethod
+    def stylesheet(cls, theme_id):
+        """
+        Pre-rendered stylesheet for a theme as (filename, content)
+
+        The font import becomes an @import at the top of the stylesheet. The
+        filename carries a content hash, so it can be cached indefinitely.
+        """
+        cached = cls._stylesheets.get(theme_id)
+        if cached is None:
+            theme = cls.get_theme(theme_id)
+            content = theme['css'].strip() + "\n"
+
+            font_url = re.search(r'href="([^"]+)"', theme.get('fonts_import', ''))
+            if font_url:
+                content = f'@import url("{font_url.group(1)}");\n\n' + content
+
+            digest = hashlib.sha256(content.encode()).hexdigest()[:10]
+            cached = (f"theme-{theme_id}-{digest}.css", content)
+            cls._stylesheets[theme_id] = cached
+        return cached
+
+    @classmethod
+    def stylesheet_link(cls, theme_id):
+        """<link> tag referencing a theme's stylesheet asset"""
+        filename, _ = cls.stylesheet(theme_id)
+        return f'<link rel="stylesheet" href="{THEME_ASSETS_DIR}/{filename}">'
+
+    @classmethod
+    def write_stylesheet(cls, theme_id, app_dir) -> Path:
+        """Write a theme's stylesheet asset into an app directory"""
+        filename, content = cls.stylesheet(theme_id)
+        asset = Path(app_dir) / THEME_ASSETS_DIR / filename
+        if not asset.exists():
+            asset.parent.mkdir(parents=True, exist_ok=True)
+            asset.write_text(content)
+        return asset
     
     @classmethod
     def get_theme(cls, name):
@@ -855,6 +919,7 @@ button:hover {
             })
         """
         cls.THEMES[theme_id] = theme_config
+        cls._stylesheets.pop(theme_id, None)
         print(f"✓ Added custom theme: {theme_config['name']}")
 
 
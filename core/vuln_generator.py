@@ -4,10 +4,12 @@ Replace your existing core/vuln_generator.py with this version
 """
 
 #!/usr/bin/env python3
+import hashlib
 import json
 import os
 import sys
 from pathlib import Path
+from typing import Dict, List
 
 
 class VulnerabilityGenerator:
@@ -20,37 +22,72 @@ class VulnerabilityGenerator:
         self.vuln_name = self.config['name']
         self.category = self.config['category']
 
-    def generate_all(self, base_dir: str = "."):
-        """Generate all three components in their respective directories"""
+    def generate_all(self, base_dir: str = ".", force: bool = False) -> Dict:
+        """
+        Generate all three components in their respective directories
 
-        # Create directories if they don't exist
-        blueprint_dir = os.path.join(base_dir, "blueprints")
-        mutation_dir = os.path.join(base_dir, "mutations")
-        template_dir = os.path.join(base_dir, "templates")
+        Outputs whose content is unchanged are left untouched (same mtime, no
+        reimport downstream). If the config digest matches the last run and no
+        output was modified since, nothing is rendered at all. Pass force=True
+        to rewrite every file.
 
-        os.makedirs(blueprint_dir, exist_ok=True)
-        os.makedirs(mutation_dir, exist_ok=True)
-        os.makedirs(template_dir, exist_ok=True)
+        Returns the config digest and the artifacts that changed / did not.
+        """
 
         # Use category for all filenames for consistency
-        blueprint_path = os.path.join(blueprint_dir, f"{self.category}_blueprint.yaml")
-        mutation_path = os.path.join(mutation_dir, f"{self.category}_mutation.py")
-        template_path = os.path.join(template_dir, f"{self.category}_templates.py")
-
-        with open(blueprint_path, 'w') as f:
-            f.write(self.generate_blueprint())
-
-        with open(mutation_path, 'w') as f:
-            f.write(self.generate_mutation())
-
-        with open(template_path, 'w') as f:
-            f.write(self.generate_template())
-
-        print(f"✅ Blueprint: {blueprint_path}")
-        print(f"✅ Mutation:  {mutation_path}")
-        print(f"✅ Template:  {template_path}")
+        paths = {
+            'blueprint': os.path.join(base_dir, "blueprints", f"{self.category}_blueprint.yaml"),
+            'mutation': os.path.join(base_dir, "mutations", f"{self.category}_mutation.py"),
+            'template': os.path.join(base_dir, "templates", f"{self.category}_templates.py"),
+        }
+        renderers = {
+            'blueprint': self.generate_blueprint,
+            'mutation': self.generate_mutation,
+            'template': self.generate_template,
+        }
+
+        digest = self.config_digest()
+        manifest_path = os.path.join(base_dir, MANIFEST_FILE)
+        manifest = _read_manifest(manifest_path)
+        previous = manifest.get(self.category, {})
+
+        changed, unchanged = [], []
+        if not force and previous.get('digest') == digest and _outputs_match(previous.get('outputs', {}), paths):
+            unchanged = list(paths)
+        else:
+            for name, path in paths.items():
+                # Create directories if they don't exist
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if _write_atomic(path, renderers[name](), force):
+                    changed.append(name)
+                else:
+                    unchanged.append(name)
+
+            manifest[self.category] = {'digest': digest, 'outputs': _output_stats(paths)}
+            _write_manifest(manifest_path, manifest)
+
+        labels = {'blueprint': "Blueprint:", 'mutation': "Mutation: ", 'template': "Template: "}
+        for name, path in paths.items():
+            mark = "✅" if name in changed else "= "
+            print(f"{mark} {labels[name]} {path}{'' if name in changed else ' (unchanged)'}")
         print(f"\n💡 All files use category '{self.category}' for consistency")
 
+        return {
+            'category': self.category,
+            'digest': digest,
+            'changed': changed,
+            'unchanged': unchanged,
+            'files': paths,
+        }
+
+    def config_digest(self) -> str:
+        """Digest of the input config and of this generator's own source"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(self.config, sort_keys=True).encode())
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
     def generate_blueprint(self) -> str:
         """Generate blueprint YAML content"""
 
@@ -179,11 +216,8 @@ class {class_name}(MutationEngine):
         class_name = self._to_class_name(self.vuln_name) + "Template"
         variants = self.config.get('variants', [])
 
-        # Generate variant template methods
-        variant_templates = []
-        for variant in variants:
-            method_name = self._to_method_name(variant)
-            variant_templates.append(self._generate_template_method(variant, method_name))
+        # Variant pages are compiled from the shared skeleton at import
+        variant_pages = ',\n'.join(f'        "{variant}"' for variant in variants)
 
         template_code = f'''"""
 {self.vuln_name} Vulnerability Templates
@@ -197,6 +231,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 from templates.base_template import BaseTemplate
+from templates.compiled_template import compile_variant_pages
 from templates.theme_library import ThemeLibrary  # ← THEME SUPPORT
 from typing import Dict
 
@@ -206,20 +241,20 @@ class {class_name}(BaseTemplate):
     Template generator for {self.vuln_name.lower()} vulnerabilities
     """
 
+    # Challenge page per variant, compiled once at import (the first is the fallback)
+    PAGES = compile_variant_pages([
+{variant_pages}
+    ])
+
     def __init__(self, config):
         super().__init__(config)
-        # Pick random theme for this machine
-        self.theme_name, self.theme = ThemeLibrary.get_random_theme()
+        # Theme comes from the config (or its seed), so rendering is deterministic
+        self.theme_name, self.theme = ThemeLibrary.theme_for(config)
         print(f"  🎨 Theme: {{self.theme['name']}}")
 
     def generate_code(self) -> str:
         """Generate vulnerable application based on variant"""
-
-        variant = self.config.variant
-
-{self._generate_template_dispatch(variants)}
-
-{chr(10).join(variant_templates)}
+        return self.render_variant_page()
 
     def _generate_filter_code(self, filters: list, language: str) -> str:
         """Generate filter code from filter list"""
@@ -295,20 +330,6 @@ CMD ["apache2-foreground"]
         lines.append(f'            config = self.{self._to_method_name(variants[0])}(blueprint, difficulty)')
         return '\n'.join(lines)
 
-    def _generate_template_dispatch(self, variants: list) -> str:
-        """Generate if-elif chain for template dispatch"""
-        lines = []
-        for i, variant in enumerate(variants):
-            method_name = self._to_method_name(variant)
-            if i == 0:
-                lines.append(f'        if variant == "{variant}":')
-            else:
-                lines.append(f'        elif variant == "{variant}":')
-            lines.append(f'            return self.{method_name}()')
-        lines.append('        else:')
-        lines.append(f'            return self.{self._to_method_name(variants[0])}()')
-        return '\n'.join(lines)
-
     def _generate_variant_method(self, variant: str, method_name: str) -> str:
         """Generate a variant mutation method"""
 
@@ -407,76 +428,6 @@ CMD ["apache2-foreground"]
 '''
 
 
-    def _generate_template_method(self, variant: str, method_name: str) -> str:
-        """Generate a variant template method WITH THEME SUPPORT"""
-
-        # This generates themed HTML templates
-        # FIXED: Use proper brace escaping for multi-level string generation
-        return f'''    def {method_name}(self) -> str:
-        """Generate {variant} vulnerable application with themed UI"""
-
-        app = self.config.application
-        constraints = self.config.constraints
-
-        context = app.get('context', 'default')
-        filters = constraints.get('filters', [])
-
-        filter_code = self._generate_filter_code(filters, 'php')
-
-        # Get theme CSS and properties
-        theme_css = self.theme['css']
-        fonts_import = self.theme.get('fonts_import', '')
-        placeholder = self.theme.get('placeholder', 'Enter input')
-        button_text = self.theme.get('button_text', 'Submit')
-
-        php_code = f\'\'\'<?php
-/**
- * Hackforge Machine: {{self.machine_id}}
- * Vulnerability: {variant}
- * Theme: {{self.theme['name']}}
- * Difficulty: {{self.difficulty}}/5
- */
-?>
-<!DOCTYPE html>
-<html>
-<head>
-    <title>{variant} Challenge</title>
-    {{fonts_import}}
-    <style>
-{{theme_css}}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>{variant}</h1>
-        <p>Context: {{context}}</p>
-
-        <form method="GET">
-            <input type="text" name="input" placeholder="{{placeholder}}">
-            <button type="submit">{{button_text}}</button>
-        </form>
-
-        <?php
-        if (isset($_GET['input'])) {{{{
-            $input = $_GET['input'];
-            {{filter_code if filter_code else '// No filters'}}
-            echo '<div class="result">';
-            echo '<h3>Results:</h3>';
-            echo '<div>' . $input . '</div>';
-            echo '</div>';
-        }}}}
-        ?>
-
-        <div class="hint">
-            <strong>💡 Hint:</strong> This is a {{context}} context. Can you find the vulnerability?
-        </div>
-    </div>
-</body>
-</html>\'\'\'
-
-        return php_code
-'''
-
     def _generate_filter_map(self) -> str:
         """Generate filter mapping code"""
         filters = self.config.get('mutation_axes', {}).get('filters', {})
@@ -496,15 +447,66 @@ CMD ["apache2-foreground"]
         return ',\n'.join(filter_entries) if filter_entries else "            # No filters defined"
 
 
+# Digest and output stats of the last run per category, kept next to the outputs
+MANIFEST_FILE = ".vuln_generator_manifest.json"
+
+
+def _write_atomic(path: str, content: str, force: bool = False) -> bool:
+    """Write via a temp file and rename, skipping identical content; returns True if written"""
+    if not force:
+        try:
+            with open(path, 'r') as f:
+                if f.read() == content:
+                    return False
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def _output_stats(paths: Dict[str, str]) -> Dict[str, List[int]]:
+    stats = {}
+    for name, path in paths.items():
+        stat = os.stat(path)
+        stats[name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def _outputs_match(recorded: Dict[str, List[int]], paths: Dict[str, str]) -> bool:
+    """True if every output still has the mtime and size recorded by the last run"""
+    try:
+        return recorded == _output_stats(paths)
+    except FileNotFoundError:
+        return False
+
+
+def _read_manifest(path: str) -> Dict:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(path: str, manifest: Dict):
+    _write_atomic(path, json.dumps(manifest, indent=2, sort_keys=True))
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python vuln_generator.py <config.json>")
+        print("Usage: python vuln_generator.py <config.json> [--force]")
         print("Example: python vuln_generator.py xss_config.json")
         sys.exit(1)
 
     config_path = sys.argv[1]
 
+    force = '--force' in sys.argv[2:]
+
     generator = VulnerabilityGenerator(config_path)
-    generator.generate_all(".")
+    generator.generate_all(".", force=force)
 
-    print(f"\n✨ Done! Templates will now use random themes for variety!")
+    print(f"\n✨ Done! Each machine's theme is derived from its seed.")
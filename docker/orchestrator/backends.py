@@ -0,0 +1,521 @@
+"""
+Orchestrator Backends
+Lifecycle operations on generated compose projects, either through the Docker
+Engine API or by running docker-compose
+"""
+
+import json
+import subprocess
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from container_inventory import MACHINE_LABEL, CONTAINER_NAME_PREFIX
+from lifecycle import LifecycleExecutor
+from warm_pool import MACHINE_IMAGE_REPOSITORY
+
+
+# Project directory a container was created from (SDK backend)
+PROJECT_LABEL = "hackforge.project"
+
+COMPOSE_TIMEOUT = 300
+
+
+class ServiceSpec:
+    """One service of a generated docker-compose.yml, resolved against its project directory"""
+
+    __slots__ = ('machine_id', 'container_name', 'build_context', 'ports', 'volumes',
+                 'environment', 'labels', 'restart_policy', 'networks')
+
+    def __init__(self, machine_id: str, service: Dict, project_dir: Path, network_names: Dict[str, str] = None):
+        build = service.get('build', '.')
+        if isinstance(build, dict):
+            build = build.get('context', '.')
+
+        self.machine_id = machine_id
+        self.container_name = service.get('container_name', f"{CONTAINER_NAME_PREFIX}{machine_id}")
+        self.build_context = str((project_dir / build).resolve())
+        self.ports = self._parse_ports(service.get('ports', []))
+        self.volumes = self._parse_volumes(service.get('volumes', []), project_dir)
+        self.environment = self._parse_pairs(service.get('environment', {}))
+        self.labels = self._parse_pairs(service.get('labels', {}))
+        self.labels.setdefault(MACHINE_LABEL, machine_id)
+        self.restart_policy = {'Name': service['restart']} if service.get('restart') else None
+        # Compose network keys resolved to Docker network names
+        self.networks = [(network_names or {}).get(key, key) for key in service.get('networks') or []]
+
+    @property
+    def image(self) -> str:
+        return f"{MACHINE_IMAGE_REPOSITORY}:{self.machine_id}"
+
+    @staticmethod
+    def _parse_ports(ports: List) -> Dict:
+        # "8080:80" -> {'80/tcp': 8080}, "127.0.0.1:8080:80" -> {'80/tcp': ('127.0.0.1', 8080)}
+        parsed = {}
+        for port in ports:
+            host, _, container = str(port).rpartition(':')
+            if '/' not in container:
+                container = f"{container}/tcp"
+            host_ip, _, host_port = host.rpartition(':')
+            if not host_port:
+                parsed[container] = None
+            elif host_ip:
+                parsed[container] = (host_ip, int(host_port))
+            else:
+                parsed[container] = int(host_port)
+        return parsed
+
+    @staticmethod
+    def _parse_volumes(volumes: List, project_dir: Path) -> Dict[str, Dict]:
+        # "./app:/var/www/html:ro" -> {'/abs/app': {'bind': '/var/www/html', 'mode': 'ro'}}
+        parsed = {}
+        for volume in volumes:
+            parts = str(volume).split(':')
+            source, target = parts[0], parts[1]
+            mode = parts[2] if len(parts) > 2 else 'rw'
+            if source.startswith('.') or '/' in source:
+                source = str((project_dir / source).resolve())
+            parsed[source] = {'bind': target, 'mode': mode}
+        return parsed
+
+    @staticmethod
+    def _parse_pairs(pairs) -> Dict[str, str]:
+        # Compose accepts both ["KEY=value"] and {KEY: value}
+        if isinstance(pairs, dict):
+            return {str(k): str(v) for k, v in pairs.items()}
+        parsed = {}
+        for pair in pairs:
+            key, _, value = str(pair).partition('=')
+            parsed[key] = value
+        return parsed
+
+
+def _load_compose(project_dir: Path) -> Dict:
+    with open(Path(project_dir) / "docker-compose.yml", 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def _network_names(compose: Dict) -> Dict[str, str]:
+    """Top-level compose network keys -> Docker network names"""
+    return {
+        str(key): str((network or {}).get('name', key))
+        for key, network in (compose.get('networks') or {}).items()
+    }
+
+
+def load_compose_services(project_dir: Path) -> Dict[str, ServiceSpec]:
+    """Services of a project's docker-compose.yml keyed by machine_id, in file order"""
+    project_dir = Path(project_dir)
+    compose = _load_compose(project_dir)
+    network_names = _network_names(compose)
+
+    return {
+        str(name): ServiceSpec(str(name), service or {}, project_dir, network_names)
+        for name, service in (compose.get('services') or {}).items()
+    }
+
+
+def external_networks(project_dir: Path) -> List[str]:
+    """Docker networks a project expects to exist already (shared across campaigns)"""
+    try:
+        compose = _load_compose(project_dir)
+    except FileNotFoundError:
+        return []
+    names = _network_names(compose)
+    return [
+        names[str(key)]
+        for key, network in (compose.get('networks') or {}).items()
+        if (network or {}).get('external')
+    ]
+
+
+def ensure_network(client, name: str):
+    """Create a bridge network unless one with this exact name exists"""
+    # networks.list() matches name prefixes
+    if not any(network.name == name for network in client.networks.list(names=[name])):
+        client.networks.create(name, driver="bridge")
+
+
+class OperationResult:
+    """Outcome of a lifecycle operation, with errors and timings per machine"""
+
+    __slots__ = ('action', 'machine_ids', 'errors', 'timings', 'elapsed', 'output')
+
+    def __init__(self, action: str, machine_ids: List[str] = None):
+        self.action = action
+        self.machine_ids: List[str] = list(machine_ids or [])
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.elapsed: Optional[float] = None
+        self.output = ""
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+    @property
+    def succeeded(self) -> List[str]:
+        return [m for m in self.machine_ids if m not in self.errors]
+
+    def fail(self, machine_id: str, error: str):
+        self.errors[machine_id] = error
+
+    def to_dict(self) -> Dict:
+        return {
+            'action': self.action,
+            'success': self.success,
+            'machine_ids': self.machine_ids,
+            'succeeded': self.succeeded,
+            'errors': dict(self.errors),
+            'timings': dict(self.timings),
+            'elapsed': self.elapsed,
+        }
+
+
+class OrchestratorBackend(ABC):
+    """
+    Lifecycle operations on the services of a compose project directory
+
+    Every operation targets the whole project, or only the given machine_ids
+    (compose service names are machine IDs).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def build(self, project_dir: Path, machine_ids: List[str] = None, no_cache: bool = False) -> OperationResult:
+        pass
+
+    @abstractmethod
+    def up(self, project_dir: Path, machine_ids: List[str] = None, build: bool = True) -> OperationResult:
+        pass
+
+    @abstractmethod
+    def stop(self, project_dir: Path, machine_ids: List[str] = None) -> OperationResult:
+        pass
+
+    @abstractmethod
+    def down(self, project_dir: Path, machine_ids: List[str] = None, remove_volumes: bool = False) -> OperationResult:
+        pass
+
+    @abstractmethod
+    def restart(self, project_dir: Path, machine_ids: List[str] = None) -> OperationResult:
+        pass
+
+    @abstractmethod
+    def ps(self, project_dir: Path, machine_ids: List[str] = None) -> List[Dict]:
+        """Containers in `docker-compose ps --format json` shape, plus machine_id"""
+        pass
+
+    @abstractmethod
+    def logs(self, project_dir: Path, machine_ids: List[str] = None, tail: int = 50) -> str:
+        pass
+
+
+class ComposeBackend(OrchestratorBackend):
+    """
+    Runs docker-compose in the project directory
+
+    One invocation per operation (compose parallelises services itself), so
+    failures and the timeout apply to the whole invocation.
+    """
+
+    name = "compose"
+
+    def __init__(self, timeout: int = COMPOSE_TIMEOUT):
+        self.timeout = timeout
+
+    def build(self, project_dir, machine_ids=None, no_cache=False):
+        args = ["build"] + (["--no-cache"] if no_cache else [])
+        return self._operation("build", project_dir, args, machine_ids)
+
+    def up(self, project_dir, machine_ids=None, build=True):
+        for network in external_networks(project_dir):
+            self._ensure_network(network)
+        args = ["up", "-d"] + (["--build"] if build else [])
+        return self._operation("up", project_dir, args, machine_ids)
+
+    def stop(self, project_dir, machine_ids=None):
+        return self._operation("stop", project_dir, ["stop"], machine_ids)
+
+    def down(self, project_dir, machine_ids=None, remove_volumes=False):
+        if machine_ids:
+            # `down` always takes the whole project; remove only the given services
+            args = ["rm", "-s", "-f"] + (["-v"] if remove_volumes else [])
+        else:
+            args = ["down"] + (["-v"] if remove_volumes else [])
+        return self._operation("down", project_dir, args, machine_ids)
+
+    def restart(self, project_dir, machine_ids=None):
+        return self._operation("restart", project_dir, ["restart"], machine_ids)
+
+    def ps(self, project_dir, machine_ids=None):
+        success, stdout, _ = self._compose(project_dir, ["ps", "--format", "json"] + list(machine_ids or []), 30)
+        if not success:
+            return []
+
+        containers = []
+        for line in stdout.strip().split('\n'):
+            if not line:
+                continue
+            try:
+                parsed = json.loads(line)
+            except json.JSONDecodeError:
+                return []
+            containers.extend(parsed if isinstance(parsed, list) else [parsed])
+
+        for container in containers:
+            container['machine_id'] = container.get('Service')
+        return containers
+
+    def logs(self, project_dir, machine_ids=None, tail=50):
+        _, stdout, stderr = self._compose(project_dir, ["logs", f"--tail={tail}"] + list(machine_ids or []))
+        return stdout or stderr
+
+    def _operation(self, action: str, project_dir: Path, args: List[str], machine_ids: List[str]) -> OperationResult:
+        result = OperationResult(action, machine_ids)
+        started = time.time()
+        success, stdout, stderr = self._compose(project_dir, args + list(machine_ids or []))
+        result.elapsed = round(time.time() - started, 2)
+        result.output = stdout + stderr
+        if not success:
+            # Compose reports one outcome for the whole invocation
+            for machine_id in machine_ids or ['*']:
+                result.fail(machine_id, stderr.strip() or f"docker-compose {action} failed")
+        return result
+
+    @staticmethod
+    def _ensure_network(name: str):
+        # Compose refuses to start services on a missing external network
+        inspect = subprocess.run(["docker", "network", "inspect", name], capture_output=True, text=True)
+        if inspect.returncode != 0:
+            subprocess.run(["docker", "network", "create", name], capture_output=True, text=True)
+
+    def _compose(self, project_dir: Path, args: List[str], timeout: int = None) -> Tuple[bool, str, str]:
+        if not (Path(project_dir) / "docker-compose.yml").exists():
+            return (False, "", f"No docker-compose.yml found in {project_dir}")
+        try:
+            result = subprocess.run(
+                ["docker-compose", *args],
+                cwd=str(project_dir),
+                capture_output=True,
+                text=True,
+                timeout=timeout or self.timeout
+            )
+            return (result.returncode == 0, result.stdout, result.stderr)
+        except subprocess.TimeoutExpired:
+            return (False, "", f"docker-compose timed out after {timeout or self.timeout}s")
+        except Exception as e:
+            return (False, "", str(e))
+
+
+class DockerSdkBackend(OrchestratorBackend):
+    """
+    Talks to the Docker Engine API through the orchestrator's shared client
+
+    Services are read from the project's docker-compose.yml and each one maps
+    to an image tagged hackforge-machine:<machine_id> and a labelled container.
+    Per-container operations run in parallel through a LifecycleExecutor.
+    """
+
+    name = "sdk"
+
+    def __init__(self, client_factory: Callable, executor: LifecycleExecutor = None):
+        self._client_factory = client_factory
+        self.executor = executor or LifecycleExecutor()
+
+    @property
+    def client(self):
+        return self._client_factory()
+
+    def build(self, project_dir, machine_ids=None, no_cache=False):
+        result, services = self._start("build", project_dir, machine_ids)
+        return self.executor.run(result, [
+            (spec.machine_id, lambda spec=spec: self._build_image(spec, no_cache))
+            for spec in services
+        ])
+
+    def up(self, project_dir, machine_ids=None, build=True):
+        result, services = self._start("up", project_dir, machine_ids)
+
+        # Create shared networks once, before containers race to join them
+        for network in {name for spec in services for name in spec.networks}:
+            try:
+                ensure_network(self.client, network)
+            except Exception as e:
+                result.fail('*', f"Could not create network {network}: {e}")
+                return result
+
+        return self.executor.run(result, [
+            (spec.machine_id, lambda spec=spec: self._up(spec, Path(project_dir), build))
+            for spec in services
+        ])
+
+    def stop(self, project_dir, machine_ids=None):
+        return self._each("stop", project_dir, machine_ids, lambda c, spec: c.stop())
+
+    def down(self, project_dir, machine_ids=None, remove_volumes=False):
+        return self._each("down", project_dir, machine_ids, lambda c, spec: c.remove(force=True, v=remove_volumes))
+
+    def restart(self, project_dir, machine_ids=None):
+        return self._each("restart", project_dir, machine_ids, lambda c, spec: c.restart(), missing_ok=False)
+
+    def ps(self, project_dir, machine_ids=None):
+        _, services = self._start("ps", project_dir, machine_ids)
+        containers = []
+        for spec in services:
+            container = self._container(spec)
+            if container is not None:
+                containers.append(self._describe(container, spec))
+        return containers
+
+    def logs(self, project_dir, machine_ids=None, tail=50):
+        _, services = self._start("logs", project_dir, machine_ids)
+        lines = []
+        for spec in services:
+            container = self._container(spec)
+            if container is None:
+                continue
+            for line in container.logs(tail=tail).decode(errors='replace').splitlines():
+                lines.append(f"{spec.container_name}  | {line}")
+        return '\n'.join(lines)
+
+    def _start(self, action: str, project_dir: Path, machine_ids: Optional[List[str]]):
+        """Result object plus the targeted services (unknown machine_ids are recorded as errors)"""
+        result = OperationResult(action, machine_ids)
+        try:
+            services = load_compose_services(project_dir)
+        except FileNotFoundError:
+            result.fail('*', f"No docker-compose.yml found in {project_dir}")
+            return result, []
+
+        if not machine_ids:
+            result.machine_ids = list(services)
+            return result, list(services.values())
+
+        targeted = []
+        for machine_id in machine_ids:
+            if machine_id in services:
+                targeted.append(services[machine_id])
+            else:
+                result.fail(machine_id, "No such service in docker-compose.yml")
+        return result, targeted
+
+    def _each(self, action: str, project_dir: Path, machine_ids, apply: Callable, missing_ok: bool = True):
+        result, services = self._start(action, project_dir, machine_ids)
+
+        def operation(spec: ServiceSpec):
+            container = self._container(spec)
+            if container is not None:
+                apply(container, spec)
+            elif not missing_ok:
+                raise RuntimeError("No container")
+
+        return self.executor.run(result, [
+            (spec.machine_id, lambda spec=spec: operation(spec))
+            for spec in services
+        ])
+
+    def _build_image(self, spec: ServiceSpec, no_cache: bool = False):
+        image, _ = self.client.images.build(
+            path=spec.build_context,
+            tag=spec.image,
+            rm=True,
+            nocache=no_cache,
+            labels={MACHINE_LABEL: spec.machine_id}
+        )
+        return image
+
+    def _up(self, spec: ServiceSpec, project_dir: Path, build: bool):
+        if build:
+            image_id = self._build_image(spec).id
+        else:
+            try:
+                image_id = self.client.images.get(spec.image).id
+            except Exception as e:
+                if getattr(e, 'status_code', None) != 404:
+                    raise
+                image_id = self._build_image(spec).id
+
+        container = self._container(spec)
+
+        # Like compose, recreate a container whose image was rebuilt
+        if container is not None and container.attrs.get('Image') != image_id:
+            container.remove(force=True)
+            container = None
+
+        if container is None:
+            container = self.client.containers.run(
+                image_id,
+                detach=True,
+                name=spec.container_name,
+                ports=spec.ports,
+                volumes=spec.volumes,
+                environment=spec.environment,
+                labels={**spec.labels, PROJECT_LABEL: str(project_dir.resolve())},
+                restart_policy=spec.restart_policy,
+                network=spec.networks[0] if spec.networks else None
+            )
+            for network in spec.networks[1:]:
+                self.client.networks.get(network).connect(container)
+        elif container.status != 'running':
+            container.start()
+
+    def _container(self, spec: ServiceSpec):
+        try:
+            return self.client.containers.get(spec.container_name)
+        except Exception as e:
+            if getattr(e, 'status_code', None) == 404:
+                return None
+            raise
+
+    @staticmethod
+    def _describe(container, spec: ServiceSpec) -> Dict:
+        attrs = container.attrs or {}
+        publishers = []
+        for target, bindings in (container.ports or {}).items():
+            port, _, protocol = target.partition('/')
+            for binding in bindings or []:
+                publishers.append({
+                    'URL': binding.get('HostIp', ''),
+                    'TargetPort': int(port),
+                    'PublishedPort': int(binding.get('HostPort') or 0),
+                    'Protocol': protocol or 'tcp',
+                })
+
+        return {
+            'ID': container.id,
+            'Name': container.name,
+            'Service': spec.machine_id,
+            'Image': attrs.get('Config', {}).get('Image', spec.image),
+            'State': container.status,
+            'Status': attrs.get('State', {}).get('Status', container.status),
+            'Publishers': publishers,
+            'machine_id': spec.machine_id,
+        }
+
+
+def create_backend(kind: str, client_factory: Callable, executor: LifecycleExecutor = None) -> OrchestratorBackend:
+    """
+    Backend for HACKFORGE_ORCHESTRATOR_BACKEND: "sdk", "compose" or "auto"
+
+    "auto" uses the Engine API when the Docker SDK is installed and the daemon
+    answers a ping, and falls back to docker-compose otherwise.
+    """
+    kind = (kind or "auto").lower()
+    if kind == "compose":
+        return ComposeBackend()
+    if kind not in ("sdk", "auto"):
+        raise ValueError(f"Unknown orchestrator backend: {kind}")
+
+    try:
+        client_factory().ping()
+        return DockerSdkBackend(client_factory, executor)
+    except Exception as e:
+        if kind == "sdk":
+            raise
+        print(f"⚠️ Docker Engine API unavailable ({e}); using docker-compose")
+        return ComposeBackend()
@@ -0,0 +1,125 @@
+"""
+Base Image Catalog
+Builds each shared toolset image once and reuses it for every machine
+"""
+
+import io
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+BASE_DOCKERFILE = "Dockerfile.base"
+
+
+class BaseImageCatalog:
+    """
+    Catalog of content-addressed base images
+
+    Machine directories carry a Dockerfile.base (the category toolset) and a
+    Dockerfile whose FROM line names the base image tag derived from it. The
+    catalog builds every distinct tag at most once and remembers what exists.
+    """
+
+    def __init__(self, client_factory: Callable):
+        self._client_factory = client_factory
+        self._known: Dict[str, Dict] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def base_image_for(machine_dir: Path) -> Optional[str]:
+        """Read the base image tag from a machine Dockerfile's FROM line"""
+        dockerfile = Path(machine_dir) / "Dockerfile"
+        if not dockerfile.exists():
+            return None
+
+        for line in dockerfile.read_text().splitlines():
+            parts = line.strip().split()
+            if len(parts) >= 2 and parts[0].upper() == "FROM":
+                return parts[1]
+        return None
+
+    def discover(self, root: Path) -> Dict[str, Path]:
+        """Map base image tag -> Dockerfile.base for a machine or campaign directory"""
+        root = Path(root)
+        recipes = {}
+
+        if not root.exists():
+            return recipes
+
+        candidates = [root] + [p for p in sorted(root.iterdir()) if p.is_dir()]
+        for machine_dir in candidates:
+            recipe = machine_dir / BASE_DOCKERFILE
+            if not recipe.exists():
+                continue
+
+            tag = self.base_image_for(machine_dir)
+            if tag and tag not in recipes:
+                recipes[tag] = recipe
+
+        return recipes
+
+    def ensure_for_directory(self, root: Path) -> Dict[str, bool]:
+        """Make sure every base image referenced under a directory exists"""
+        results = {}
+        for tag, recipe in self.discover(root).items():
+            results[tag] = self.ensure(tag, recipe.read_text())
+        return results
+
+    def ensure(self, tag: str, dockerfile: str) -> bool:
+        """Build a base image unless it already exists"""
+        with self._lock:
+            if tag in self._known:
+                return True
+            build_lock = self._build_locks.setdefault(tag, threading.Lock())
+
+        # Concurrent campaigns needing the same image wait for one build
+        with build_lock:
+            with self._lock:
+                if tag in self._known:
+                    return True
+
+            client = self._client_factory()
+
+            try:
+                image = client.images.get(tag)
+                self._remember(tag, image.id, built=False, build_seconds=0.0)
+                return True
+            except Exception:
+                pass
+
+            print(f"🔨 Building base image {tag}...")
+            started = time.time()
+
+            try:
+                image, _ = client.images.build(
+                    fileobj=io.BytesIO(dockerfile.encode()),
+                    tag=tag,
+                    rm=True,
+                    labels={'hackforge.base_image': 'true'}
+                )
+            except Exception as e:
+                print(f"❌ Failed to build base image {tag}: {e}")
+                return False
+
+            elapsed = time.time() - started
+            self._remember(tag, image.id, built=True, build_seconds=elapsed)
+            print(f"✓ Built base image {tag} in {elapsed:.1f}s")
+            return True
+
+    def list_images(self) -> List[Dict]:
+        """Base images known to this catalog"""
+        with self._lock:
+            return [dict(info) for info in self._known.values()]
+
+    def _remember(self, tag: str, image_id: str, built: bool, build_seconds: float):
+        with self._lock:
+            self._known[tag] = {
+                'tag': tag,
+                'image_id': image_id,
+                'built_here': built,
+                'build_seconds': round(build_seconds, 2),
+                'registered_at': time.time(),
+            }
@@ -0,0 +1,200 @@
+"""
+Build Jobs
+Runs long campaign build pipelines off the API event loop and tracks their progress
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+class JobReporter:
+    """
+    Callback handed to a pipeline for reporting stage transitions
+    """
+
+    def __init__(self, manager: 'BuildJobManager', job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+
+    def __call__(self, stage: str, message: str = "", result: Any = None):
+        if result is not None:
+            self.manager._set_result(self.job_id, result)
+        self.manager._record(self.job_id, stage, 'running', message)
+
+
+class BuildJobManager:
+    """
+    Bounded worker pool for build pipelines with per-job stage history
+
+    A pipeline is a callable taking a JobReporter, called as
+    `report(stage, message="", result=None)`. Every reported stage is appended
+    to the job's event history and pushed to live subscribers (e.g. Server-Sent
+    Events streams).
+    """
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 500):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="hackforge-build"
+        )
+
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pipeline: Callable, kind: str = "build", metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Queue a pipeline and return the new job (without waiting for it)"""
+
+        job_id = f"job_{uuid.uuid4().hex[:12]}"
+        now = time.time()
+
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'status': 'queued',
+            'stage': 'queued',
+            'metadata': metadata or {},
+            'events': [],
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'finished_at': None,
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+
+        self._record(job_id, 'queued', 'queued', "Waiting for a build worker")
+        self.executor.submit(self._run, job_id, pipeline)
+
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of a job's state"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot['events'] = list(job['events'])
+            return snapshot
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """List most recent jobs (without event history)"""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j['created_at'], reverse=True)[:limit]
+            return [{k: v for k, v in job.items() if k != 'events'} for job in jobs]
+
+    def subscribe(self, job_id: str) -> Optional[asyncio.Queue]:
+        """
+        Subscribe to a job's stage events from the running event loop
+
+        The queue is pre-filled with the events recorded so far and receives
+        None once the job reaches a terminal status.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            for event in job['events']:
+                queue.put_nowait(event)
+
+            if job['status'] in TERMINAL_STATUSES:
+                queue.put_nowait(None)
+            else:
+                self._subscribers.setdefault(job_id, []).append((loop, queue))
+
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        """Detach a subscriber queue"""
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            self._subscribers[job_id] = [s for s in subscribers if s[1] is not queue]
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting jobs"""
+        self.executor.shutdown(wait=wait)
+
+    def _run(self, job_id: str, pipeline: Callable):
+        self._record(job_id, 'started', 'running', "Build worker picked up job")
+
+        try:
+            result = pipeline(JobReporter(self, job_id))
+            if result is not None:
+                self._set_result(job_id, result)
+            self._record(job_id, 'completed', 'completed', "Pipeline finished")
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self._jobs[job_id]['error'] = str(e)
+            self._record(job_id, 'failed', 'failed', str(e))
+
+    def _set_result(self, job_id: str, result: Any):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]['result'] = result
+
+    def _record(self, job_id: str, stage: str, status: str, message: str = ""):
+        now = time.time()
+        event = {
+            'job_id': job_id,
+            'stage': stage,
+            'status': status,
+            'message': message,
+            'timestamp': now,
+        }
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+
+            job['events'].append(event)
+            job['stage'] = stage
+            job['status'] = status
+            job['updated_at'] = now
+
+            subscribers = list(self._subscribers.get(job_id, []))
+            if status in TERMINAL_STATUSES:
+                job['finished_at'] = now
+                self._subscribers.pop(job_id, None)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+                if status in TERMINAL_STATUSES:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # Subscriber's event loop is closed
+                pass
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_jobs (caller holds the lock)"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+
+        finished = sorted(
+            (j for j in self._jobs.values() if j['status'] in TERMINAL_STATUSES),
+            key=lambda j: j['created_at']
+        )
+        for job in finished[:len(self._jobs) - self.max_jobs]:
+            del self._jobs[job['job_id']]
@@ -0,0 +1,211 @@
+"""
+Container Inventory
+In-memory view of Hackforge containers, kept current by the Docker events stream
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Iterable
+
+
+# Labels written into every generated docker-compose service
+MACHINE_LABEL = "hackforge.machine_id"
+CAMPAIGN_LABEL = "hackforge.campaign_id"
+
+# Containers created before labels existed are recognised by name
+CONTAINER_NAME_PREFIX = "hackforge_"
+
+# Container events that can change what the inventory records; health_status,
+# exec_*, attach, top etc. are filtered out by the daemon
+TRACKED_EVENTS = (
+    "create", "start", "restart", "stop", "die", "kill", "oom",
+    "pause", "unpause", "rename", "update", "destroy",
+)
+
+
+class ContainerInventory:
+    """
+    Container inventory keyed by machine_id
+
+    A full listing is taken once; afterwards a background thread follows the
+    Docker events stream and re-inspects only the container an event refers to.
+    """
+
+    def __init__(self, client, reconnect_delay: float = 2.0):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+
+        self._by_machine: Dict[str, Dict] = {}
+        self._machine_by_container: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._events = None
+        self.last_refresh: Optional[float] = None
+
+    @staticmethod
+    def machine_id_for(container) -> Optional[str]:
+        """Resolve the machine_id of a container from its label or legacy name"""
+        labels = container.labels or {}
+        if labels.get(MACHINE_LABEL):
+            return labels[MACHINE_LABEL]
+
+        if container.name.startswith(CONTAINER_NAME_PREFIX):
+            return container.name[len(CONTAINER_NAME_PREFIX):]
+
+        return None
+
+    @staticmethod
+    def describe(container, machine_id: str) -> Dict:
+        """Build the cached description of a container"""
+        attrs = container.attrs or {}
+        labels = container.labels or {}
+
+        return {
+            'machine_id': machine_id,
+            'campaign_id': labels.get(CAMPAIGN_LABEL),
+            'container_id': container.id,
+            'container_name': container.name,
+            'status': container.status,
+            'ports': container.ports,
+            'ips': {
+                name: network.get('IPAddress')
+                for name, network in (attrs.get('NetworkSettings', {}).get('Networks') or {}).items()
+                if network.get('IPAddress')
+            },
+            'created': attrs.get('Created'),
+            'image': attrs.get('Config', {}).get('Image', 'unknown'),
+            'labels': labels,
+        }
+
+    def refresh(self):
+        """Rebuild the inventory from a single full container listing"""
+        by_machine = {}
+        machine_by_container = {}
+
+        for container in self.client.containers.list(all=True):
+            machine_id = self.machine_id_for(container)
+            if machine_id:
+                by_machine[machine_id] = self.describe(container, machine_id)
+                machine_by_container[container.id] = machine_id
+
+        with self._lock:
+            self._by_machine = by_machine
+            self._machine_by_container = machine_by_container
+            self.last_refresh = time.time()
+
+    def start(self):
+        """Take the initial snapshot and start following Docker events"""
+        if self._watcher and self._watcher.is_alive():
+            return
+
+        self.refresh()
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch_events,
+            name="hackforge-container-events",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        """Stop following Docker events"""
+        self._stop.set()
+        if self._events is not None:
+            try:
+                self._events.close()
+            except Exception:
+                pass
+
+    def get(self, machine_id: str) -> Optional[Dict]:
+        """Get container info for a machine"""
+        with self._lock:
+            info = self._by_machine.get(machine_id)
+            return dict(info) if info else None
+
+    def get_many(self, machine_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Get container info for several machines (missing ones are skipped)"""
+        with self._lock:
+            return {
+                machine_id: dict(self._by_machine[machine_id])
+                for machine_id in machine_ids
+                if machine_id in self._by_machine
+            }
+
+    def all(self) -> List[Dict]:
+        """List every known Hackforge container"""
+        with self._lock:
+            return [dict(info) for info in self._by_machine.values()]
+
+    def _watch_events(self):
+        while not self._stop.is_set():
+            try:
+                self._events = self.client.events(
+                    decode=True,
+                    filters={'type': 'container', 'event': list(TRACKED_EVENTS)}
+                )
+                for event in self._events:
+                    if self._stop.is_set():
+                        break
+                    self._apply_event(event)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"⚠️ Docker events stream interrupted: {e}")
+
+            if self._stop.wait(self.reconnect_delay):
+                break
+
+            # Events may have been missed while disconnected
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Container inventory refresh failed: {e}")
+
+    def _apply_event(self, event: Dict):
+        container_id = event.get('id') or event.get('Actor', {}).get('ID')
+        action = event.get('Action') or event.get('status') or ''
+        if not container_id:
+            return
+
+        if action == 'destroy':
+            self._forget(container_id)
+            return
+
+        # exec_* and health events don't change anything we track
+        if action.startswith('exec_') or action.startswith('health_status'):
+            return
+
+        # Events carry the container's labels and name, so other containers on
+        # the host are skipped without inspecting them. The legacy name prefix
+        # can't be expressed as a daemon-side filter, hence the check here.
+        attributes = event.get('Actor', {}).get('Attributes') or {}
+        with self._lock:
+            known = container_id in self._machine_by_container
+        if attributes and not (known or attributes.get(MACHINE_LABEL)
+                or attributes.get('name', '').startswith(CONTAINER_NAME_PREFIX)):
+            return
+
+        try:
+            container = self.client.containers.get(container_id)
+        except Exception:
+            self._forget(container_id)
+            return
+
+        machine_id = self.machine_id_for(container)
+        if not machine_id:
+            return
+
+        info = self.describe(container, machine_id)
+        with self._lock:
+            self._by_machine[machine_id] = info
+            self._machine_by_container[container.id] = machine_id
+
+    def _forget(self, container_id: str):
+        with self._lock:
+            machine_id = self._machine_by_container.pop(container_id, None)
+            if machine_id:
+                info = self._by_machine.get(machine_id)
+                if info and info['container_id'] == container_id:
+                    del self._by_machine[machine_id]
@@ -0,0 +1,274 @@
+"""
+Idle Suspender
+Suspends machine containers nobody has used for a while and resumes them on demand
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+
+SUSPEND_MODES = ("stop", "pause")
+
+# Container states a suspended machine is left in
+SUSPENDED_STATUSES = ("exited", "paused")
+
+
+class IdleSuspender:
+    """
+    Tracks the last access of every machine and suspends idle containers
+
+    Accesses are recorded by the ingress. A machine first seen running counts
+    as accessed at that moment, so every container gets the full idle period.
+    "stop" frees the container's memory; "pause" only freezes its processes
+    but resumes faster. Requests for a suspended machine go through
+    ensure_awake(), which unpauses or starts it and records the latency.
+    Only containers the suspender stopped itself are woken: they are recorded
+    in state_file so they survive a restart, while containers an admin
+    stopped or that crashed stay down.
+    """
+
+    def __init__(self, orchestrator, idle_seconds: float, mode: str = "stop",
+                 check_interval: float = 60.0, is_protected: Callable[[str], bool] = None,
+                 state_file: str = None):
+        if mode not in SUSPEND_MODES:
+            raise ValueError(f"Unknown suspend mode: {mode}")
+
+        self.orchestrator = orchestrator
+        self.idle_seconds = idle_seconds
+        self.mode = mode
+        self.check_interval = check_interval
+        self.is_protected = is_protected or (lambda machine_id: False)
+
+        self.state_file = Path(state_file) if state_file else None
+
+        self._last_access: Dict[str, float] = {}
+        self._suspended: Dict[str, Dict] = {}           # machine_id -> {'container_id', 'since'}
+        self._resume_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._load_state()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.metrics = {
+            'suspensions': 0,
+            'suspend_failures': 0,
+            'resumes': 0,
+            'resume_failures': 0,
+            'resume_seconds_total': 0.0,
+            'resume_seconds_last': None,
+            'resume_seconds_max': 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.idle_seconds > 0
+
+    def start(self):
+        """Start the background idle check"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._check_loop,
+            name="hackforge-idle-suspender",
+            daemon=True
+        )
+        self._thread.start()
+        print(f"💤 Idle suspension: {self.mode} machines idle for {self.idle_seconds:.0f}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def touch(self, machine_id: str):
+        """Record an access to a machine"""
+        with self._lock:
+            self._last_access[machine_id] = time.time()
+
+    def last_access(self, machine_id: str) -> Optional[float]:
+        with self._lock:
+            return self._last_access.get(machine_id)
+
+    def is_suspended(self, machine_id: str) -> bool:
+        with self._lock:
+            return machine_id in self._suspended
+
+    def ensure_awake(self, machine_id: str) -> float:
+        """
+        Make sure a machine's container is running, resuming it if needed
+
+        Returns the resume latency in seconds (0.0 if it was already running).
+        Raises if the container is missing or cannot be resumed.
+        """
+        self.touch(machine_id)
+
+        if not self.is_suspended(machine_id):
+            return 0.0
+
+        with self._lock:
+            resume_lock = self._resume_locks.setdefault(machine_id, threading.Lock())
+
+        # Concurrent requests for the same machine wait for a single resume
+        with resume_lock:
+            with self._lock:
+                if machine_id not in self._suspended:
+                    return 0.0
+
+            started = time.time()
+            try:
+                container = self._container(machine_id)
+                if container.status == 'paused':
+                    container.unpause()
+                elif container.status != 'running':
+                    container.start()
+            except Exception:
+                with self._lock:
+                    self.metrics['resume_failures'] += 1
+                raise
+
+            elapsed = time.time() - started
+            with self._lock:
+                self._suspended.pop(machine_id, None)
+                self._save_state()
+                self.metrics['resumes'] += 1
+                self.metrics['resume_seconds_total'] += elapsed
+                self.metrics['resume_seconds_last'] = round(elapsed, 3)
+                self.metrics['resume_seconds_max'] = max(self.metrics['resume_seconds_max'], elapsed)
+
+            print(f"⏰ Resumed {machine_id} in {elapsed:.2f}s")
+            return elapsed
+
+    def check_idle(self) -> int:
+        """Suspend every running machine idle beyond the threshold; returns how many were suspended"""
+        now = time.time()
+        idle = []
+
+        with self._lock:
+            containers = {info['machine_id']: info for info in self.orchestrator.inventory.all()}
+
+            # Forget suspensions whose container was removed, recreated or
+            # started by someone else; stopped containers we never suspended
+            # (admin stops, crashes) are left alone
+            stale = [
+                machine_id for machine_id, record in self._suspended.items()
+                if machine_id not in containers
+                or containers[machine_id]['container_id'] != record['container_id']
+                or containers[machine_id]['status'] not in SUSPENDED_STATUSES
+            ]
+            for machine_id in stale:
+                del self._suspended[machine_id]
+            if stale:
+                self._save_state()
+
+            for machine_id, info in containers.items():
+                if info['status'] != 'running':
+                    continue
+                last = self._last_access.setdefault(machine_id, now)
+                if now - last >= self.idle_seconds:
+                    idle.append((machine_id, info['container_id']))
+
+        suspended = 0
+        for machine_id, container_id in idle:
+            if self.is_protected(machine_id):
+                continue
+            if self._suspend(machine_id, container_id):
+                suspended += 1
+        return suspended
+
+    def stats(self) -> Dict:
+        """Suspension counters and resume latency"""
+        with self._lock:
+            resumes = self.metrics['resumes']
+            return {
+                'enabled': self.enabled,
+                'mode': self.mode,
+                'idle_seconds': self.idle_seconds,
+                'tracked': len(self._last_access),
+                'suspended': len(self._suspended),
+                'suspensions': self.metrics['suspensions'],
+                'suspend_failures': self.metrics['suspend_failures'],
+                'resumes': resumes,
+                'resume_failures': self.metrics['resume_failures'],
+                'resume_seconds_avg': (
+                    round(self.metrics['resume_seconds_total'] / resumes, 3) if resumes else None
+                ),
+                'resume_seconds_last': self.metrics['resume_seconds_last'],
+                'resume_seconds_max': round(self.metrics['resume_seconds_max'], 3),
+            }
+
+    def _check_loop(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                count = self.check_idle()
+                if count:
+                    print(f"💤 Suspended {count} idle machine(s)")
+            except Exception as e:
+                print(f"⚠️ Idle check failed: {e}")
+
+    def _suspend(self, machine_id: str, container_id: str) -> bool:
+        with self._lock:
+            resume_lock = self._resume_locks.setdefault(machine_id, threading.Lock())
+
+        # Requests arriving while the container stops wait on the resume lock
+        # and wake it once the stop has finished
+        with resume_lock:
+            with self._lock:
+                # The machine may have been requested since the idle scan
+                last = self._last_access.get(machine_id, 0.0)
+                if time.time() - last < self.idle_seconds:
+                    return False
+                self._suspended[machine_id] = {'container_id': container_id, 'since': time.time()}
+                self._save_state()
+
+            try:
+                container = self.orchestrator.docker_client.containers.get(container_id)
+                if self.mode == "pause":
+                    container.pause()
+                else:
+                    container.stop()
+            except Exception as e:
+                print(f"⚠️ Could not suspend {machine_id}: {e}")
+                with self._lock:
+                    self._suspended.pop(machine_id, None)
+                    self._save_state()
+                    self.metrics['suspend_failures'] += 1
+                return False
+
+        with self._lock:
+            self.metrics['suspensions'] += 1
+        return True
+
+    def _load_state(self):
+        if self.state_file is None:
+            return
+        try:
+            with open(self.state_file) as f:
+                self._suspended = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read suspended machines: {e}")
+
+    def _save_state(self):
+        """Persist the suspended machines (caller holds the lock)"""
+        if self.state_file is None:
+            return
+        tmp_file = self.state_file.with_name(self.state_file.name + ".tmp")
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'w') as f:
+                json.dump(self._suspended, f, separators=(',', ':'))
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            print(f"⚠️ Could not write suspended machines: {e}")
+
+    def _container(self, machine_id: str):
+        info = self.orchestrator.inventory.get(machine_id)
+        if info is None:
+            raise LookupError(f"No container for machine {machine_id}")
+        return self.orchestrator.docker_client.containers.get(info['container_id'])
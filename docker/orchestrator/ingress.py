@@ -0,0 +1,542 @@
+"""
+Ingress
+Single HTTP entry point for every machine: routes by path or hostname to the
+machine's container, wakes suspended machines and records per-machine traffic
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+MAX_HEAD_BYTES = 64 * 1024
+PIPE_CHUNK = 64 * 1024
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Headers that describe a single connection and are not forwarded
+HOP_BY_HOP = frozenset((
+    'connection', 'keep-alive', 'proxy-connection', 'proxy-authenticate',
+    'proxy-authorization', 'te', 'trailer', 'upgrade',
+))
+
+Address = Tuple[str, int]
+
+
+class HttpHead:
+    """Start line and headers of an HTTP message"""
+
+    __slots__ = ('start_line', 'headers')
+
+    def __init__(self, start_line: str, headers: List[Tuple[str, str]]):
+        self.start_line = start_line
+        self.headers = headers
+
+    @classmethod
+    def parse(cls, raw: bytes) -> 'HttpHead':
+        lines = raw.decode('latin-1').split('\r\n')
+        headers = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, colon, value = line.partition(':')
+            if not colon:
+                raise ValueError(f"Malformed header line: {line!r}")
+            headers.append((name.strip(), value.strip()))
+        return cls(lines[0], headers)
+
+    def get(self, name: str) -> Optional[str]:
+        name = name.lower()
+        for key, value in reversed(self.headers):
+            if key.lower() == name:
+                return value
+        return None
+
+    def tokens(self, name: str) -> List[str]:
+        """Comma-separated values of a header, lowercased (e.g. Connection)"""
+        value = self.get(name) or ''
+        return [token.strip().lower() for token in value.split(',') if token.strip()]
+
+    def values(self, name: str) -> List[str]:
+        """Every value of a header, in order"""
+        name = name.lower()
+        return [value for key, value in self.headers if key.lower() == name]
+
+    def framing_error(self) -> Optional[str]:
+        """
+        Why a request's body framing is unsafe to forward, or None
+
+        Ambiguous framing could be read differently by the machine than by
+        the ingress and desynchronise pooled upstream connections.
+        """
+        lengths = {value.strip() for value in self.values('content-length')}
+        encodings = [
+            token.strip().lower()
+            for value in self.values('transfer-encoding') for token in value.split(',') if token.strip()
+        ]
+        if lengths and encodings:
+            return "both Content-Length and Transfer-Encoding"
+        if len(lengths) > 1:
+            return "conflicting Content-Length headers"
+        if lengths:
+            length = next(iter(lengths))
+            if not (length.isascii() and length.isdigit()):
+                return f"invalid Content-Length {length!r}"
+        if encodings and encodings[-1] != 'chunked':
+            return "unsupported Transfer-Encoding"
+        return None
+
+    def end_to_end(self) -> List[Tuple[str, str]]:
+        """Headers without hop-by-hop ones, including those named in Connection"""
+        dropped = HOP_BY_HOP | set(self.tokens('connection'))
+        return [(k, v) for k, v in self.headers if k.lower() not in dropped]
+
+    @staticmethod
+    def encode(start_line: str, headers: List[Tuple[str, str]]) -> bytes:
+        lines = [start_line] + [f"{k}: {v}" for k, v in headers]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+class MachineTraffic:
+    """Request counters and latency histogram of one machine"""
+
+    __slots__ = ('requests', 'upstream_errors', 'statuses', 'buckets',
+                 'latency_sum', 'latency_max', 'last_request')
+
+    def __init__(self):
+        self.requests = 0
+        self.upstream_errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.last_request: Optional[float] = None
+
+    def observe(self, status: int, seconds: float):
+        self.requests += 1
+        status_class = f"{status // 100}xx"
+        self.statuses[status_class] = self.statuses.get(status_class, 0) + 1
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        self.last_request = time.time()
+
+    def to_dict(self) -> Dict:
+        # Cumulative counts, as in a Prometheus histogram
+        histogram = []
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), self.buckets):
+            running += count
+            histogram.append({'le': bound, 'count': running})
+
+        return {
+            'requests': self.requests,
+            'upstream_errors': self.upstream_errors,
+            'statuses': dict(self.statuses),
+            'latency_seconds': {
+                'avg': round(self.latency_sum / self.requests, 4) if self.requests else None,
+                'max': round(self.latency_max, 4),
+                'sum': round(self.latency_sum, 4),
+                'histogram': histogram,
+            },
+            'last_request': self.last_request,
+        }
+
+
+class UpstreamPool:
+    """Idle keep-alive connections to machine containers, per address"""
+
+    def __init__(self, max_idle_per_upstream: int = 8, idle_timeout: float = 30.0):
+        self.max_idle_per_upstream = max_idle_per_upstream
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[Address, deque] = {}
+        self.opened = 0
+        self.reused = 0
+
+    def take(self, address: Address):
+        """An idle connection to the address, or None"""
+        idle = self._idle.get(address)
+        now = time.monotonic()
+        while idle:
+            reader, writer, since = idle.pop()
+            if writer.is_closing() or reader.at_eof() or now - since > self.idle_timeout:
+                writer.close()
+                continue
+            self.reused += 1
+            return reader, writer
+        return None
+
+    async def open(self, address: Address, deadline: float):
+        """A new connection, retrying while the machine is not listening yet"""
+        delay = 0.05
+        while True:
+            try:
+                connection = await asyncio.open_connection(*address)
+                self.opened += 1
+                return connection
+            except OSError:
+                if time.monotonic() + delay > deadline:
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    def put(self, address: Address, reader, writer):
+        idle = self._idle.setdefault(address, deque())
+        if len(idle) >= self.max_idle_per_upstream:
+            writer.close()
+            return
+        idle.append((reader, writer, time.monotonic()))
+
+    def idle_count(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+    def close_all(self):
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                writer.close()
+        self._idle.clear()
+
+
+class UpstreamError(Exception):
+    """The machine could not be reached or sent a broken response"""
+
+    def __init__(self, message: str, response_started: bool = False):
+        super().__init__(message)
+        # Part of the response was already relayed to the client
+        self.response_started = response_started
+
+
+class Ingress:
+    """
+    Asyncio reverse proxy in front of all machines
+
+    Requests are routed by hostname ({machine_id}.{domain}, when a domain is
+    configured) or by path (/{machine_id}/...) to the address returned by
+    `resolve`, normally the container's IP on the machine network. Client
+    connections are kept alive and upstream connections are pooled. Every
+    request counts as an access for the idle suspender, and a suspended
+    machine is resumed before its request is forwarded.
+    """
+
+    def __init__(self, resolve: Callable[[str], Optional[Address]], suspender,
+                 host: str = "0.0.0.0", port: int = 8880, domain: str = None,
+                 connect_timeout: float = 5.0, wake_timeout: float = 30.0,
+                 response_timeout: float = 60.0, client_idle_timeout: float = 60.0):
+        self.resolve = resolve
+        self.suspender = suspender
+        self.host = host
+        self.port = port
+        self.domain = (domain or '').strip('.').lower() or None
+        self.connect_timeout = connect_timeout
+        self.wake_timeout = wake_timeout
+        self.response_timeout = response_timeout
+        self.client_idle_timeout = client_idle_timeout
+
+        self.pool = UpstreamPool()
+        self.traffic: Dict[str, MachineTraffic] = {}
+        self.client_connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port, limit=MAX_HEAD_BYTES)
+        routes = "/<machine_id>/" + (f" and <machine_id>.{self.domain}" if self.domain else "")
+        print(f"🚪 Ingress listening on {self.host}:{self.port} ({routes})")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.pool.close_all()
+
+    def public_url(self, machine_id: str, host: str = "localhost") -> str:
+        """URL players use to reach a machine"""
+        if self.domain:
+            return f"http://{machine_id}.{self.domain}:{self.port}/"
+        return f"http://{host}:{self.port}/{machine_id}/"
+
+    def route(self, target: str, host_header: Optional[str]) -> Tuple[Optional[str], Optional[str], bool]:
+        """
+        (machine_id, upstream target, routed by path) for a request
+
+        The upstream target is None when a path-routed URL lacks the slash
+        after the machine_id.
+        """
+        if self.domain and host_header:
+            hostname = host_header.rsplit(':', 1)[0].lower()
+            suffix = f".{self.domain}"
+            if hostname.endswith(suffix) and len(hostname) > len(suffix):
+                return hostname[:-len(suffix)], target, False
+
+        if not target.startswith('/'):
+            return None, target, True
+        path, question, query = target.partition('?')
+        machine_id, slash, rest = path[1:].partition('/')
+        if not machine_id:
+            return None, target, True
+        if not slash:
+            return machine_id, None, True
+        return machine_id, '/' + rest + question + query, True
+
+    def stats(self) -> Dict:
+        """Connection counters and per-machine traffic"""
+        return {
+            'listening': self._server is not None,
+            'port': self.port,
+            'domain': self.domain,
+            'client_connections': self.client_connections,
+            'upstream': {
+                'opened': self.pool.opened,
+                'reused': self.pool.reused,
+                'idle': self.pool.idle_count(),
+            },
+            'machines': {machine_id: traffic.to_dict() for machine_id, traffic in self.traffic.items()},
+        }
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.client_connections += 1
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    raw = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.client_idle_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, "Request Header Fields Too Large")
+                    break
+
+                try:
+                    request = HttpHead.parse(raw)
+                    method, target, version = request.start_line.split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, "Bad Request")
+                    break
+
+                keep_alive = await self._handle_request(reader, writer, request, method, target, version)
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.client_connections -= 1
+            writer.close()
+
+    async def _handle_request(self, reader, writer, request: HttpHead, method: str, target: str, version: str) -> bool:
+        """Forward one request; returns whether the client connection can be reused"""
+        started = time.monotonic()
+
+        machine_id, upstream_target, by_path = self.route(target, request.get('host'))
+        if machine_id is None:
+            await self._respond(writer, 404, "Unknown machine")
+            return False
+        if upstream_target is None:
+            _, question, query = target.partition('?')
+            await self._respond(writer, 308, "Permanent Redirect", location=f"/{machine_id}/{question}{query}")
+            return False
+
+        # Rejected before any upstream connection is taken
+        framing_error = request.framing_error()
+        if framing_error:
+            await self._respond(writer, 400, f"Bad Request: {framing_error}")
+            return False
+
+        resumed = False
+        if self.suspender.is_suspended(machine_id):
+            try:
+                resumed = await asyncio.to_thread(self.suspender.ensure_awake, machine_id) > 0
+            except Exception as e:
+                print(f"⚠️ Could not resume {machine_id}: {e}")
+                await self._respond(writer, 503, "Machine unavailable")
+                return False
+
+        address = await asyncio.to_thread(self.resolve, machine_id)
+        if address is None:
+            await self._respond(writer, 404, "Unknown machine")
+            return False
+        # Only known machines are tracked, not every path a client tries
+        self.suspender.touch(machine_id)
+
+        traffic = self.traffic.setdefault(machine_id, MachineTraffic())
+        client_keep_alive = version == 'HTTP/1.1' and 'close' not in request.tokens('connection')
+
+        headers = request.end_to_end()
+        if request.get('host') is None:
+            headers.append(('Host', f"{address[0]}:{address[1]}"))
+        peer = writer.get_extra_info('peername')
+        if peer:
+            headers.append(('X-Forwarded-For', str(peer[0])))
+        if by_path:
+            headers.append(('X-Forwarded-Prefix', f"/{machine_id}"))
+        upstream_head = HttpHead.encode(f"{method} {upstream_target} HTTP/1.1", headers)
+
+        # A machine that was just resumed may take a while to listen again
+        deadline = time.monotonic() + (self.wake_timeout if resumed else self.connect_timeout)
+        try:
+            status, reusable = await self._exchange(
+                address, upstream_head, request, method, reader, writer,
+                client_keep_alive, machine_id if by_path else None, deadline
+            )
+        except UpstreamError as e:
+            traffic.upstream_errors += 1
+            traffic.observe(502, time.monotonic() - started)
+            print(f"⚠️ Ingress could not reach {machine_id}: {e}")
+            if e.response_started:
+                # A 502 now would be spliced into the relayed response; just close
+                return False
+            try:
+                await self._respond(writer, 502, "Bad Gateway")
+            except OSError:
+                pass
+            return False
+        except ValueError:
+            # Malformed chunk size in the client's request body
+            traffic.observe(400, time.monotonic() - started)
+            try:
+                await self._respond(writer, 400, "Bad Request: invalid chunked body")
+            except OSError:
+                pass
+            return False
+
+        traffic.observe(status, time.monotonic() - started)
+        self.suspender.touch(machine_id)
+        return reusable
+
+    async def _exchange(self, address: Address, upstream_head: bytes, request: HttpHead, method: str,
+                        client_reader, client_writer, client_keep_alive: bool,
+                        path_prefix_for: Optional[str], deadline: float) -> Tuple[int, bool]:
+        """Send a request upstream and relay the response; returns (status, client connection reusable)"""
+        has_body = request.get('content-length') not in (None, '0') or 'chunked' in request.tokens('transfer-encoding')
+
+        # A pooled connection may have been closed by the machine meanwhile;
+        # bodyless requests are retried once on a fresh connection
+        connection = self.pool.take(address)
+        while True:
+            fresh = connection is None
+            if fresh:
+                try:
+                    connection = await self.pool.open(address, deadline)
+                except OSError as e:
+                    raise UpstreamError(f"connect to {address[0]}:{address[1]} failed: {e}")
+            up_reader, up_writer = connection
+
+            try:
+                up_writer.write(upstream_head)
+                if has_body:
+                    await self._relay_body(request, client_reader, up_writer)
+                await up_writer.drain()
+                raw = await asyncio.wait_for(up_reader.readuntil(b'\r\n\r\n'), self.response_timeout)
+                break
+            except asyncio.TimeoutError:
+                # Checked first: TimeoutError is an OSError too
+                up_writer.close()
+                raise UpstreamError(f"no response within {self.response_timeout:.0f}s")
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                up_writer.close()
+                if fresh or has_body:
+                    raise UpstreamError(f"request failed: {e!r}")
+                connection = None
+            except BaseException:
+                # Malformed chunked request body (ValueError) or cancellation
+                up_writer.close()
+                raise
+
+        response_started = False
+        try:
+            response, status, reason = self._parse_status(raw)
+
+            # Interim responses (100 Continue) are passed through as they come
+            while 100 <= status < 200:
+                response_started = True
+                client_writer.write(raw)
+                raw = await asyncio.wait_for(up_reader.readuntil(b'\r\n\r\n'), self.response_timeout)
+                response, status, reason = self._parse_status(raw)
+
+            no_body = method == 'HEAD' or status in (204, 304)
+            framed = no_body or response.get('content-length') is not None \
+                or 'chunked' in response.tokens('transfer-encoding')
+            upstream_reusable = framed and response.start_line.startswith('HTTP/1.1') \
+                and 'close' not in response.tokens('connection')
+            client_reusable = client_keep_alive and framed
+
+            headers = response.end_to_end()
+            if path_prefix_for:
+                # Keep redirects inside the machine's path prefix
+                headers = [
+                    (k, f"/{path_prefix_for}{v}" if k.lower() == 'location' and v.startswith('/') else v)
+                    for k, v in headers
+                ]
+            headers.append(('Connection', 'keep-alive' if client_reusable else 'close'))
+            response_started = True
+            client_writer.write(HttpHead.encode(f"HTTP/1.1 {status} {reason}".rstrip(), headers))
+
+            if framed and not no_body:
+                await self._relay_body(response, up_reader, client_writer)
+            elif not framed:
+                # Delimited by the machine closing the connection
+                await self._pipe_to_eof(up_reader, client_writer)
+            await client_writer.drain()
+        except (asyncio.TimeoutError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            up_writer.close()
+            raise UpstreamError(f"broken response: {e!r}", response_started)
+        except BaseException:
+            up_writer.close()
+            raise
+
+        if upstream_reusable:
+            self.pool.put(address, up_reader, up_writer)
+        else:
+            up_writer.close()
+        return status, client_reusable
+
+    @staticmethod
+    def _parse_status(raw: bytes) -> Tuple[HttpHead, int, str]:
+        response = HttpHead.parse(raw)
+        _, status, *reason = response.start_line.split(' ', 2)
+        return response, int(status), ' '.join(reason)
+
+    @staticmethod
+    async def _relay_body(head: HttpHead, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Copy a Content-Length or chunked body as-is"""
+        if 'chunked' in head.tokens('transfer-encoding'):
+            while True:
+                size_line = await reader.readuntil(b'\r\n')
+                writer.write(size_line)
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    # Optional trailers, then the final empty line
+                    while True:
+                        line = await reader.readuntil(b'\r\n')
+                        writer.write(line)
+                        if line == b'\r\n':
+                            return
+                writer.write(await reader.readexactly(size + 2))
+                await writer.drain()
+
+        remaining = int(head.get('content-length') or 0)
+        while remaining > 0:
+            chunk = await reader.read(min(PIPE_CHUNK, remaining))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', remaining)
+            writer.write(chunk)
+            remaining -= len(chunk)
+            await writer.drain()
+
+    @staticmethod
+    async def _pipe_to_eof(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while True:
+            chunk = await reader.read(PIPE_CHUNK)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, reason: str, location: str = None):
+        body = f"{status} {reason}\n".encode()
+        headers = [("Content-Type", "text/plain"), ("Content-Length", str(len(body))), ("Connection", "close")]
+        if location:
+            headers.append(("Location", location))
+        writer.write(HttpHead.encode(f"HTTP/1.1 {status} {reason}", headers) + body)
+        await writer.drain()
@@ -0,0 +1,95 @@
+"""
+Lifecycle Executor
+Runs one container operation per machine in parallel, with a concurrency cap
+and a timeout per container
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, List, Tuple
+
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CONTAINER_TIMEOUT = 120.0
+
+
+class LifecycleExecutor:
+    """
+    Bounded parallel runner for per-container operations
+
+    At most `concurrency` operations run at once, so a campaign finishes in
+    roughly the time of its slowest container. An operation that runs longer
+    than `timeout` seconds is reported as failed and no longer waited for (its
+    Docker call is left to finish in the background). Failures are recorded
+    per machine; the other machines still run.
+    """
+
+    def __init__(self, concurrency: int = None, timeout: float = None):
+        if concurrency is None:
+            concurrency = int(os.getenv('HACKFORGE_LIFECYCLE_CONCURRENCY', DEFAULT_CONCURRENCY))
+        if timeout is None:
+            timeout = float(os.getenv('HACKFORGE_CONTAINER_TIMEOUT', DEFAULT_CONTAINER_TIMEOUT))
+
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+
+    def run(self, result, tasks: List[Tuple[str, Callable]]):
+        """
+        Run (machine_id, operation) tasks into an OperationResult
+
+        Errors and timeouts go to result.errors; the seconds each machine
+        took go to result.timings.
+        """
+        started = time.time()
+        if not tasks:
+            return result
+
+        pool = ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(tasks)),
+            thread_name_prefix="hackforge-lifecycle"
+        )
+        start_times = {}
+        lock = threading.Lock()
+
+        def timed(machine_id, operation):
+            with lock:
+                start_times[machine_id] = time.time()
+            operation()
+
+        pending = {pool.submit(timed, machine_id, operation): machine_id for machine_id, operation in tasks}
+
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=self._next_deadline(start_times, pending), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    machine_id = pending.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        result.fail(machine_id, str(error) or type(error).__name__)
+                    result.timings[machine_id] = round(time.time() - start_times.get(machine_id, started), 2)
+
+                now = time.time()
+                for future, machine_id in list(pending.items()):
+                    began = start_times.get(machine_id)
+                    if began is not None and now - began > self.timeout:
+                        del pending[future]
+                        future.cancel()
+                        result.fail(machine_id, f"{result.action} timed out after {self.timeout:.0f}s")
+                        result.timings[machine_id] = round(now - began, 2)
+        finally:
+            # Timed-out operations keep their thread until Docker returns
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        result.elapsed = round(time.time() - started, 2)
+        return result
+
+    def _next_deadline(self, start_times, pending) -> float:
+        """Seconds until the earliest running operation times out"""
+        running = [start_times[m] for m in pending.values() if m in start_times]
+        if not running:
+            # Nothing has started yet; check again shortly
+            return min(self.timeout, 1.0)
+        return max(0.0, min(running) + self.timeout - time.time())
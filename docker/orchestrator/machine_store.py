@@ -0,0 +1,241 @@
+"""
+Machine Config Store
+In-memory index of generated machine configs, kept current by mtime polling
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+INDEX_FILE = ".machine_index.json"
+INDEX_VERSION = 1
+
+
+class MachineConfigStore:
+    """
+    Machine configs keyed by machine_id, with a secondary index by blueprint
+
+    A scan lists the machines directory and stats each config.json; only files
+    whose mtime changed are parsed again. With the watcher running, reads are
+    served straight from memory and the scan happens in the background.
+    The parsed configs are also written to a compact index file, so a cold
+    start only has to stat the files rather than parse them.
+    """
+
+    def __init__(self, machines_dir: str, use_index_file: bool = True):
+        self.machines_dir = Path(machines_dir)
+        self.index_file = self.machines_dir / INDEX_FILE if use_index_file else None
+
+        self._configs: Dict[str, Dict] = {}        # machine_id -> config
+        self._entries: Dict[str, Dict] = {}        # directory name -> {mtime_ns, machine_id}
+        self._dirs: Dict[str, str] = {}            # machine_id -> directory name
+        self._by_blueprint: Dict[str, set] = {}    # blueprint_id -> machine_ids
+        self._lock = threading.RLock()
+        self._loaded = False
+
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_scan: Optional[float] = None
+
+        # Number of config.json files parsed (useful to verify caching)
+        self.parse_count = 0
+
+    def get(self, machine_id: str) -> Optional[Dict]:
+        """Full config of a machine"""
+        self._ensure_fresh()
+        with self._lock:
+            config = self._configs.get(machine_id)
+            return dict(config) if config else None
+
+    def directory(self, machine_id: str) -> Optional[Path]:
+        """Directory holding a machine's files"""
+        self._ensure_fresh()
+        with self._lock:
+            name = self._dirs.get(machine_id)
+            return self.machines_dir / name if name else None
+
+    def all(self) -> List[Dict]:
+        """Every machine config, ordered by directory name"""
+        self._ensure_fresh()
+        with self._lock:
+            return [
+                dict(self._configs[entry['machine_id']])
+                for _, entry in sorted(self._entries.items())
+            ]
+
+    def by_blueprint(self, blueprint_id: str) -> List[Dict]:
+        """Configs of every machine generated from a blueprint"""
+        self._ensure_fresh()
+        with self._lock:
+            return [dict(self._configs[m]) for m in sorted(self._by_blueprint.get(blueprint_id, ()))]
+
+    def count(self) -> int:
+        self._ensure_fresh()
+        with self._lock:
+            return len(self._configs)
+
+    def refresh_machine(self, machine_id: str) -> Optional[Dict]:
+        """Pick up a machine directory that was just written (skips waiting for the watcher)"""
+        config_file = self.machines_dir / machine_id / "config.json"
+        with self._lock:
+            self._load_index_file()
+            self._update_entry(machine_id, config_file)
+            self._write_index_file()
+            config = self._configs.get(machine_id)
+            return dict(config) if config else None
+
+    def refresh(self) -> bool:
+        """Rescan the directory, re-parsing only changed configs; returns True if anything changed"""
+        with self._lock:
+            self._load_index_file()
+            changed = False
+
+            if not self.machines_dir.exists():
+                changed = bool(self._entries)
+                for name in list(self._entries):
+                    self._drop(name)
+                self.last_scan = time.time()
+                return changed
+
+            seen = set()
+            with os.scandir(self.machines_dir) as it:
+                for item in it:
+                    if item.name.startswith('.') or not item.is_dir():
+                        continue
+                    seen.add(item.name)
+                    changed |= self._update_entry(item.name, Path(item.path) / "config.json")
+
+            for name in set(self._entries) - seen:
+                self._drop(name)
+                changed = True
+
+            if changed:
+                self._write_index_file()
+            self.last_scan = time.time()
+            return changed
+
+    def start_watching(self, interval: float = 2.0):
+        """Poll the directory in the background; reads then never touch the disk"""
+        if self._watcher and self._watcher.is_alive():
+            return
+
+        self.refresh()
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch,
+            args=(interval,),
+            name="hackforge-machine-store",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    @property
+    def watching(self) -> bool:
+        return bool(self._watcher and self._watcher.is_alive())
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Machine store scan failed: {e}")
+
+    def _ensure_fresh(self):
+        # Without the watcher every read rescans (stats only, no re-parsing)
+        if not self.watching:
+            self.refresh()
+
+    def _update_entry(self, name: str, config_file: Path) -> bool:
+        try:
+            mtime_ns = os.stat(config_file).st_mtime_ns
+        except FileNotFoundError:
+            if name in self._entries:
+                self._drop(name)
+                return True
+            return False
+
+        entry = self._entries.get(name)
+        if entry is not None and entry['mtime_ns'] == mtime_ns:
+            return False
+
+        try:
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+            self.parse_count += 1
+        except Exception as e:
+            print(f"⚠️ Error reading config for {name}: {e}")
+            return False
+
+        self._drop(name)
+        self._add(name, mtime_ns, config)
+        return True
+
+    def _add(self, name: str, mtime_ns: int, config: Dict):
+        machine_id = config.get('machine_id', name)
+        self._entries[name] = {'mtime_ns': mtime_ns, 'machine_id': machine_id}
+        self._configs[machine_id] = config
+        self._dirs[machine_id] = name
+        self._by_blueprint.setdefault(config.get('blueprint_id'), set()).add(machine_id)
+
+    def _drop(self, name: str):
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+
+        self._dirs.pop(entry['machine_id'], None)
+        config = self._configs.pop(entry['machine_id'], None)
+        if config is not None:
+            machine_ids = self._by_blueprint.get(config.get('blueprint_id'))
+            if machine_ids:
+                machine_ids.discard(entry['machine_id'])
+                if not machine_ids:
+                    del self._by_blueprint[config.get('blueprint_id')]
+
+    def _load_index_file(self):
+        """Seed the store from the index file once (caller holds the lock)"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if self.index_file is None or not self.index_file.exists():
+            return
+
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable machine index: {e}")
+            return
+
+        if index.get('version') != INDEX_VERSION:
+            return
+
+        for name, entry in index.get('entries', {}).items():
+            self._add(name, entry['mtime_ns'], entry['config'])
+
+    def _write_index_file(self):
+        if self.index_file is None or not self.machines_dir.exists():
+            return
+
+        index = {
+            'version': INDEX_VERSION,
+            'entries': {
+                name: {'mtime_ns': entry['mtime_ns'], 'config': self._configs[entry['machine_id']]}
+                for name, entry in self._entries.items()
+            }
+        }
+
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(index, f, separators=(',', ':'))
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"⚠️ Could not write machine index: {e}")
@@ -4,11 +4,30 @@ Manages deployment and lifecycle of Hackforge vulnerable machines
 """
 
 import subprocess
-import json
+import os
 import sys
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
-import time
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import docker
+except ImportError:
+    docker = None
+
+from container_inventory import ContainerInventory
+from base_images import BaseImageCatalog
+from machine_store import MachineConfigStore
+from backends import OrchestratorBackend, OperationResult, create_backend, ensure_network, load_compose_services
+from lifecycle import LifecycleExecutor
+from readiness import ReadinessProber, ProbeResult
+
+
+# Docker network machines join instead of publishing host ports
+DEFAULT_MACHINE_NETWORK = "hackforge_machines"
+
+# Port every machine's web server listens on inside its container
+MACHINE_HTTP_PORT = 80
 
 
 class DockerOrchestrator:
@@ -16,7 +35,7 @@ class DockerOrchestrator:
     Orchestrates Docker container deployment and management
     """
     
-    def __init__(self, machines_dir: str = None):
+    def __init__(self, machines_dir: str = None, backend: str = None):
         if machines_dir:
             self.machines_dir = Path(machines_dir)
         else:
@@ -24,6 +43,124 @@ class DockerOrchestrator:
             self.machines_dir = Path(__file__).parent.parent.parent / "core" / "generated_machines"
         
         self.compose_file = self.machines_dir / "docker-compose.yml"
+        
+        # One long-lived Docker client and container inventory, created on first use
+        self._docker_client = None
+        self._inventory = None
+        self._client_lock = threading.RLock()
+        
+        # Shared toolset images, built once per content hash
+        self.base_images = BaseImageCatalog(lambda: self.docker_client)
+        
+        # Parsed machine configs, re-read only when a config.json changes
+        self.machine_store = MachineConfigStore(self.machines_dir)
+        
+        # Lifecycle backend ("sdk", "compose" or "auto"), chosen on first use;
+        # per-container operations run in parallel up to a concurrency cap
+        self.backend_kind = backend or os.getenv('HACKFORGE_ORCHESTRATOR_BACKEND', 'auto')
+        self.lifecycle = LifecycleExecutor()
+        self._backend = None
+        
+        self.network = os.getenv('HACKFORGE_MACHINE_NETWORK', DEFAULT_MACHINE_NETWORK)
+        
+        # Started machines count as up once their web server answers
+        self.readiness = ReadinessProber(self.machine_address)
+    
+    @property
+    def docker_client(self):
+        """Shared Docker Engine API client"""
+        with self._client_lock:
+            if self._docker_client is None:
+                if docker is None:
+                    raise RuntimeError("Docker SDK not installed. Install with: pip3 install docker")
+                self._docker_client = docker.from_env()
+            return self._docker_client
+    
+    @property
+    def backend(self) -> OrchestratorBackend:
+        """Engine API backend, or docker-compose when the API is unavailable"""
+        with self._client_lock:
+            if self._backend is None:
+                self._backend = create_backend(self.backend_kind, lambda: self.docker_client, self.lifecycle)
+            return self._backend
+    
+    @property
+    def inventory(self) -> ContainerInventory:
+        """Container inventory keyed by machine_id, kept current from Docker events"""
+        with self._client_lock:
+            if self._inventory is None:
+                inventory = ContainerInventory(self.docker_client)
+                inventory.start()
+                self._inventory = inventory
+            return self._inventory
+    
+    def ensure_base_images(self, directory: Path = None) -> bool:
+        """Build any missing base images referenced by machines under a directory"""
+        
+        try:
+            results = self.base_images.ensure_for_directory(Path(directory or self.machines_dir))
+        except Exception as e:
+            print(f"❌ Could not prepare base images: {e}")
+            return False
+        
+        return all(results.values())
+    
+    def get_container(self, machine_id: str) -> Optional[Dict]:
+        """Get cached container info for a machine"""
+        return self.inventory.get(machine_id)
+    
+    def ensure_network(self):
+        """Create the machine network if it does not exist yet"""
+        ensure_network(self.docker_client, self.network)
+    
+    def machine_address(self, machine_id: str) -> Optional[Tuple[str, int]]:
+        """
+        Where a machine's web server can be reached from this host
+
+        Its IP on the machine network, or a published host port for machines
+        outside the network (standalone builds, campaigns started before
+        machines joined it). None if it is not reachable.
+        """
+        info = self.inventory.get(machine_id)
+        if info is not None:
+            if not info.get('ips', {}).get(self.network):
+                # The events stream may not have delivered the latest start yet
+                try:
+                    container = self.docker_client.containers.get(info['container_id'])
+                    info = ContainerInventory.describe(container, machine_id)
+                except Exception:
+                    pass
+            
+            ip = info.get('ips', {}).get(self.network)
+            if ip:
+                return ip, MACHINE_HTTP_PORT
+            
+            for bindings in (info.get('ports') or {}).values():
+                if bindings and bindings[0].get('HostPort'):
+                    return "127.0.0.1", int(bindings[0]['HostPort'])
+        
+        return None
+    
+    def wait_until_ready(self, machine_ids: List[str]) -> Dict[str, ProbeResult]:
+        """Probe machines until their web servers answer, printing the outcome"""
+        
+        results = self.readiness.probe_many(machine_ids)
+        for machine_id, probe in results.items():
+            if probe.ready:
+                print(f"  🟢 {machine_id} ready ({probe.elapsed:.1f}s, {probe.attempts} probe(s))")
+            else:
+                print(f"  🔴 {machine_id} not ready after {probe.elapsed:.1f}s: {probe.error}")
+        return results
+    
+    def close(self):
+        """Stop the events watcher and release the Docker client"""
+        with self._client_lock:
+            if self._inventory is not None:
+                self._inventory.stop()
+                self._inventory = None
+            if self._docker_client is not None:
+                self._docker_client.close()
+                self._docker_client = None
     
     def _run_command(self, command: List[str], cwd: str = None) -> tuple:
         """
@@ -47,10 +184,20 @@ class DockerOrchestrator:
             return (False, "", str(e))
     
     def check_docker_installed(self) -> bool:
-        """Check if Docker and Docker Compose are installed"""
+        """Check that Docker is reachable (and Docker Compose, when it is the backend)"""
         
         print("🔍 Checking Docker installation...")
         
+        try:
+            backend = self.backend
+        except Exception as e:
+            print(f"❌ Docker Engine API is not reachable: {e}")
+            return False
+        
+        if backend.name == "sdk":
+            print("✓ Docker Engine API is reachable")
+            return True
+        
         # Check Docker
         success, _, _ = self._run_command(["docker", "--version"])
         if not success:
@@ -83,39 +230,68 @@ class DockerOrchestrator:
         
         return True
     
+    def count_machines(self) -> int:
+        """Count machines known to the config store"""
+        return self.machine_store.count()
+    
     def list_machines(self) -> List[Dict]:
         """List all available machines"""
         
         machines = []
         
-        if not self.machines_dir.exists():
-            return machines
-        
-        # Find all machine directories
-        for machine_dir in self.machines_dir.iterdir():
-            if machine_dir.is_dir() and not machine_dir.name.startswith('.'):
-                config_file = machine_dir / "config.json"
-                
-                if config_file.exists():
-                    try:
-                        with open(config_file, 'r') as f:
-                            config = json.load(f)
-                        
-                        machines.append({
-                            'machine_id': config['machine_id'],
-                            'variant': config['variant'],
-                            'difficulty': config['difficulty'],
-                            'blueprint_id': config['blueprint_id'],
-                            'flag': config['flag']['content'],
-                            'directory': str(machine_dir)
-                        })
-                    except Exception as e:
-                        print(f"⚠️ Error reading config for {machine_dir.name}: {e}")
+        for config in self.machine_store.all():
+            try:
+                machines.append({
+                    'machine_id': config['machine_id'],
+                    'variant': config['variant'],
+                    'difficulty': config['difficulty'],
+                    'blueprint_id': config['blueprint_id'],
+                    'flag': config['flag']['content'],
+                    'directory': str(self.machine_store.directory(config['machine_id']))
+                })
+            except (KeyError, TypeError) as e:
+                print(f"⚠️ Incomplete config for {config.get('machine_id')}: {e}")
         
         return machines
     
-    def build_machines(self, no_cache: bool = False) -> bool:
-        """Build all machine Docker images"""
+    def run_lifecycle(self, project_dir: Path, action: str, machine_ids: List[str] = None) -> OperationResult:
+        """
+        Start, stop or restart the containers of one project directory (e.g. a campaign)
+        
+        Containers are handled in parallel; the result lists failures per
+        machine rather than failing the whole project.
+        """
+        if action == "start":
+            return self.backend.up(project_dir, machine_ids, build=False)
+        if action == "stop":
+            return self.backend.stop(project_dir, machine_ids)
+        if action == "restart":
+            return self.backend.restart(project_dir, machine_ids)
+        raise ValueError(f"Unknown lifecycle action: {action}")
+    
+    def _report(self, result: OperationResult, done: str, failed: str) -> bool:
+        """Print an operation's outcome per machine"""
+        
+        if result.output.strip():
+            print(result.output)
+        
+        for machine_id in result.succeeded:
+            if machine_id in result.timings:
+                print(f"  ✓ {machine_id} ({result.timings[machine_id]:.1f}s)")
+        for machine_id, error in result.errors.items():
+            print(f"  ✗ {machine_id}: {error}")
+        
+        elapsed = f" in {result.elapsed:.1f}s" if result.elapsed is not None else ""
+        if result.success:
+            print(f"\n✅ {done}{elapsed}")
+        elif result.succeeded:
+            print(f"\n⚠️ {failed} ({len(result.errors)} failed, {len(result.succeeded)} succeeded{elapsed})")
+        else:
+            print(f"\n❌ {failed}")
+        return result.success
+    
+    def build_machines(self, no_cache: bool = False, machine_ids: List[str] = None) -> bool:
+        """Build machine Docker images (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("🔨 Building Docker Images")
@@ -124,29 +300,17 @@ class DockerOrchestrator:
         if not self.check_machines_exist():
             return False
         
-        command = ["docker-compose", "build"]
-        if no_cache:
-            command.append("--no-cache")
+        if not self.ensure_base_images():
+            return False
         
-        print(f"\nRunning: {' '.join(command)}")
+        print(f"\nBuilding with the {self.backend.name} backend...")
         print("This may take a few minutes...\n")
         
-        success, stdout, stderr = self._run_command(command)
-        
-        if stdout:
-            print(stdout)
-        if stderr:
-            print(stderr)
-        
-        if success:
-            print("\n✅ All images built successfully!")
-            return True
-        else:
-            print("\n❌ Build failed!")
-            return False
+        result = self.backend.build(self.machines_dir, machine_ids, no_cache=no_cache)
+        return self._report(result, "Images built successfully!", "Build failed!")
     
-    def start_machines(self, build: bool = True, detached: bool = True) -> bool:
-        """Start all machines"""
+    def start_machines(self, build: bool = True, detached: bool = True, machine_ids: List[str] = None) -> bool:
+        """Start machines (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("🚀 Starting Machines")
@@ -155,37 +319,29 @@ class DockerOrchestrator:
         if not self.check_machines_exist():
             return False
         
-        command = ["docker-compose", "up"]
-        
-        if detached:
-            command.append("-d")
-        
-        if build:
-            command.append("--build")
+        if build and not self.ensure_base_images():
+            return False
         
-        print(f"\nRunning: {' '.join(command)}")
-        print("Starting containers...\n")
+        # Containers always start detached; follow output with logs_machines()
+        print(f"\nStarting containers with the {self.backend.name} backend...\n")
         
-        success, stdout, stderr = self._run_command(command)
+        result = self.backend.up(self.machines_dir, machine_ids, build=build)
         
-        if stdout:
-            print(stdout)
-        if stderr and "WARNING" not in stderr:
-            print(stderr)
+        success = self._report(result, "Machines started successfully!", "Failed to start machines!")
         
-        if success:
-            print("\n✅ All machines started successfully!")
-            
-            # Show running machines
-            time.sleep(2)
-            self.status_machines()
-            return True
-        else:
-            print("\n❌ Failed to start machines!")
-            return False
+        started = result.succeeded
+        if success and not started:
+            # Compose reports no per-service outcome for a whole-project up
+            started = list(load_compose_services(self.machines_dir))
+        if started:
+            print("\nWaiting for machines to serve requests...")
+            probes = self.wait_until_ready(started)
+            success = success and all(probe.ready for probe in probes.values())
+            self.status_machines(started)
+        return success
     
-    def stop_machines(self) -> bool:
-        """Stop all machines"""
+    def stop_machines(self, machine_ids: List[str] = None) -> bool:
+        """Stop machines (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("🛑 Stopping Machines")
@@ -195,26 +351,11 @@ class DockerOrchestrator:
             print("❌ No docker-compose.yml found")
             return False
         
-        command = ["docker-compose", "stop"]
-        
-        print(f"\nRunning: {' '.join(command)}\n")
-        
-        success, stdout, stderr = self._run_command(command)
-        
-        if stdout:
-            print(stdout)
-        if stderr and "WARNING" not in stderr:
-            print(stderr)
-        
-        if success:
-            print("\n✅ All machines stopped!")
-            return True
-        else:
-            print("\n❌ Failed to stop machines!")
-            return False
+        result = self.backend.stop(self.machines_dir, machine_ids)
+        return self._report(result, "Machines stopped!", "Failed to stop machines!")
     
-    def destroy_machines(self, remove_volumes: bool = False) -> bool:
-        """Destroy all machines and clean up"""
+    def destroy_machines(self, remove_volumes: bool = False, machine_ids: List[str] = None) -> bool:
+        """Destroy machines and clean up (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("💥 Destroying Machines")
@@ -224,29 +365,11 @@ class DockerOrchestrator:
             print("❌ No docker-compose.yml found")
             return False
         
-        command = ["docker-compose", "down"]
-        
-        if remove_volumes:
-            command.append("-v")
-        
-        print(f"\nRunning: {' '.join(command)}\n")
-        
-        success, stdout, stderr = self._run_command(command)
-        
-        if stdout:
-            print(stdout)
-        if stderr and "WARNING" not in stderr:
-            print(stderr)
-        
-        if success:
-            print("\n✅ All machines destroyed and cleaned up!")
-            return True
-        else:
-            print("\n❌ Failed to destroy machines!")
-            return False
+        result = self.backend.down(self.machines_dir, machine_ids, remove_volumes=remove_volumes)
+        return self._report(result, "Machines destroyed and cleaned up!", "Failed to destroy machines!")
     
-    def status_machines(self) -> List[Dict]:
-        """Get status of all machines"""
+    def status_machines(self, machine_ids: List[str] = None) -> List[Dict]:
+        """Get status of machines (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("📊 Machine Status")
@@ -256,28 +379,7 @@ class DockerOrchestrator:
             print("❌ No docker-compose.yml found")
             return []
         
-        command = ["docker-compose", "ps", "--format", "json"]
-        
-        success, stdout, stderr = self._run_command(command)
-        
-        if not success:
-            # Fallback to regular ps
-            command = ["docker-compose", "ps"]
-            success, stdout, stderr = self._run_command(command)
-            print(stdout)
-            return []
-        
-        # Parse JSON output
-        containers = []
-        try:
-            for line in stdout.strip().split('\n'):
-                if line:
-                    container = json.loads(line)
-                    containers.append(container)
-        except:
-            # If JSON parsing fails, just show raw output
-            print(stdout)
-            return []
+        containers = self.backend.ps(self.machines_dir, machine_ids)
         
         # Display formatted status
         if containers:
@@ -317,8 +419,8 @@ class DockerOrchestrator:
         
         return containers
     
-    def logs_machines(self, follow: bool = False, tail: int = 50) -> bool:
-        """Show logs from all machines"""
+    def logs_machines(self, follow: bool = False, tail: int = 50, machine_ids: List[str] = None) -> bool:
+        """Show logs from machines (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("📜 Machine Logs")
@@ -328,33 +430,22 @@ class DockerOrchestrator:
             print("❌ No docker-compose.yml found")
             return False
         
-        command = ["docker-compose", "logs", f"--tail={tail}"]
-        
-        if follow:
-            command.append("-f")
-        
-        print(f"Running: {' '.join(command)}\n")
-        
         if follow:
-            # Stream logs in real-time
+            # Interactive streaming is left to the docker-compose CLI
+            command = ["docker-compose", "logs", f"--tail={tail}", "-f", *(machine_ids or [])]
+            print(f"Running: {' '.join(command)}\n")
             try:
                 subprocess.run(command, cwd=str(self.machines_dir))
                 return True
             except KeyboardInterrupt:
                 print("\n\n✓ Stopped following logs")
                 return True
-        else:
-            success, stdout, stderr = self._run_command(command)
-            
-            if stdout:
-                print(stdout)
-            if stderr and "WARNING" not in stderr:
-                print(stderr)
-            
-            return success
+        
+        print(self.backend.logs(self.machines_dir, machine_ids, tail=tail))
+        return True
     
-    def restart_machines(self) -> bool:
-        """Restart all machines"""
+    def restart_machines(self, machine_ids: List[str] = None) -> bool:
+        """Restart machines (all, or only the given machines)"""
         
         print("\n" + "="*60)
         print("🔄 Restarting Machines")
@@ -364,25 +455,13 @@ class DockerOrchestrator:
             print("❌ No docker-compose.yml found")
             return False
         
-        command = ["docker-compose", "restart"]
-        
-        print(f"\nRunning: {' '.join(command)}\n")
+        result = self.backend.restart(self.machines_dir, machine_ids)
         
-        success, stdout, stderr = self._run_command(command)
+        success = self._report(result, "Machines restarted!", "Failed to restart machines!")
         
-        if stdout:
-            print(stdout)
-        if stderr and "WARNING" not in stderr:
-            print(stderr)
-        
-        if success:
-            print("\n✅ All machines restarted!")
-            time.sleep(2)
-            self.status_machines()
-            return True
-        else:
-            print("\n❌ Failed to restart machines!")
-            return False
+        if success or result.succeeded:
+            self.status_machines(machine_ids if success else result.succeeded)
+        return success
 
 
 def main():
@@ -396,7 +475,7 @@ def main():
 ║             HACKFORGE DOCKER ORCHESTRATOR                 ║
 ╚═══════════════════════════════════════════════════════════╝
 
-Usage: python3 orchestrator.py <command>
+Usage: python3 orchestrator.py <command> [machine_id ...]
 
 Commands:
   start       - Build and start all machines
@@ -412,50 +491,56 @@ Examples:
   python3 orchestrator.py start
   python3 orchestrator.py status
   python3 orchestrator.py logs -f
+  python3 orchestrator.py restart <machine_id>
   python3 orchestrator.py destroy
+
+Backend: $HACKFORGE_ORCHESTRATOR_BACKEND = auto (default) | sdk | compose
 """)
         sys.exit(0)
     
     command = sys.argv[1].lower()
     
+    # Remaining non-flag arguments select individual machines
+    machine_ids = [arg for arg in sys.argv[2:] if not arg.startswith('-')] or None
+    
     # Check Docker installation
     if not orchestrator.check_docker_installed():
         sys.exit(1)
     
     if command == "start":
-        success = orchestrator.start_machines()
+        success = orchestrator.start_machines(machine_ids=machine_ids)
         sys.exit(0 if success else 1)
     
     elif command == "stop":
-        success = orchestrator.stop_machines()
+        success = orchestrator.stop_machines(machine_ids)
         sys.exit(0 if success else 1)
     
     elif command == "restart":
-        success = orchestrator.restart_machines()
+        success = orchestrator.restart_machines(machine_ids)
         sys.exit(0 if success else 1)
     
     elif command == "destroy":
         print("\n⚠️  WARNING: This will stop and remove all containers!")
         confirm = input("Are you sure? (yes/no): ")
         if confirm.lower() == "yes":
-            success = orchestrator.destroy_machines(remove_volumes=True)
+            success = orchestrator.destroy_machines(remove_volumes=True, machine_ids=machine_ids)
             sys.exit(0 if success else 1)
         else:
             print("Cancelled")
             sys.exit(0)
     
     elif command == "status":
-        orchestrator.status_machines()
+        orchestrator.status_machines(machine_ids)
         sys.exit(0)
     
     elif command == "logs":
         follow = "-f" in sys.argv or "--follow" in sys.argv
-        success = orchestrator.logs_machines(follow=follow)
+        success = orchestrator.logs_machines(follow=follow, machine_ids=machine_ids)
         sys.exit(0 if success else 1)
     
     elif command == "build":
         no_cache = "--no-cache" in sys.argv
-        success = orchestrator.build_machines(no_cache=no_cache)
+        success = orchestrator.build_machines(no_cache=no_cache, machine_ids=machine_ids)
         sys.exit(0 if success else 1)
     
     elif command == "list":
@@ -0,0 +1,114 @@
+"""
+Readiness Probes
+Polls machines' web servers until they answer, instead of sleeping after start
+"""
+
+import http.client
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+DEFAULT_READINESS_TIMEOUT = 60.0
+
+
+class ProbeResult:
+    """Outcome of probing one machine"""
+
+    __slots__ = ('machine_id', 'ready', 'status', 'attempts', 'elapsed', 'error')
+
+    def __init__(self, machine_id: str):
+        self.machine_id = machine_id
+        self.ready = False
+        self.status: Optional[int] = None
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'status': self.status,
+            'attempts': self.attempts,
+            'elapsed': self.elapsed,
+            'error': self.error,
+        }
+
+
+class ReadinessProber:
+    """
+    Waits for machines to serve HTTP requests
+
+    Each machine is polled with GET `path` until it answers with a status
+    below 500, with exponential backoff between attempts, until `timeout`
+    seconds have passed. The machines of a campaign are probed concurrently,
+    so the wait is bounded by the slowest one rather than the sum.
+    """
+
+    def __init__(self, resolve: Callable[[str], Optional[Tuple[str, int]]], timeout: float = None,
+                 path: str = "/", initial_delay: float = 0.1, max_delay: float = 2.0,
+                 request_timeout: float = 2.0, concurrency: int = 16):
+        if timeout is None:
+            timeout = float(os.getenv('HACKFORGE_READINESS_TIMEOUT', DEFAULT_READINESS_TIMEOUT))
+
+        self.resolve = resolve
+        self.timeout = timeout
+        self.path = path
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+        self.concurrency = max(1, concurrency)
+
+    def probe(self, machine_id: str, deadline: float = None) -> ProbeResult:
+        """Poll one machine until it is ready or the deadline (time.monotonic()) passes"""
+        started = time.monotonic()
+        deadline = deadline or started + self.timeout
+        result = ProbeResult(machine_id)
+        delay = self.initial_delay
+
+        while True:
+            result.attempts += 1
+            try:
+                address = self.resolve(machine_id)
+                if address is None:
+                    # Not started yet, or no address on the machine network
+                    raise LookupError("machine has no address yet")
+                result.status = self._request(address, min(self.request_timeout, max(0.1, deadline - time.monotonic())))
+                if result.status < 500:
+                    result.ready = True
+                    result.error = None
+                    break
+                result.error = f"HTTP {result.status}"
+            except Exception as e:
+                result.error = str(e) or type(e).__name__
+
+            if time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+        result.elapsed = round(time.monotonic() - started, 2)
+        return result
+
+    def probe_many(self, machine_ids: Iterable[str]) -> Dict[str, ProbeResult]:
+        """Probe machines concurrently against one shared deadline"""
+        machine_ids = list(machine_ids)
+        if not machine_ids:
+            return {}
+
+        deadline = time.monotonic() + self.timeout
+        with ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(machine_ids)),
+            thread_name_prefix="hackforge-readiness"
+        ) as pool:
+            results = pool.map(lambda machine_id: self.probe(machine_id, deadline), machine_ids)
+            return {result.machine_id: result for result in results}
+
+    def _request(self, address: Tuple[str, int], timeout: float) -> int:
+        connection = http.client.HTTPConnection(address[0], address[1], timeout=timeout)
+        try:
+            connection.request("GET", self.path, headers={'User-Agent': 'hackforge-readiness'})
+            return connection.getresponse().status
+        finally:
+            connection.close()
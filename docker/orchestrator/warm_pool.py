@@ -0,0 +1,444 @@
+"""
+Warm Pool
+Keeps pre-built, already-running machine containers ready to hand to campaigns
+"""
+
+import io
+import json
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from base import MachineConfig
+from container_inventory import MACHINE_LABEL, CONTAINER_NAME_PREFIX
+
+
+POOL_LABEL = "hackforge.pool"
+MACHINE_IMAGE_REPOSITORY = "hackforge-machine"
+
+
+class WarmMachine:
+    """A provisioned machine waiting in the pool"""
+
+    __slots__ = ('config', 'machine_dir', 'container_id', 'ready_at')
+
+    def __init__(self, config, machine_dir: Path, container_id: str):
+        self.config = config
+        self.machine_dir = machine_dir
+        self.container_id = container_id
+        self.ready_at = time.time()
+
+    @property
+    def machine_id(self) -> str:
+        return self.config.machine_id
+
+
+class WarmPool:
+    """
+    Pool of ready machine containers per (blueprint_id, difficulty)
+
+    Each key has a low and a high watermark. Whenever the number of ready plus
+    in-flight machines drops below the low watermark, the refill thread
+    provisions machines until the high watermark is reached. Provisioning runs
+    generate -> render -> build -> start, so a campaign that hits the pool only
+    has to swap in its flag.
+
+    Machines handed to campaigns keep the pool label, so is_claimed tells
+    the startup reclaim which leftover containers still belong to someone;
+    without it, leftovers from a previous run are left alone.
+    """
+
+    def __init__(self, orchestrator, generator, template_engine, pool_dir: str,
+                 targets: Dict[Tuple[str, int], Tuple[int, int]] = None,
+                 refill_workers: int = 1,
+                 check_interval: float = 30.0,
+                 is_claimed: Callable[[str], bool] = None):
+        self.orchestrator = orchestrator
+        self.generator = generator
+        self.template_engine = template_engine
+        self.pool_dir = Path(pool_dir)
+        self.targets = dict(targets or {})
+        self.check_interval = check_interval
+        self.is_claimed = is_claimed
+
+        self._ready: Dict[Tuple[str, int], deque] = {key: deque() for key in self.targets}
+        self._in_flight: Dict[Tuple[str, int], int] = {key: 0 for key in self.targets}
+        self._lock = threading.Lock()
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, refill_workers),
+            thread_name_prefix="hackforge-warm-pool"
+        )
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'provisioned': 0,
+            'provision_failures': 0,
+            'adopted': 0,
+            'orphans_removed': 0,
+            'refill_seconds_total': 0.0,
+            'refill_seconds_last': None,
+            'refill_seconds_max': 0.0,
+        }
+
+    @staticmethod
+    def parse_targets(spec: str) -> Dict[Tuple[str, int], Tuple[int, int]]:
+        """
+        Parse a pool spec like "sqli_001:2:1:3,xss_001:2:2"
+
+        Each entry is blueprint_id:difficulty:low[:high]; high defaults to low.
+        """
+        targets = {}
+        for entry in (spec or "").split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+
+            parts = entry.split(':')
+            if len(parts) not in (3, 4):
+                raise ValueError(f"Invalid warm pool entry: {entry}")
+
+            blueprint_id, difficulty, low = parts[0], int(parts[1]), int(parts[2])
+            high = int(parts[3]) if len(parts) == 4 else low
+            if low < 0 or high < low:
+                raise ValueError(f"Invalid watermarks in warm pool entry: {entry}")
+
+            targets[(blueprint_id, difficulty)] = (low, high)
+        return targets
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.targets)
+
+    def start(self):
+        """
+        Start the background refill thread
+
+        It first reclaims containers left by a previous run. A disabled pool
+        only does that, so leftovers go away once the pool is switched off.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        if not self.enabled:
+            self._thread = threading.Thread(
+                target=self.reclaim_orphans,
+                name="hackforge-warm-pool-reclaim",
+                daemon=True
+            )
+            self._thread.start()
+            return
+
+        self.pool_dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._refill_loop,
+            name="hackforge-warm-pool-refill",
+            daemon=True
+        )
+        self._thread.start()
+        print(f"🔥 Warm pool started for {len(self.targets)} blueprint/difficulty targets")
+
+    def stop(self, drain: bool = True):
+        """Stop refilling and optionally remove machines nobody claimed"""
+        self._stop.set()
+        self._wake.set()
+        self._executor.shutdown(wait=False)
+
+        if drain:
+            with self._lock:
+                leftovers = [m for queue in self._ready.values() for m in queue]
+                for queue in self._ready.values():
+                    queue.clear()
+            for machine in leftovers:
+                self._discard(machine)
+
+    def acquire(self, blueprint_id: str, difficulty: int, flag: str) -> Optional[WarmMachine]:
+        """
+        Take a ready machine and swap in the given flag
+
+        Returns None on a pool miss; the caller falls back to a cold build.
+        """
+        key = (blueprint_id, difficulty)
+        if key not in self.targets:
+            return None
+
+        while True:
+            with self._lock:
+                queue = self._ready.get(key)
+                machine = queue.popleft() if queue else None
+                if machine is None:
+                    self.metrics['misses'] += 1
+                    self._wake.set()
+                    return None
+
+            self._wake.set()
+
+            try:
+                self._install_flag(machine, flag)
+            except Exception as e:
+                # Container went away or is broken; drop it and try the next one
+                print(f"⚠️ Warm machine {machine.machine_id} unusable: {e}")
+                self._discard(machine)
+                continue
+
+            with self._lock:
+                self.metrics['hits'] += 1
+            return machine
+
+    def holds(self, machine_id: str) -> bool:
+        """Whether a machine is waiting in the pool (and must stay running)"""
+        with self._lock:
+            return any(m.machine_id == machine_id for queue in self._ready.values() for m in queue)
+
+    def stats(self) -> Dict:
+        """Pool levels, hit rate and refill latency"""
+        with self._lock:
+            lookups = self.metrics['hits'] + self.metrics['misses']
+            provisioned = self.metrics['provisioned']
+
+            return {
+                'enabled': self.enabled,
+                'hits': self.metrics['hits'],
+                'misses': self.metrics['misses'],
+                'hit_rate': round(self.metrics['hits'] / lookups, 3) if lookups else None,
+                'provisioned': provisioned,
+                'provision_failures': self.metrics['provision_failures'],
+                'adopted': self.metrics['adopted'],
+                'orphans_removed': self.metrics['orphans_removed'],
+                'refill_seconds_avg': (
+                    round(self.metrics['refill_seconds_total'] / provisioned, 2) if provisioned else None
+                ),
+                'refill_seconds_last': self.metrics['refill_seconds_last'],
+                'refill_seconds_max': round(self.metrics['refill_seconds_max'], 2),
+                'targets': [
+                    {
+                        'blueprint_id': blueprint_id,
+                        'difficulty': difficulty,
+                        'low_watermark': low,
+                        'high_watermark': high,
+                        'ready': len(self._ready[(blueprint_id, difficulty)]),
+                        'in_flight': self._in_flight[(blueprint_id, difficulty)],
+                    }
+                    for (blueprint_id, difficulty), (low, high) in self.targets.items()
+                ],
+            }
+
+    def _refill_loop(self):
+        self.reclaim_orphans()
+
+        while not self._stop.is_set():
+            self._wake.clear()
+
+            for key, count in self._deficits():
+                for _ in range(count):
+                    self._executor.submit(self._provision, key)
+
+            self._wake.wait(self.check_interval)
+
+    def reclaim_orphans(self) -> Tuple[int, int]:
+        """
+        Adopt or remove warm containers left behind by a previous run
+
+        Unclaimed running containers whose target still has room are put back
+        in the pool; the rest are removed with their files. Returns
+        (adopted, removed).
+        """
+        if self.is_claimed is None:
+            return 0, 0
+
+        try:
+            containers = self.orchestrator.docker_client.containers.list(
+                all=True, filters={'label': f"{POOL_LABEL}=warm"}
+            )
+        except Exception as e:
+            print(f"⚠️ Could not list leftover warm containers: {e}")
+            return 0, 0
+
+        adopted = removed = 0
+        seen = set()
+        for container in containers:
+            machine_id = container.labels.get(MACHINE_LABEL)
+            if not machine_id:
+                continue
+            seen.add(machine_id)
+            try:
+                if self.is_claimed(machine_id):
+                    continue
+            except Exception as e:
+                print(f"⚠️ Could not tell whether {machine_id} is claimed: {e}")
+                continue
+
+            machine = self._adoptable(machine_id, container)
+            if machine is not None:
+                key = (machine.config.blueprint_id, machine.config.difficulty)
+                with self._lock:
+                    if len(self._ready[key]) + self._in_flight[key] < self.targets[key][1]:
+                        self._ready[key].append(machine)
+                        adopted += 1
+                        continue
+
+            self._remove(container.id, self.pool_dir / machine_id)
+            removed += 1
+
+        # Files of builds that never got a container
+        if self.pool_dir.exists():
+            for machine_dir in self.pool_dir.iterdir():
+                if machine_dir.is_dir() and machine_dir.name not in seen:
+                    try:
+                        if self.is_claimed(machine_dir.name):
+                            continue
+                    except Exception:
+                        continue
+                    shutil.rmtree(machine_dir, ignore_errors=True)
+
+        with self._lock:
+            self.metrics['adopted'] += adopted
+            self.metrics['orphans_removed'] += removed
+        if adopted or removed:
+            print(f"♻️ Warm pool reclaimed leftovers: {adopted} adopted, {removed} removed")
+        return adopted, removed
+
+    def _adoptable(self, machine_id: str, container) -> Optional[WarmMachine]:
+        """A leftover container as a pool machine, if it is running and still targeted"""
+        config_file = self.pool_dir / machine_id / "config.json"
+        if container.status != 'running' or not config_file.exists():
+            return None
+        try:
+            config = MachineConfig(**json.loads(config_file.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+        if (config.blueprint_id, config.difficulty) not in self.targets:
+            return None
+        return WarmMachine(config, config_file.parent, container.id)
+
+    def _deficits(self) -> List[Tuple[Tuple[str, int], int]]:
+        """Keys below their low watermark and how many machines to add"""
+        deficits = []
+        with self._lock:
+            for key, (low, high) in self.targets.items():
+                level = len(self._ready[key]) + self._in_flight[key]
+                if level < low:
+                    deficits.append((key, high - level))
+                    self._in_flight[key] += high - level
+        return deficits
+
+    def _provision(self, key: Tuple[str, int]):
+        blueprint_id, difficulty = key
+        started = time.time()
+        machine = None
+
+        try:
+            machine = self._build_machine(blueprint_id, difficulty)
+        except Exception as e:
+            print(f"❌ Warm pool provisioning failed for {blueprint_id} (difficulty {difficulty}): {e}")
+
+        elapsed = time.time() - started
+
+        with self._lock:
+            self._in_flight[key] -= 1
+            if machine is None:
+                self.metrics['provision_failures'] += 1
+                return
+
+            if self._stop.is_set():
+                stale = machine
+            else:
+                stale = None
+                self._ready[key].append(machine)
+                self.metrics['provisioned'] += 1
+                self.metrics['refill_seconds_total'] += elapsed
+                self.metrics['refill_seconds_last'] = round(elapsed, 2)
+                self.metrics['refill_seconds_max'] = max(self.metrics['refill_seconds_max'], elapsed)
+
+        if stale is not None:
+            self._discard(stale)
+        else:
+            print(f"✓ Warm machine {machine.machine_id} ready ({elapsed:.1f}s)")
+
+    def _build_machine(self, blueprint_id: str, difficulty: int) -> WarmMachine:
+        seed = f"pool_{blueprint_id}_{difficulty}_{uuid.uuid4().hex}"
+        config = self.generator.generate_machine(blueprint_id, seed, difficulty)
+        if config is None:
+            raise RuntimeError(f"Could not generate machine from {blueprint_id}")
+
+        machine_dir = self.pool_dir / config.machine_id
+        machine_dir.mkdir(parents=True, exist_ok=True)
+        (machine_dir / "config.json").write_text(json.dumps(config.to_dict(), indent=2))
+
+        if not self.template_engine.generate_machine_app(config, machine_dir):
+            raise RuntimeError(f"Could not render machine {config.machine_id}")
+
+        if not self.orchestrator.ensure_base_images(machine_dir):
+            raise RuntimeError("Base image build failed")
+
+        client = self.orchestrator.docker_client
+        image, _ = client.images.build(
+            path=str(machine_dir),
+            tag=f"{MACHINE_IMAGE_REPOSITORY}:{config.machine_id}",
+            rm=True
+        )
+
+        # Like campaign machines, warm ones are only reachable through the ingress
+        self.orchestrator.ensure_network()
+        container = client.containers.run(
+            image.id,
+            detach=True,
+            name=f"{CONTAINER_NAME_PREFIX}{config.machine_id}",
+            network=self.orchestrator.network,
+            labels={
+                MACHINE_LABEL: config.machine_id,
+                POOL_LABEL: 'warm',
+            },
+            restart_policy={'Name': 'unless-stopped'}
+        )
+
+        return WarmMachine(config, machine_dir, container.id)
+
+    def _install_flag(self, machine: WarmMachine, flag: str):
+        """Write a new flag into the running container and the machine's files"""
+        flag_location = machine.config.flag.get('location', '/var/www/html/flag.txt')
+        flag_location = flag_location.replace(':', '_').replace('//', '/')
+        if not flag_location.startswith('/'):
+            flag_location = '/' + flag_location
+        flag_path = Path(flag_location)
+
+        data = flag.encode()
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w') as tar:
+            info = tarfile.TarInfo(name=flag_path.name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+
+        container = self.orchestrator.docker_client.containers.get(machine.container_id)
+        if container.status != 'running':
+            raise RuntimeError(f"container is {container.status}")
+        if not container.put_archive(str(flag_path.parent), archive.getvalue()):
+            raise RuntimeError("flag upload rejected")
+
+        machine.config.flag['content'] = flag
+        (machine.machine_dir / "flag.txt").write_text(flag)
+        (machine.machine_dir / "config.json").write_text(json.dumps(machine.config.to_dict(), indent=2))
+
+    def _discard(self, machine: WarmMachine):
+        self._remove(machine.container_id, machine.machine_dir)
+
+    def _remove(self, container_id: str, machine_dir: Path):
+        try:
+            container = self.orchestrator.docker_client.containers.get(container_id)
+            container.remove(force=True)
+        except Exception:
+            pass
+        shutil.rmtree(machine_dir, ignore_errors=True)
@@ -309,6 +309,7 @@ show_summary() {
     echo "  • Frontend:  http://localhost:3000"
     echo "  • API:       http://localhost:8000"
     echo "  • API Docs:  http://localhost:8000/docs"
+    echo "  • Machines:  http://localhost:${HACKFORGE_INGRESS_PORT:-8880}/<machine_id>/"
     echo "  • MongoDB:   mongodb://localhost:27017"
     echo ""
     
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Render Micro-benchmark
+Per-machine cost of building a challenge page: per-call f-string assembly
+(how category templates used to render) versus compiled templates
+
+Usage: python3 tests/benchmark_render.py [--machines 2000] [--repeat 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Measure rendering itself, not the on-disk render cache
+os.environ['HACKFORGE_RENDER_CACHE_MB'] = '0'
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "core"))
+
+from generator import DynamicHackforgeGenerator
+from templates.base_template import TemplateRenderer
+from templates.theme_library import ThemeLibrary
+
+
+def fstring_page(template) -> str:
+    """The page as category templates assembled it before compilation"""
+    app = template.config.application
+    constraints = template.config.constraints
+
+    context = app.get('context', 'default')
+    filters = constraints.get('filters', [])
+
+    filter_code = template._generate_filter_code(filters, 'php')
+
+    theme_stylesheet = ThemeLibrary.stylesheet_link(template.theme_name)
+    placeholder = template.theme.get('placeholder', 'Enter input')
+    button_text = template.theme.get('button_text', 'Submit')
+    variant = template.variant
+
+    return f'''<?php
+/**
+ * Hackforge Machine: {template.machine_id}
+ * Vulnerability: {variant}
+ * Theme: {template.theme['name']}
+ * Difficulty: {template.difficulty}/5
+ */
+?>
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{variant} Challenge</title>
+    {theme_stylesheet}
+</head>
+<body>
+    <div class="container">
+        <h1>{variant}</h1>
+        <p>Context: {context}</p>
+
+        <form method="GET">
+            <input type="text" name="input" placeholder="{placeholder}">
+            <button type="submit">{button_text}</button>
+        </form>
+
+        <?php
+        if (isset($_GET['input'])) {{
+            $input = $_GET['input'];
+            {filter_code if filter_code else '// No filters'}
+            echo '<div class="result">';
+            echo '<h3>Results:</h3>';
+            echo '<div>' . $input . '</div>';
+            echo '</div>';
+        }}
+        ?>
+
+        <div class="hint">
+            <strong>💡 Hint:</strong> This is a {context} context. Can you find the vulnerability?
+        </div>
+    </div>
+</body>
+</html>'''
+
+
+def per_machine_us(func, count: int, repeat: int) -> float:
+    """Best-of-`repeat` time per machine in microseconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hackforge render micro-benchmark')
+    parser.add_argument('--machines', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = DynamicHackforgeGenerator()
+
+        # Only blueprints whose template module loads
+        blueprint_ids = []
+        for blueprint_id in generator.blueprints:
+            try:
+                TemplateRenderer.get_template_class(generator.generate_machine(blueprint_id, "probe", 2))
+                blueprint_ids.append(blueprint_id)
+            except Exception:
+                pass
+
+        machines = list(generator.generate_batch(
+            generator.plan_batch(args.machines, 2, "benchmark", blueprint_ids), workers=1
+        ))
+
+        # Template instances are built up front so only page assembly is timed
+        templates = [TemplateRenderer.get_template_class(m)(m) for m in machines]
+
+    mismatches = sum(fstring_page(t) != t.render_variant_page() for t in templates)
+    if mismatches:
+        print(f"✗ {mismatches} machines render differently")
+        sys.exit(1)
+
+    def run_fstring():
+        for template in templates:
+            fstring_page(template)
+
+    def run_compiled():
+        for template in templates:
+            template.render_variant_page()
+
+    def run_full_render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for machine in machines:
+                TemplateRenderer.render(machine)
+
+    count = len(templates)
+    before = per_machine_us(run_fstring, count, args.repeat)
+    after = per_machine_us(run_compiled, count, args.repeat)
+    full = per_machine_us(run_full_render, count, args.repeat)
+
+    print("=" * 60)
+    print(f"Render benchmark ({count} machines, best of {args.repeat})")
+    print("=" * 60)
+    print(f"  f-string page assembly:   {before:8.2f} µs/machine")
+    print(f"  compiled page assembly:   {after:8.2f} µs/machine ({before / after:.2f}x)")
+    print(f"  full TemplateRenderer.render (uncached): {full:8.2f} µs/machine")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,12 @@ FIXED VERSION - Correct paths for your project structure
 import docker
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import sys
 import os
+import asyncio
 from pathlib import Path
 import json
 import time
@@ -44,12 +46,19 @@ sys.path.insert(0, str(DATABASE_PATH))
 
 from generator import DynamicHackforgeGenerator
 from template_engine import TemplateEngine
+from templates.base_template import TemplateRenderer
 from orchestrator import DockerOrchestrator
+from backends import load_compose_services
+from build_jobs import BuildJobManager
+from warm_pool import WarmPool
+from idle_suspender import IdleSuspender
+from ingress import Ingress
 from base import MachineConfig
+from blueprint_registry import get_blueprint_registry
 
 # Import database
 try:
-    from database import get_db
+    from database import get_db, get_async_db
 except ImportError as e:
     logger.error(f"Failed to import database: {e}")
     print("Warning: Database module not found. Install dependencies:")
@@ -73,8 +82,6 @@ app.add_middleware(
 
 # Initialize with correct paths
 generator = DynamicHackforgeGenerator(core_dir=str(CORE_PATH))
-template_engine = TemplateEngine()
-
 # FIXED: Point orchestrator to correct machines directory
 # Campaigns are stored in: forge/core/campaigns/campaign_XXX/
 GENERATED_MACHINES_DIR = CORE_PATH / "generated_machines"
@@ -82,11 +89,85 @@ orchestrator = DockerOrchestrator(machines_dir=str(GENERATED_MACHINES_DIR))
 
 logger.info(f"Orchestrator watching: {GENERATED_MACHINES_DIR}")
 
+# Campaign machines join the orchestrator's network instead of publishing host ports
+template_engine = TemplateEngine(network=orchestrator.network)
+
+# Campaign builds run in a bounded worker pool, off the event loop
+build_jobs = BuildJobManager(max_workers=int(os.getenv('HACKFORGE_BUILD_WORKERS', '2')))
+
 db = get_db()
 
+# Handlers await the async facade so MongoDB round trips never block the event loop;
+# code already running on worker threads (build jobs) uses `db` directly
+adb = get_async_db()
+
+# Pre-provisioned containers per (blueprint, difficulty), e.g. "sqli_001:2:1:3"
+warm_pool = WarmPool(
+    orchestrator,
+    generator,
+    template_engine,
+    pool_dir=str(CORE_PATH / "warm_pool"),
+    targets=WarmPool.parse_targets(os.getenv('HACKFORGE_WARM_POOL', '')),
+    refill_workers=int(os.getenv('HACKFORGE_WARM_POOL_WORKERS', '1')),
+    # Leftover warm containers registered to a campaign were claimed before a restart
+    is_claimed=lambda machine_id: db.get_machine(machine_id) is not None
+)
+
+# Containers nobody requested for a while are stopped (or paused) and woken by the ingress
+idle_suspender = IdleSuspender(
+    orchestrator,
+    idle_seconds=float(os.getenv('HACKFORGE_IDLE_SUSPEND_SECONDS', '0')),
+    mode=os.getenv('HACKFORGE_IDLE_SUSPEND_MODE', 'stop'),
+    check_interval=float(os.getenv('HACKFORGE_IDLE_CHECK_INTERVAL', '60')),
+    is_protected=warm_pool.holds,
+    state_file=str(CORE_PATH / "suspended_machines.json")
+)
+
+# Single entry point for players: /<machine_id>/ or <machine_id>.<HACKFORGE_INGRESS_DOMAIN>
+ingress = Ingress(
+    orchestrator.machine_address,
+    idle_suspender,
+    host=os.getenv('HACKFORGE_INGRESS_HOST', '0.0.0.0'),
+    port=int(os.getenv('HACKFORGE_INGRESS_PORT', '8880')),
+    domain=os.getenv('HACKFORGE_INGRESS_DOMAIN')
+)
+
 logger.info("✓ All components initialized")
 
 
+@app.on_event("startup")
+async def start_warm_pool():
+    warm_pool.start()
+
+@app.on_event("startup")
+async def start_machine_store():
+    orchestrator.machine_store.start_watching(
+        interval=float(os.getenv('HACKFORGE_MACHINE_SCAN_INTERVAL', '2'))
+    )
+
+@app.on_event("startup")
+async def start_idle_suspension():
+    idle_suspender.start()
+    await ingress.start()
+
+@app.on_event("shutdown")
+async def stop_idle_suspension():
+    idle_suspender.stop()
+    await ingress.stop()
+
+@app.on_event("shutdown")
+async def stop_machine_store():
+    orchestrator.machine_store.stop_watching()
+
+@app.on_event("shutdown")
+async def stop_warm_pool():
+    warm_pool.stop(drain=True)
+
+@app.on_event("shutdown")
+async def close_database_executor():
+    adb.close()
+
+
 # ============================================================================
 # Pydantic Models
 # ============================================================================
@@ -108,6 +189,10 @@ class CampaignCreateRequest(BaseModel):
     count: Optional[int] = None
 
 
+class LifecycleRequest(BaseModel):
+    machine_ids: Optional[List[str]] = None
+
+
 # ============================================================================
 # User Endpoints
 # ============================================================================
@@ -128,7 +213,7 @@ async def create_user(user: UserCreate):
     }
 
     try:
-        created_user = db.create_user(user_data)
+        created_user = await adb.create_user(user_data)
         return created_user
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -136,13 +221,13 @@ async def create_user(user: UserCreate):
 @app.get("/api/users/{user_id}")
 async def get_user(user_id: str):
     """Get user details"""
-    user = db.get_user(user_id)
+    user = await adb.get_user(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Get user's rank
-    rank = db.get_user_rank(user_id)
+    rank = await adb.get_user_rank(user_id)
     user['rank'] = rank
 
     return user
@@ -150,12 +235,14 @@ async def get_user(user_id: str):
 @app.get("/api/users/{user_id}/progress")
 async def get_user_progress(user_id: str):
     """Get user's overall progress"""
-    user = db.get_user(user_id)
+    user = await adb.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    campaigns = db.get_user_campaigns(user_id)
-    submissions = db.get_user_submissions(user_id, limit=10)
+    campaigns, submissions = await asyncio.gather(
+        adb.get_user_campaigns(user_id),
+        adb.get_user_submissions(user_id, limit=10)
+    )
 
     return {
         'user': user,
@@ -168,7 +255,7 @@ async def get_user_campaigns_list(user_id: str):
     """Get list of user's campaigns"""
     try:
         logger.info(f"Fetching campaigns for user: {user_id}")
-        campaigns = db.get_user_campaigns(user_id)
+        campaigns = await adb.get_user_campaigns(user_id)
         logger.info(f"Found {len(campaigns)} campaigns")
         
         # Add progress info to each campaign
@@ -178,7 +265,7 @@ async def get_user_campaigns_list(user_id: str):
                 if '_id' in campaign:
                     del campaign['_id']
                 
-                progress_list = db.get_campaign_progress(user_id, campaign['campaign_id'])
+                progress_list = await adb.get_campaign_progress(user_id, campaign['campaign_id'])
                 solved = sum(1 for p in progress_list if p.get('solved', False))
                 campaign['machines_solved'] = solved
                 campaign['progress_percentage'] = (solved / campaign['machine_count'] * 100) if campaign['machine_count'] > 0 else 0
@@ -200,95 +287,176 @@ async def get_user_campaigns_list(user_id: str):
 # Campaign Endpoints with Database
 # ============================================================================
 
-def start_campaign_containers(campaign_path: Path):
+def _machine_url(machine_id: str) -> str:
+    """Player-facing URL of a machine (always through the ingress)"""
+    return ingress.public_url(machine_id)
+
+def _log_operation(result, campaign_path: Path) -> bool:
+    """Log the per-machine errors of a lifecycle operation"""
+    for machine_id, error in result.errors.items():
+        logger.error(f"✗ {result.action} failed for {machine_id} in {campaign_path.name}: {error}")
+    return result.success
+
+def build_campaign_images(campaign_path: Path) -> bool:
+    """
+    Build Docker images for a campaign
+    """
+    logger.info(f"Building images for {campaign_path.name} ({orchestrator.backend.name} backend)...")
+    return _log_operation(orchestrator.backend.build(campaign_path), campaign_path)
+
+def start_campaign_containers(campaign_path: Path, build: bool = True) -> bool:
     """
     Start Docker containers for a campaign
     """
+    logger.info(f"Starting containers for {campaign_path.name}...")
+
+    if _log_operation(orchestrator.backend.up(campaign_path, build=build), campaign_path):
+        logger.info(f"✓ Containers started successfully")
+        return True
+    return False
+
+def campaign_containers_running(campaign_path: Path) -> bool:
+    """
+    Check that every container of a campaign reports the running state
+    """
     try:
-        import subprocess
-        
-        compose_file = campaign_path / "docker-compose.yml"
-        
-        if not compose_file.exists():
-            logger.warning(f"No docker-compose.yml found in {campaign_path}")
-            return False
-        
-        logger.info(f"Starting containers for {campaign_path.name}...")
-        
-        # Run docker-compose up -d --build
-        result = subprocess.run(
-            ["docker-compose", "up", "-d", "--build"],
-            cwd=str(campaign_path),
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-        
-        if result.returncode == 0:
-            logger.info(f"✓ Containers started successfully")
-            return True
-        else:
-            logger.error(f"✗ Failed to start containers: {result.stderr}")
-            return False
-            
+        containers = orchestrator.backend.ps(campaign_path)
     except Exception as e:
-        logger.error(f"Error starting containers: {e}")
+        logger.warning(f"Could not query container state: {e}")
         return False
 
-@app.post("/api/campaigns")
-async def create_campaign(request: CampaignCreateRequest, background_tasks: BackgroundTasks):
-    """Create a new campaign with database tracking"""
+    return bool(containers) and all(c.get('State') == 'running' for c in containers)
+
+
+def remove_campaign_containers(campaign_id: str, machines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Remove a campaign's containers: its compose project plus any warm pool machines
+    """
+    campaign_path = CORE_PATH / "campaigns" / campaign_id
+    compose_down = None
+    if (campaign_path / "docker-compose.yml").exists():
+        compose_down = _log_operation(orchestrator.backend.down(campaign_path), campaign_path)
+
+    # Warm pool machines were started outside the campaign's compose project
+    removed = []
+    for machine in machines:
+        if not machine.get('warm'):
+            continue
+        try:
+            orchestrator.docker_client.containers.get(f"hackforge_{machine['machine_id']}").remove(force=True)
+            removed.append(machine['machine_id'])
+        except Exception as e:
+            logger.warning(f"Could not remove warm container {machine['machine_id']}: {e}")
+
+    return {'compose_down': compose_down, 'warm_containers_removed': removed}
+
+def abort_campaign(campaign_id: str, warm_machine_ids: List[str], error: Exception):
+    """
+    Clean up after a failed campaign build
+
+    Its containers are removed and the campaign (if it was saved) is marked
+    failed, so it is neither counted as active nor accepts flags.
+    """
+    logger.error(f"✗ Campaign {campaign_id} failed: {error}")
+    try:
+        remove_campaign_containers(campaign_id, [{'machine_id': m, 'warm': True} for m in warm_machine_ids])
+    except Exception as e:
+        logger.warning(f"Could not remove containers of failed campaign {campaign_id}: {e}")
+    try:
+        db.fail_campaign(campaign_id, str(error))
+    except Exception as e:
+        logger.warning(f"Could not mark campaign {campaign_id} failed: {e}")
+
+def check_campaign_readiness(campaign_id: str, machine_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Probe machines until they serve HTTP requests and record the results on the campaign
+    """
+    probes = orchestrator.readiness.probe_many(machine_ids)
+    results = {machine_id: probe.to_dict() for machine_id, probe in probes.items()}
+
+    for machine_id, probe in results.items():
+        if probe['ready']:
+            logger.info(f"✓ {machine_id} ready after {probe['elapsed']}s ({probe['attempts']} probe(s))")
+        else:
+            logger.warning(f"✗ {machine_id} not ready after {probe['elapsed']}s: {probe['error']}")
+
+    try:
+        db.record_readiness(campaign_id, results)
+    except Exception as e:
+        logger.warning(f"Could not record readiness of {campaign_id}: {e}")
+    return results
+
+def run_campaign_pipeline(request: CampaignCreateRequest, campaign_id: str, report) -> Dict[str, Any]:
+    """
+    Campaign build pipeline, executed by a build worker
+
+    Stages: generated → exported → rendered → saved → image_built → container_healthy
+
+    The campaign is saved as 'provisioning' and only goes 'active' once every
+    machine serves requests. If any stage fails, its containers are removed
+    and the campaign is marked 'failed'.
+    """
+    warm_machines = {}
+    try:
+        return _build_campaign(request, campaign_id, report, warm_machines)
+    except Exception as e:
+        abort_campaign(campaign_id, list(warm_machines), e)
+        raise
 
+def _build_campaign(request: CampaignCreateRequest, campaign_id: str, report,
+                    warm_machines: Dict[str, Any]) -> Dict[str, Any]:
+    """Body of run_campaign_pipeline; warm machines are added to `warm_machines` as they are acquired"""
     logger.info("=" * 60)
-    logger.info(f"CREATING CAMPAIGN: {request.campaign_name}")
+    logger.info(f"CREATING CAMPAIGN: {request.campaign_name} ({report.job_id})")
     logger.info(f"User: {request.user_id}, Difficulty: {request.difficulty}, Count: {request.count}")
 
-
     # Generate campaign
     logger.info("Generating machines...")
-    try:
-        machines = generator.generate_campaign(
-            user_id=request.user_id,
-            difficulty=request.difficulty,
-            count=request.count
-        )
-        logger.info(f"✓ Generated {len(machines)} machines")
-    except Exception as e:
-        logger.error(f"Generation failed: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Failed to generate campaign: {str(e)}")
+    machines = generator.generate_campaign(
+        user_id=request.user_id,
+        difficulty=request.difficulty,
+        count=request.count
+    )
 
     if not machines:
-        raise HTTPException(status_code=500, detail="No machines were generated")
+        raise RuntimeError("No machines were generated")
 
-    # FIXED: Create campaign-specific directory
-    campaign_id = f"campaign_{int(time.time())}"
-    campaign_output_dir = f"campaigns/{campaign_id}"
+    logger.info(f"✓ Generated {len(machines)} machines")
+    report('generated', f"Generated {len(machines)} machines")
 
-    logger.info(f"Campaign ID: {campaign_id}")
-    logger.info("Exporting campaign...")
+    # Hand out ready containers from the warm pool; only misses are built cold
+    for i, machine in enumerate(machines):
+        warm = warm_pool.acquire(machine.blueprint_id, machine.difficulty, machine.flag['content'])
+        if warm:
+            machines[i] = warm.config
+            warm_machines[warm.machine_id] = warm
+            logger.info(f"✓ Warm pool hit: {machine.blueprint_id} -> {warm.machine_id}")
 
-    try:
+    cold_machines = [m for m in machines if m.machine_id not in warm_machines]
+    campaign_path = None
+    machine_infos = []
+
+    if cold_machines:
         # Export with specific campaign directory
-        campaign_path = generator.export_campaign(machines, output_dir=campaign_output_dir)
+        logger.info(f"Campaign ID: {campaign_id}")
+        campaign_path = generator.export_campaign(cold_machines, output_dir=f"campaigns/{campaign_id}")
         logger.info(f"✓ Campaign exported to: {campaign_path}")
-    except Exception as e:
-        logger.error(f"Export failed: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Failed to export campaign: {str(e)}")
+        report('exported', f"Exported to {campaign_path}")
 
-    # Generate applications
-    logger.info("Generating Docker applications...")
-    try:
-        machine_infos = template_engine.generate_campaign_apps(campaign_path)
-        logger.info(f"✓ Generated {len(machine_infos)} apps")
-    except Exception as e:
-        logger.warning(f"Failed to generate apps: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        machine_infos = []
+        # Generate applications
+        logger.info("Generating Docker applications...")
+        try:
+            machine_infos = template_engine.generate_campaign_apps(campaign_path)
+            logger.info(f"✓ Generated {len(machine_infos)} apps")
+        except Exception as e:
+            logger.warning(f"Failed to generate apps: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            machine_infos = []
+        report('rendered', f"Rendered {len(machine_infos)} applications")
+    else:
+        report('exported', "All machines served from the warm pool")
+        report('rendered', "All machines served from the warm pool")
 
     # Prepare campaign data for database
     campaign_data = {
@@ -297,7 +465,8 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
         'user_id': request.user_id,
         'difficulty': request.difficulty,
         'machine_count': len(machines),
-        'status': 'active',
+        'status': 'provisioning',
+        'build_job_id': report.job_id,
         'machines': [
             {
                 'machine_id': m.machine_id,
@@ -305,69 +474,212 @@ async def create_campaign(request: CampaignCreateRequest, background_tasks: Back
                 'difficulty': m.difficulty,
                 'blueprint_id': m.blueprint_id,
                 'flag': m.flag['content'],
-                'port': machine_infos[i]['port'] if i < len(machine_infos) else None
+                'url': _machine_url(m.machine_id),
+                'warm': m.machine_id in warm_machines,
+                'ready': False
             }
-            for i, m in enumerate(machines)
+            for m in machines
         ]
     }
 
     # Save to database
     logger.info("Saving to MongoDB...")
-    try:
-        db.create_campaign(campaign_data)
-        logger.info("✓ Saved to database")
-    except Exception as e:
-        logger.error(f"Database save failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    db.create_campaign(campaign_data)
+    logger.info("✓ Saved to database")
 
     # Create progress records
     logger.info("Creating progress records...")
-    for machine in machines:
-        try:
-            progress_data = {
+    try:
+        created = db.create_progress_many(
+            {
                 'user_id': request.user_id,
                 'machine_id': machine.machine_id,
                 'campaign_id': campaign_id
             }
-            db.create_progress(progress_data)
-        except Exception as e:
-            logger.warning(f"Progress record failed for {machine.machine_id}: {e}")
-
-    # ✨ NEW: Start Docker containers automatically
-    logger.info("Starting Docker containers...")
-    try:
-        containers_started = start_campaign_containers(Path(campaign_path))
-        if containers_started:
-            logger.info("✓ Docker containers started successfully")
-        else:
-            logger.warning("⚠ Failed to start containers automatically")
+            for machine in machines
+        )
+        logger.info(f"✓ Created {created} progress records")
     except Exception as e:
-        logger.warning(f"⚠ Could not start containers: {e}")
-        # Don't fail the entire campaign creation if containers fail to start
+        logger.warning(f"Progress records failed for {campaign_id}: {e}")
+
+    result = {
+        'campaign_id': campaign_id,
+        'campaign_name': request.campaign_name,
+        'user_id': request.user_id,
+        'difficulty': request.difficulty,
+        'machines': campaign_data['machines'],
+        'status': 'provisioning',
+        'containers_started': False
+    }
+    report('saved', "Campaign saved to database", result=result)
+
+    if campaign_path:
+        # Build and start Docker containers (shared base images first)
+        if not orchestrator.ensure_base_images(Path(campaign_path)):
+            raise RuntimeError("Failed to build base images")
+        if not build_campaign_images(Path(campaign_path)):
+            raise RuntimeError("Failed to build Docker images")
+        report('image_built', "Docker images built")
+
+        if not start_campaign_containers(Path(campaign_path), build=False):
+            raise RuntimeError("Failed to start containers")
+
+        result['containers_started'] = True
+        if not campaign_containers_running(Path(campaign_path)):
+            raise RuntimeError("Containers started but are not all running")
+    else:
+        report('image_built', "Warm pool images already built")
+        result['containers_started'] = True
+
+    # Live only once every machine actually answers HTTP requests
+    readiness = check_campaign_readiness(campaign_id, [m.machine_id for m in machines])
+    for machine in result['machines']:
+        machine['ready'] = readiness[machine['machine_id']]['ready']
+
+    not_ready = [machine_id for machine_id, probe in readiness.items() if not probe['ready']]
+    if not_ready:
+        raise RuntimeError(f"Machines not serving requests: {', '.join(not_ready)}")
+
+    if not db.activate_campaign(campaign_id):
+        raise RuntimeError("Campaign was torn down while provisioning")
+    result['status'] = 'active'
+
+    report('container_healthy', "All machines serving requests", result=result)
 
     logger.info("✓ Campaign creation complete!")
     logger.info("=" * 60)
 
+    return result
+
+
+@app.post("/api/campaigns")
+async def create_campaign(request: CampaignCreateRequest):
+    """
+    Queue a new campaign build and return its job ID immediately
+
+    Follow progress with GET /api/jobs/{job_id} or the SSE stream at
+    GET /api/jobs/{job_id}/events
+    """
+    campaign_id = f"campaign_{int(time.time())}_{uuid.uuid4().hex[:6]}"
+
+    job = build_jobs.submit(
+        lambda report: run_campaign_pipeline(request, campaign_id, report),
+        kind='campaign',
+        metadata={
+            'campaign_id': campaign_id,
+            'campaign_name': request.campaign_name,
+            'user_id': request.user_id
+        }
+    )
+
+    logger.info(f"Queued campaign {campaign_id} as {job['job_id']}")
+
     return {
+        'job_id': job['job_id'],
         'campaign_id': campaign_id,
         'campaign_name': request.campaign_name,
         'user_id': request.user_id,
         'difficulty': request.difficulty,
-        'machines': campaign_data['machines'],
-        'status': 'created',
-        'containers_started': containers_started if 'containers_started' in locals() else False
+        'status': job['status'],
+        'status_url': f"/api/jobs/{job['job_id']}",
+        'events_url': f"/api/jobs/{job['job_id']}/events"
     }
 
 
+# ============================================================================
+# Build Jobs
+# ============================================================================
+
+@app.get("/api/pool")
+async def get_warm_pool_stats():
+    """Warm pool levels, hit rate and refill latency"""
+    return warm_pool.stats()
+
+@app.get("/api/suspension")
+async def get_idle_suspension_stats():
+    """Idle suspension counters and resume latency"""
+    return idle_suspender.stats()
+
+@app.get("/api/ingress")
+async def get_ingress_stats():
+    """Ingress connections plus request counts and latency histograms per machine"""
+    return ingress.stats()
+
+@app.get("/api/plugins")
+async def get_plugin_timings():
+    """Mutation engine modules with their import state and timings"""
+    return generator.plugin_timings()
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = 50):
+    """List recent build jobs"""
+    return build_jobs.list_jobs(limit=limit)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get build job status, stage history and result"""
+    job = build_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-Sent Events stream of build stage transitions"""
+    queue = build_jobs.subscribe(job_id)
+    if queue is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event is None:
+                    break
+
+                yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            build_jobs.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.delete("/api/campaigns/{campaign_id}")
+async def teardown_campaign(campaign_id: str):
+    """Stop and remove a campaign's containers and archive it"""
+    campaign = await adb.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    def teardown() -> Dict[str, Any]:
+        removed = remove_campaign_containers(campaign_id, campaign.get('machines', []))
+        db.archive_campaign(campaign_id)
+
+        return dict(removed, campaign_id=campaign_id, status='archived')
+
+    result = await asyncio.to_thread(teardown)
+    logger.info(f"Tore down campaign {campaign_id}")
+    return result
+
+
 @app.get("/api/campaigns/{campaign_id}")
 async def get_campaign_details(campaign_id: str):
     """Get detailed information about a specific campaign"""
-    campaign = db.get_campaign(campaign_id)
+    campaign = await adb.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     # Get progress for this campaign
-    progress_list = db.get_campaign_progress(campaign['user_id'], campaign_id)
+    progress_list = await adb.get_campaign_progress(campaign['user_id'], campaign_id)
     
     # Add progress info to each machine
     for machine in campaign.get('machines', []):
@@ -401,7 +713,7 @@ async def get_campaign_details(campaign_id: str):
 @app.get("/api/campaigns/{campaign_id}/machines")
 async def get_campaign_machines(campaign_id: str):
     """Get all machines for a specific campaign"""
-    campaign = db.get_campaign(campaign_id)
+    campaign = await adb.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
@@ -414,11 +726,11 @@ async def get_campaign_machines(campaign_id: str):
 @app.get("/api/campaigns/{campaign_id}/progress")
 async def get_campaign_progress(campaign_id: str, user_id: str):
     """Get progress for a specific campaign"""
-    campaign = db.get_campaign(campaign_id)
+    campaign = await adb.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
-    progress_list = db.get_campaign_progress(user_id, campaign_id)
+    progress_list = await adb.get_campaign_progress(user_id, campaign_id)
 
     total_machines = campaign['machine_count']
     solved = sum(1 for p in progress_list if p.get('solved', False))
@@ -439,36 +751,38 @@ async def get_campaign_progress(campaign_id: str, user_id: str):
 # Flag Validation with Database
 # ============================================================================
 
+def register_generated_machine(machine_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Register a machine exported to generated_machines/ (outside any campaign)
+    The config comes from the machine store; a miss re-checks just that directory
+    """
+    if not machine_id.isalnum():
+        return None
+
+    config = orchestrator.machine_store.get(machine_id) or orchestrator.machine_store.refresh_machine(machine_id)
+    if not config or config.get('machine_id') != machine_id:
+        return None
+
+    db.register_machines([{
+        'machine_id': config['machine_id'],
+        'variant': config['variant'],
+        'difficulty': config['difficulty'],
+        'blueprint_id': config['blueprint_id'],
+        'flag': config['flag']['content']
+    }])
+    return db.get_machine(machine_id)
+
+
 @app.post("/api/flags/validate")
 async def validate_flag(request: FlagSubmitRequest, req: Request):
     """Validate flag with database tracking"""
 
-    # Try to find machine in orchestrator (running containers)
-    machines = orchestrator.list_machines()
-    target_machine = None
-
-    for machine in machines:
-        if machine['machine_id'] == request.machine_id:
-            target_machine = machine
-            break
+    # Indexed point lookup in the machine registry
+    target_machine = await adb.get_machine(request.machine_id)
 
-    # If not found in orchestrator, check database campaigns
+    # Standalone machines in generated_machines/ are registered on first use
     if not target_machine:
-        all_campaigns = db.campaigns.find()
-
-        for campaign in all_campaigns:
-            for machine in campaign.get('machines', []):
-                if machine['machine_id'] == request.machine_id:
-                    target_machine = {
-                        'machine_id': machine['machine_id'],
-                        'variant': machine['variant'],
-                        'difficulty': machine['difficulty'],
-                        'blueprint_id': machine['blueprint_id'],
-                        'flag': machine['flag']
-                    }
-                    break
-            if target_machine:
-                break
+        target_machine = await adb.run(register_generated_machine, request.machine_id)
 
     if not target_machine:
         raise HTTPException(
@@ -476,19 +790,12 @@ async def validate_flag(request: FlagSubmitRequest, req: Request):
             detail=f"Machine not found: {request.machine_id}"
         )
 
-    # Get or create progress
-    progress = db.get_progress(request.user_id, request.machine_id)
-
-    if not progress:
-        progress_data = {
-            'user_id': request.user_id,
-            'machine_id': request.machine_id,
-            'campaign_id': 'unknown'
-        }
-        progress = db.create_progress(progress_data)
-
-    # Increment attempt
-    db.increment_attempts(request.user_id, request.machine_id)
+    # Count the attempt, creating the progress record on first use
+    progress = await adb.record_attempt(
+        request.user_id,
+        request.machine_id,
+        campaign_id=target_machine.get('campaign_id')
+    )
 
     # Validate flag
     correct = request.flag.strip() == target_machine['flag'].strip()
@@ -505,35 +812,31 @@ async def validate_flag(request: FlagSubmitRequest, req: Request):
         'points_awarded': 0
     }
 
-    if correct:
+    if correct and not progress.get('solved', False):
         points = target_machine['difficulty'] * 100
+        solve_time = int((time.time() - progress['started_at'].timestamp()))
+
+        # Progress, campaign and user counters plus the submission in one transaction
+        outcome = await adb.record_solve(
+            request.user_id,
+            request.machine_id,
+            progress.get('campaign_id'),
+            points,
+            solve_time,
+            submission_data
+        )
 
-        if not progress.get('solved', False):
-            solve_time = int((time.time() - progress['started_at'].timestamp()))
-            db.mark_solved(request.user_id, request.machine_id, points, solve_time)
-            db.add_points(request.user_id, points)
-            db.increment_solved(request.user_id)
-
-            campaign_id = progress.get('campaign_id')
-            if campaign_id and campaign_id != 'unknown':
-                campaign_progress = db.get_campaign_progress(request.user_id, campaign_id)
-                solved_count = sum(1 for p in campaign_progress if p.get('solved', False))
-                total_points = sum(p.get('points_earned', 0) for p in campaign_progress)
-
-                db.update_campaign_progress(campaign_id, solved_count, total_points)
-
-                campaign = db.get_campaign(campaign_id)
-                if solved_count == campaign['machine_count']:
-                    db.complete_campaign(campaign_id)
-
-            submission_data['points_awarded'] = points
+        if outcome['first_solve']:
             message = f"🎉 Correct! First solve! +{points} points"
         else:
             message = "✅ Flag already captured"
     else:
-        message = "❌ Incorrect flag. Try again!"
+        if correct:
+            message = "✅ Flag already captured"
+        else:
+            message = "❌ Incorrect flag. Try again!"
 
-    db.record_submission(submission_data)
+        await adb.record_submission(submission_data)
 
     return {
         'correct': correct,
@@ -659,7 +962,7 @@ async def get_blueprint(blueprint_id: str):
 @app.get("/api/leaderboard")
 async def get_leaderboard(limit: int = 100, timeframe: str = 'all_time'):
     """Get leaderboard"""
-    leaderboard = db.get_leaderboard(limit=limit, timeframe=timeframe)
+    leaderboard = await adb.get_leaderboard(limit=limit, timeframe=timeframe)
     return {
         'timeframe': timeframe,
         'entries': leaderboard
@@ -671,37 +974,62 @@ async def get_leaderboard(limit: int = 100, timeframe: str = 'all_time'):
 # ============================================================================
 
 
-@app.get("/api/stats")
-async def get_statistics():
-    """Get platform statistics from database"""
+# Dashboard stats are served from a snapshot at most this many seconds old
+STATS_MAX_AGE = float(os.getenv('HACKFORGE_STATS_MAX_AGE', '10'))
+STATS_RECONCILE_INTERVAL = float(os.getenv('HACKFORGE_STATS_RECONCILE_INTERVAL', '300'))
+
+_stats_snapshot: Dict[str, Any] = {'data': None, 'built_at': 0.0}
+_stats_lock = asyncio.Lock()
+
+
+def build_stats_snapshot() -> Dict[str, Any]:
+    """Collect platform counters, blueprint and machine counts"""
     platform_stats = db.get_platform_stats()
 
-    # Get blueprints count with fallback
     try:
-        try:
-            blueprints = generator.list_blueprints()
-        except Exception:
-            blueprints_dir = CORE_PATH / "blueprints"
-            blueprints = load_blueprints_directly(blueprints_dir)
-        
-        platform_stats['total_blueprints'] = len(blueprints)
-        logger.info(f"✓ Blueprints count: {len(blueprints)}")
+        platform_stats['total_blueprints'] = len(get_blueprint_registry(CORE_PATH / "blueprints").blueprints())
     except Exception as e:
         logger.error(f"✗ Failed to count blueprints: {e}")
         platform_stats['total_blueprints'] = 0
 
-    # Get machines count
     try:
-        machines = orchestrator.list_machines()
-        platform_stats['total_machines'] = len(machines)
-        logger.info(f"✓ Machines count: {len(machines)}")
+        platform_stats['total_machines'] = orchestrator.count_machines()
     except Exception as e:
         logger.error(f"✗ Failed to count machines: {e}")
         platform_stats['total_machines'] = 0
 
-    logger.info(f"Stats response: {platform_stats}")
+    platform_stats['generated_at'] = time.time()
     return platform_stats
 
+
+@app.get("/api/stats")
+async def get_statistics():
+    """Get platform statistics (cached snapshot, at most HACKFORGE_STATS_MAX_AGE seconds old)"""
+    if _stats_snapshot['data'] is None or time.time() - _stats_snapshot['built_at'] > STATS_MAX_AGE:
+        async with _stats_lock:
+            # Another request may have rebuilt it while we waited
+            if _stats_snapshot['data'] is None or time.time() - _stats_snapshot['built_at'] > STATS_MAX_AGE:
+                _stats_snapshot['data'] = await adb.run(build_stats_snapshot)
+                _stats_snapshot['built_at'] = time.time()
+
+    return _stats_snapshot['data']
+
+
+async def reconcile_stats_periodically():
+    """Recount the incremental platform counters every STATS_RECONCILE_INTERVAL seconds"""
+    while True:
+        try:
+            await adb.reconcile_platform_stats()
+        except Exception as e:
+            logger.warning(f"Stats reconciliation failed: {e}")
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_stats_reconciliation():
+    if STATS_RECONCILE_INTERVAL > 0:
+        app.state.stats_reconciler = asyncio.create_task(reconcile_stats_periodically())
+
 # ============================================================================
 # Machine Endpoints
 # ============================================================================
@@ -717,41 +1045,33 @@ async def list_machines():
         # Get machines from filesystem
         machines = orchestrator.list_machines()
         
-        # Enrich with database information
+        # Container state comes from the shared inventory (one dict lookup per machine)
+        try:
+            container_infos = orchestrator.inventory.get_many(m['machine_id'] for m in machines)
+        except Exception as e:
+            logger.warning(f"Could not get Docker info: {e}")
+            container_infos = {}
+        
+        # Enrich with database information (one query per collection for all machines)
+        machine_ids = [m['machine_id'] for m in machines]
+        campaigns, progress_by_machine = await asyncio.gather(
+            adb.get_campaigns_by_machine(machine_ids),
+            adb.get_progress_many(machine_ids)
+        )
         enriched_machines = []
         
         for machine in machines:
             machine_id = machine['machine_id']
+            campaign = campaigns.get(machine_id)
+            progress = progress_by_machine.get(machine_id)
             
-            # Try to find campaign this machine belongs to
-            campaign = db.campaigns.find_one({
-                'machines.machine_id': machine_id
-            })
-            
-            # Get progress if exists
-            progress = db.progress.find_one({
-                'machine_id': machine_id
-            })
+            container_info = container_infos.get(machine_id)
             
-            # Find Docker container
-            try:
-                import docker
-                client = docker.from_env()
-                containers = client.containers.list(all=True)
-                
-                container_info = None
-                for container in containers:
-                    if machine_id[:12] in container.name or machine_id in container.name:
-                        container_info = {
-                            'container_id': container.id,
-                            'container_name': container.name,
-                            'status': container.status,
-                            'ports': container.ports
-                        }
-                        break
-            except Exception as e:
-                logger.warning(f"Could not get Docker info for {machine_id}: {e}")
-                container_info = None
+            # Last readiness probe result (None for machines never probed)
+            campaign_entry = next(
+                (m for m in campaign.get('machines', []) if m.get('machine_id') == machine_id), {}
+            ) if campaign else {}
+            ready = campaign_entry.get('ready')
             
             enriched_machine = {
                 'machine_id': machine['machine_id'],
@@ -770,17 +1090,17 @@ async def list_machines():
                 # Docker info
                 'container': container_info,
                 'is_running': container_info['status'] == 'running' if container_info else False,
-                'url': None  # Will be populated if running
+                'ready': ready,
+                'url': None  # Will be populated if running and serving requests
             }
             
-            # Extract URL from container ports
+            # Machines are served through the ingress, which also wakes suspended ones
             if container_info and container_info['status'] == 'running':
-                ports = container_info.get('ports', {})
-                for container_port, host_bindings in ports.items():
-                    if host_bindings:
-                        host_port = host_bindings[0]['HostPort']
-                        enriched_machine['url'] = f"http://localhost:{host_port}"
-                        break
+                if ready is not False:
+                    enriched_machine['url'] = _machine_url(machine_id)
+            elif idle_suspender.is_suspended(machine_id):
+                enriched_machine['suspended'] = True
+                enriched_machine['url'] = _machine_url(machine_id)
             
             enriched_machines.append(enriched_machine)
         
@@ -798,46 +1118,23 @@ async def list_machines():
 async def get_machine(machine_id: str):
     """Get specific machine details with full context"""
     try:
-        # Get from orchestrator
-        machines = orchestrator.list_machines()
-        machine = next((m for m in machines if m['machine_id'] == machine_id), None)
+        # Full config from the in-memory machine store
+        config = orchestrator.machine_store.get(machine_id)
         
-        if not machine:
+        if not config:
             raise HTTPException(status_code=404, detail="Machine not found")
         
-        # Load full config
-        config_file = Path(machine['directory']) / "config.json"
-        with open(config_file, 'r') as f:
-            config = json.load(f)
-        
-        # Get campaign info
-        campaign = db.campaigns.find_one({
-            'machines.machine_id': machine_id
-        })
-        
-        # Get progress
-        progress = db.progress.find_one({
-            'machine_id': machine_id
-        })
+        # Campaign and progress info
+        campaigns, progress_by_machine = await asyncio.gather(
+            adb.get_campaigns_by_machine([machine_id]),
+            adb.get_progress_many([machine_id])
+        )
+        campaign = campaigns.get(machine_id)
+        progress = progress_by_machine.get(machine_id)
         
         # Get Docker status
         try:
-            import docker
-            client = docker.from_env()
-            containers = client.containers.list(all=True)
-            
-            container_info = None
-            for container in containers:
-                if machine_id[:12] in container.name or machine_id in container.name:
-                    container_info = {
-                        'container_id': container.id,
-                        'container_name': container.name,
-                        'status': container.status,
-                        'ports': container.ports,
-                        'created': container.attrs['Created'],
-                        'image': container.image.tags[0] if container.image.tags else 'unknown'
-                    }
-                    break
+            container_info = orchestrator.get_container(machine_id)
         except Exception as e:
             logger.warning(f"Could not get Docker info: {e}")
             container_info = None
@@ -860,11 +1157,27 @@ async def get_machine(machine_id: str):
 async def get_machine_statistics(machine_id: str):
     """Get statistics for a specific machine"""
     try:
-        stats = db.get_machine_stats(machine_id)
+        stats = await adb.get_machine_stats(machine_id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting machine stats: {str(e)}")
 
+@app.get("/api/campaigns/{campaign_id}/stats")
+async def get_campaign_statistics(campaign_id: str):
+    """Get attempt, point and solve-time statistics for a campaign"""
+    stats = await adb.get_campaign_statistics(campaign_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return stats
+
+@app.get("/api/stats/solve-rates")
+async def get_solve_rates(blueprint_id: Optional[str] = None):
+    """Solve rate per variant and per difficulty, optionally for one blueprint"""
+    try:
+        return await adb.get_solve_rates(blueprint_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting solve rates: {str(e)}")
+
 
 
 # ============================================================================
@@ -888,11 +1201,6 @@ async def generate_machine_from_config(category: str, background_tasks: Backgrou
     
     This generates ONLY ONE machine for the specified category
     """
-    import sys
-    import importlib
-    import subprocess
-    import time
-    
     try:
         logger.info("="*60)
         logger.info(f"SINGLE MACHINE PIPELINE: {category}")
@@ -913,24 +1221,19 @@ async def generate_machine_from_config(category: str, background_tasks: Backgrou
         from vuln_generator import VulnerabilityGenerator
 
         generator_vuln = VulnerabilityGenerator(str(config_path))
-        generator_vuln.generate_all(str(CORE_PATH))
+        changes = await asyncio.to_thread(generator_vuln.generate_all, str(CORE_PATH))
 
-        logger.info("✓ Generated blueprint, mutation, and template")
+        # Blueprints and mutation engines revalidate by mtime; only a rewritten
+        # template module needs an explicit re-import
+        if 'template' in changes['changed']:
+            TemplateRenderer.reload_category(category)
 
-        # STEP 2: Reload generator to pick up new blueprint
-        logger.info("\nSTEP 2: Reloading generator with new blueprint...")
-        
-        # Remove cached modules to force reload
-        modules_to_reload = ['generator', 'base']
-        for mod in modules_to_reload:
-            if mod in sys.modules:
-                del sys.modules[mod]
-        
-        # Reimport generator
-        from generator import DynamicHackforgeGenerator
-        
-        # Create new generator instance (will auto-discover new blueprint)
-        gen = DynamicHackforgeGenerator(core_dir=str(CORE_PATH))
+        logger.info(f"✓ Blueprint components ready (changed: {changes['changed'] or 'none'})")
+
+        # STEP 2: Look up the new blueprint. The shared generator's registries
+        # notice the new files by mtime and import only the changed mutation module
+        logger.info("\nSTEP 2: Loading new blueprint...")
+        gen = generator
 
         # Find the blueprint we just created
         blueprint_id = None
@@ -954,7 +1257,8 @@ async def generate_machine_from_config(category: str, background_tasks: Backgrou
         
         # Use the existing generate_single_machine() function
         # This already exports to generated_machines directory
-        machine = gen.generate_single_machine(
+        machine = await asyncio.to_thread(
+            gen.generate_single_machine,
             blueprint_id=blueprint_id,
             difficulty=2,  # Default medium difficulty
             user_id="api_generated"
@@ -968,23 +1272,22 @@ async def generate_machine_from_config(category: str, background_tasks: Backgrou
 
         logger.info(f"✓ Generated and exported machine: {machine.machine_id}")
 
+        await adb.register_machines([{
+            'machine_id': machine.machine_id,
+            'variant': machine.variant,
+            'difficulty': machine.difficulty,
+            'blueprint_id': machine.blueprint_id,
+            'flag': machine.flag['content'],
+            'url': _machine_url(machine.machine_id)
+        }])
+
         # STEP 4: Generate Docker application using template_engine
         logger.info("\nSTEP 4: Generating Docker application...")
 
-        # Remove cached template_engine module
-        if 'template_engine' in sys.modules:
-            del sys.modules['template_engine']
-            
-        from template_engine import TemplateEngine
-
-        template_engine_instance = TemplateEngine(
-            machines_dir=str(CORE_PATH / "generated_machines")
-        )
-
         machine_dir = CORE_PATH / "generated_machines" / machine.machine_id
         
         # Generate the Docker app for this specific machine
-        result = template_engine_instance.generate_machine_app(machine, machine_dir)
+        result = await asyncio.to_thread(template_engine.generate_machine_app, machine, machine_dir)
 
         if not result:
             raise HTTPException(
@@ -993,6 +1296,7 @@ async def generate_machine_from_config(category: str, background_tasks: Backgrou
             )
 
         logger.info(f"✓ Generated Docker app")
+        orchestrator.machine_store.refresh_machine(machine.machine_id)
 
         # STEP 5: Generate docker-compose.yml for this single machine
         logger.info("\nSTEP 5: Generating docker-compose.yml...")
@@ -1009,15 +1313,22 @@ services:
   {machine.machine_id}:
     build: .
     container_name: hackforge_{machine.machine_id}
-    ports:
-      - "8080:80"
+    networks:
+      - machines
     volumes:
       - ./app:/var/www/html
       - ./flag.txt:{flag_location}:ro
     environment:
       - MACHINE_ID={machine.machine_id}
       - FLAG_LOCATION={flag_location}
+    labels:
+      - hackforge.machine_id={machine.machine_id}
     restart: unless-stopped
+
+networks:
+  machines:
+    name: {orchestrator.network}
+    external: true
 """
 
         compose_file = machine_dir / "docker-compose.yml"
@@ -1031,25 +1342,31 @@ services:
         
         container_started = False
         container_url = None
+        readiness = None
         
         try:
-            result = subprocess.run(
-                ["docker-compose", "up", "-d", "--build"],
-                cwd=str(machine_dir),
-                capture_output=True,
-                text=True,
-                timeout=300
+            # Image builds and compose up take minutes; keep them off the event loop
+            if not await asyncio.to_thread(orchestrator.ensure_base_images, machine_dir):
+                raise RuntimeError("Failed to build base images")
+
+            result = await asyncio.to_thread(
+                orchestrator.backend.up, machine_dir, [machine.machine_id], build=True
             )
             
-            if result.returncode == 0:
+            if result.success:
                 logger.info("✓ Docker container started successfully")
                 container_started = True
-                container_url = "http://localhost:8080"
-                
-                # Wait a moment for container to fully start
-                time.sleep(2)
+
+                # Only hand out the URL once the machine answers requests
+                probe = await asyncio.to_thread(orchestrator.readiness.probe, machine.machine_id)
+                readiness = probe.to_dict()
+                if probe.ready:
+                    logger.info(f"✓ Machine ready after {probe.elapsed}s")
+                    container_url = _machine_url(machine.machine_id)
+                else:
+                    logger.warning(f"Machine not serving requests after {probe.elapsed}s: {probe.error}")
             else:
-                logger.warning(f"Container start failed: {result.stderr}")
+                logger.warning(f"Container start failed: {result.errors}")
                 
         except Exception as e:
             logger.warning(f"Could not start container: {e}")
@@ -1074,12 +1391,15 @@ services:
                 "machine_config": f"generated_machines/{machine.machine_id}/config.json",
                 "docker_app": f"generated_machines/{machine.machine_id}/app/index.php",
                 "dockerfile": f"generated_machines/{machine.machine_id}/Dockerfile",
+                "base_dockerfile": f"generated_machines/{machine.machine_id}/Dockerfile.base",
                 "compose": f"generated_machines/{machine.machine_id}/docker-compose.yml"
             },
             "container_started": container_started,
+            "ready": bool(readiness and readiness['ready']),
+            "readiness": readiness,
             "url": container_url,
             "next_steps": [
-                f"Access machine at: {container_url}" if container_started else f"Start container: cd generated_machines/{machine.machine_id} && docker-compose up -d",
+                f"Access machine at: {container_url}" if container_url else f"Start container: cd generated_machines/{machine.machine_id} && docker-compose up -d",
                 "Test the vulnerability",
                 "Submit flag via /machines page"
             ]
@@ -1244,9 +1564,12 @@ async def generate_from_config(category: str, background_tasks: BackgroundTasks)
         from vuln_generator import VulnerabilityGenerator
         
         generator = VulnerabilityGenerator(str(config_path))
-        generator.generate_all(str(CORE_PATH))
+        changes = await asyncio.to_thread(generator.generate_all, str(CORE_PATH))
+
+        if 'template' in changes['changed']:
+            TemplateRenderer.reload_category(category)
         
-        logger.info(f"✓ Generated all components for {category}")
+        logger.info(f"✓ Generated components for {category} (changed: {changes['changed'] or 'none'})")
         
         return {
             "message": "Blueprint, mutation, and template generated successfully",
@@ -1256,6 +1579,9 @@ async def generate_from_config(category: str, background_tasks: BackgroundTasks)
                 "mutation": f"mutations/{category}_mutation.py",
                 "template": f"templates/{category}_templates.py"
             },
+            "config_digest": changes['digest'],
+            "files_changed": changes['changed'],
+            "files_unchanged": changes['unchanged'],
             "next_step": f"Generate machine with: POST /api/configs/{category}/generate-machine"
         }
     
@@ -1288,7 +1614,7 @@ async def start_containers(background_tasks: BackgroundTasks):
 @app.post("/api/docker/stop")
 async def stop_containers():
     """Stop all Docker containers"""
-    success = orchestrator.stop_machines()
+    success = await asyncio.to_thread(orchestrator.stop_machines)
 
     if success:
         return {"message": "Containers stopped successfully"}
@@ -1298,7 +1624,7 @@ async def stop_containers():
 @app.post("/api/docker/restart")
 async def restart_containers():
     """Restart all Docker containers"""
-    success = orchestrator.restart_machines()
+    success = await asyncio.to_thread(orchestrator.restart_machines)
 
     if success:
         return {"message": "Containers restarted successfully"}
@@ -1308,7 +1634,7 @@ async def restart_containers():
 @app.get("/api/docker/status")
 async def docker_status():
     """Get Docker container status"""
-    containers = orchestrator.status_machines()
+    containers = await asyncio.to_thread(orchestrator.status_machines)
 
     return {
         "containers": containers,
@@ -1319,7 +1645,7 @@ async def docker_status():
 @app.delete("/api/docker/destroy")
 async def destroy_containers():
     """Destroy all Docker containers"""
-    success = orchestrator.destroy_machines(remove_volumes=True)
+    success = await asyncio.to_thread(orchestrator.destroy_machines, remove_volumes=True)
 
     if success:
         return {"message": "Containers destroyed successfully"}
@@ -1335,14 +1661,12 @@ async def destroy_containers():
 async def start_container(container_id: str):
     """Start a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
+        container = await asyncio.to_thread(orchestrator.docker_client.containers.get, container_id)
 
         if container.status == 'running':
             return {"message": "Container is already running", "status": "running"}
 
-        container.start()
+        await asyncio.to_thread(container.start)
         return {"message": f"Container {container.name} started successfully", "status": "started"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -1353,14 +1677,12 @@ async def start_container(container_id: str):
 async def stop_container(container_id: str):
     """Stop a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
+        container = await asyncio.to_thread(orchestrator.docker_client.containers.get, container_id)
 
         if container.status != 'running':
             return {"message": "Container is already stopped", "status": "stopped"}
 
-        container.stop(timeout=10)
+        await asyncio.to_thread(container.stop, timeout=10)
         return {"message": f"Container {container.name} stopped successfully", "status": "stopped"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -1371,10 +1693,8 @@ async def stop_container(container_id: str):
 async def restart_container(container_id: str):
     """Restart a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
-        container.restart(timeout=10)
+        container = await asyncio.to_thread(orchestrator.docker_client.containers.get, container_id)
+        await asyncio.to_thread(container.restart, timeout=10)
         return {"message": f"Container {container.name} restarted successfully", "status": "restarted"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -1385,10 +1705,8 @@ async def restart_container(container_id: str):
 async def remove_container(container_id: str):
     """Remove a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
-        container.remove(force=True)
+        container = await asyncio.to_thread(orchestrator.docker_client.containers.get, container_id)
+        await asyncio.to_thread(container.remove, force=True)
         return {"message": f"Container removed successfully", "status": "removed"}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -1399,10 +1717,8 @@ async def remove_container(container_id: str):
 async def get_container_logs(container_id: str, tail: int = 100):
     """Get logs from a specific container"""
     try:
-        import docker
-        client = docker.from_env()
-        container = client.containers.get(container_id)
-        logs = container.logs(tail=tail, timestamps=True).decode('utf-8')
+        container = await asyncio.to_thread(orchestrator.docker_client.containers.get, container_id)
+        logs = (await asyncio.to_thread(container.logs, tail=tail, timestamps=True)).decode('utf-8')
         return {"logs": logs, "container_id": container_id}
     except docker.errors.NotFound:
         raise HTTPException(status_code=404, detail=f"Container {container_id} not found")
@@ -1413,30 +1729,24 @@ async def get_container_logs(container_id: str, tail: int = 100):
 async def get_campaign_containers(campaign_id: str):
     """Get all Docker containers for a specific campaign"""
     try:
-        import docker
-        client = docker.from_env()
-        
-        campaign = db.get_campaign(campaign_id)
+        campaign = await adb.get_campaign(campaign_id)
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        all_containers = client.containers.list(all=True)
         campaign_machine_ids = [m['machine_id'] for m in campaign.get('machines', [])]
+        container_infos = orchestrator.inventory.get_many(campaign_machine_ids)
         
-        campaign_containers = []
-        for container in all_containers:
-            container_name = container.name
-            for machine_id in campaign_machine_ids:
-                if machine_id[:12] in container_name or machine_id in container_name:
-                    campaign_containers.append({
-                        'Id': container.id,
-                        'Name': container.name,
-                        'State': container.status,
-                        'Status': container.status,
-                        'Image': container.image.tags[0] if container.image.tags else 'unknown',
-                        'machine_id': machine_id
-                    })
-                    break
+        campaign_containers = [
+            {
+                'Id': info['container_id'],
+                'Name': info['container_name'],
+                'State': info['status'],
+                'Status': info['status'],
+                'Image': info['image'],
+                'machine_id': machine_id
+            }
+            for machine_id, info in container_infos.items()
+        ]
         
         return {
             'campaign_id': campaign_id,
@@ -1445,12 +1755,56 @@ async def get_campaign_containers(campaign_id: str):
             'total': len(campaign_containers),
             'running': sum(1 for c in campaign_containers if c['State'] == 'running')
         }
+    except HTTPException:
+        raise
     except docker.errors.DockerException as e:
         raise HTTPException(status_code=500, detail=f"Docker error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@app.post("/api/docker/campaign/{campaign_id}/{action}")
+async def campaign_lifecycle(campaign_id: str, action: str, request: LifecycleRequest = None):
+    """
+    Start, stop or restart a campaign's containers in parallel
+
+    Returns per-machine errors and timings; machines that succeeded stay
+    up even if others failed. Started machines are probed until they serve
+    requests, and their readiness is recorded on the campaign. Warm pool
+    machines are not part of the campaign's project and are left alone.
+    """
+    if action not in ("start", "stop", "restart"):
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action}")
+
+    campaign_path = CORE_PATH / "campaigns" / campaign_id
+    if not (campaign_path / "docker-compose.yml").exists():
+        raise HTTPException(status_code=404, detail="Campaign has no containers")
+
+    machine_ids = request.machine_ids if request else None
+    result = await asyncio.to_thread(orchestrator.run_lifecycle, campaign_path, action, machine_ids)
+
+    for machine_id, error in result.errors.items():
+        logger.warning(f"Campaign {campaign_id}: {action} failed for {machine_id}: {error}")
+
+    affected = result.succeeded
+    if not affected and result.success:
+        # Whole-project compose operations report no per-service outcome
+        affected = list(load_compose_services(campaign_path))
+
+    if action == "stop":
+        readiness = {machine_id: {'ready': False, 'error': 'stopped'} for machine_id in affected}
+        await adb.record_readiness(campaign_id, readiness)
+    else:
+        readiness = await asyncio.to_thread(check_campaign_readiness, campaign_id, affected)
+
+    return {
+        'campaign_id': campaign_id,
+        'backend': orchestrator.backend.name,
+        **result.to_dict(),
+        'readiness': readiness
+    }
+
+
 # ============================================================================
 # Health Check
 # ============================================================================
@@ -1459,7 +1813,7 @@ async def get_campaign_containers(campaign_id: str):
 async def health_check():
     """Health check with database status"""
     try:
-        db.users.find_one()
+        await adb.ping()
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
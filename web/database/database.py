@@ -4,11 +4,34 @@ MongoDB connection and CRUD operations
 Enhanced with campaign naming support
 """
 
-from pymongo import MongoClient
-from typing import List, Optional, Dict, Any
+from pymongo import MongoClient, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import inspect
+import threading
+import time
 import os
 
+from leaderboard import LeaderboardIndex, TIMEFRAMES, period_key, period_keys
+
+
+# Platform counters kept in the stats rollup document
+PLATFORM_STAT_FIELDS = (
+    'total_users', 'total_campaigns', 'active_campaigns',
+    'completed_campaigns', 'total_solves', 'total_flags_submitted'
+)
+
+# Campaign status -> rollup counter tracking it
+CAMPAIGN_STATUS_COUNTERS = {'active': 'active_campaigns', 'completed': 'completed_campaigns'}
+
+# Fields copied from a campaign machine entry into the machine registry
+MACHINE_REGISTRY_FIELDS = ('machine_id', 'variant', 'difficulty', 'blueprint_id', 'flag', 'url', 'port')
+
 
 class DatabaseManager:
     """Database manager for MongoDB operations"""
@@ -17,7 +40,13 @@ class DatabaseManager:
         if connection_string is None:
             connection_string = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
         
-        self.client = MongoClient(connection_string)
+        # Sized for the async facade, which runs one blocking call per pooled connection
+        self.max_pool_size = int(os.getenv('HACKFORGE_MONGO_POOL_SIZE', '100'))
+        self.client = MongoClient(
+            connection_string,
+            maxPoolSize=self.max_pool_size,
+            minPoolSize=min(10, self.max_pool_size)
+        )
         self.db = self.client['hackforge']
         
         # Collections
@@ -29,6 +58,23 @@ class DatabaseManager:
         self.achievements = self.db['achievements']
         self.user_achievements = self.db['user_achievements']
         self.sessions = self.db['sessions']
+        self.machines = self.db['machines']
+        self.leaderboard = self.db['leaderboard']
+        self.platform_stats = self.db['platform_stats']
+        
+        # In-process cache of machine registry documents (machine_id -> doc)
+        self.machine_cache_size = int(os.getenv('HACKFORGE_MACHINE_CACHE_SIZE', '10000'))
+        self._machine_cache: OrderedDict = OrderedDict()
+        self._machine_cache_lock = threading.Lock()
+        
+        # Ranked scores per period; reloaded after this many seconds to pick up
+        # awards made by other API processes (0 = never)
+        self.leaderboard_index = LeaderboardIndex()
+        self.leaderboard_ttl = float(os.getenv('HACKFORGE_LEADERBOARD_TTL', '30'))
+        self._leaderboard_load_lock = threading.Lock()
+        
+        # Multi-document transactions need a replica set or mongos; probed on first solve
+        self._supports_transactions: Optional[bool] = None
         
         self._create_indexes()
     
@@ -39,11 +85,21 @@ class DatabaseManager:
         self.campaigns.create_index('campaign_id', unique=True)
         self.campaigns.create_index([('user_id', 1), ('created_at', -1)])  # For listing user's campaigns
         self.progress.create_index([('user_id', 1), ('machine_id', 1)], unique=True)
+        self.progress.create_index([('machine_id', 1), ('solved', 1)])  # Machine statistics
+        self.progress.create_index([('campaign_id', 1), ('user_id', 1)])  # Campaign statistics
+        self.hints.create_index([('machine_id', 1), ('user_id', 1)])
+        self.machines.create_index('machine_id', unique=True)
+        self.machines.create_index('campaign_id')
+        self.campaigns.create_index('machines.machine_id')  # Legacy lookup for unregistered machines
+        self.users.create_index([('total_points', -1)])
+        self.leaderboard.create_index([('period', 1), ('user_id', 1)], unique=True)
+        self.leaderboard.create_index([('period', 1), ('points', -1), ('last_points_at', 1)])
     
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         user_data['created_at'] = datetime.utcnow()
         result = self.users.insert_one(user_data)
         user_data['_id'] = str(result.inserted_id)
+        self._bump_stats({'total_users': 1})
         return user_data
     
     def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -54,10 +110,14 @@ class DatabaseManager:
         )
     
     def add_points(self, user_id: str, points: int) -> bool:
+        now = datetime.utcnow()
         result = self.users.update_one(
             {'user_id': user_id},
             {'$inc': {'total_points': points}}
         )
+        if result.modified_count > 0:
+            self._record_points(user_id, points, now)
+            self._index_points(user_id, points, now)
         return result.modified_count > 0
     
     def increment_solved(self, user_id: str) -> bool:
@@ -81,6 +141,18 @@ class DatabaseManager:
         
         result = self.campaigns.insert_one(campaign_data)
         campaign_data['_id'] = str(result.inserted_id)
+        
+        stats_inc = {'total_campaigns': 1}
+        if campaign_data['status'] in CAMPAIGN_STATUS_COUNTERS:
+            stats_inc[CAMPAIGN_STATUS_COUNTERS[campaign_data['status']]] = 1
+        self._bump_stats(stats_inc)
+        
+        # Keep the machine registry in sync so flag validation is a point lookup
+        self.register_machines(
+            campaign_data.get('machines', []),
+            campaign_id=campaign_data.get('campaign_id'),
+            user_id=campaign_data.get('user_id')
+        )
         return campaign_data
     
     def get_campaign(self, campaign_id: str) -> Optional[Dict[str, Any]]:
@@ -90,6 +162,16 @@ class DatabaseManager:
             {'_id': 0}
         )
     
+    def get_campaigns_by_machine(self, machine_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """The campaign containing each machine, for several machines in one query"""
+        machine_ids = set(machine_ids)
+        by_machine = {}
+        for campaign in self.campaigns.find({'machines.machine_id': {'$in': list(machine_ids)}}, {'_id': 0}):
+            for machine in campaign.get('machines', []):
+                if machine.get('machine_id') in machine_ids:
+                    by_machine.setdefault(machine['machine_id'], campaign)
+        return by_machine
+    
     def get_user_campaigns(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all campaigns for a user, sorted by creation date (newest first)"""
         # Exclude _id field from results using MongoDB projection
@@ -109,6 +191,102 @@ class DatabaseManager:
         )
         return result.modified_count > 0
     
+    def record_readiness(self, campaign_id: str, results: Dict[str, Dict[str, Any]]) -> bool:
+        """Store readiness probe results on a campaign's machine entries"""
+        if not results:
+            return False
+        
+        now = datetime.utcnow()
+        updates = {'readiness_checked_at': now}
+        array_filters = []
+        for i, (machine_id, result) in enumerate(results.items()):
+            updates[f'machines.$[m{i}].ready'] = bool(result.get('ready'))
+            updates[f'machines.$[m{i}].readiness'] = dict(result, checked_at=now)
+            array_filters.append({f'm{i}.machine_id': machine_id})
+        
+        result = self.campaigns.update_one(
+            {'campaign_id': campaign_id},
+            {'$set': updates},
+            array_filters=array_filters
+        )
+        return result.modified_count > 0
+    
+    def register_machines(self, machines: Iterable[Dict[str, Any]], campaign_id: str = None,
+                          user_id: str = None) -> int:
+        """Upsert machines into the registry keyed by machine_id"""
+        now = datetime.utcnow()
+        operations = []
+        machine_ids = []
+        
+        for machine in machines:
+            doc = {k: machine[k] for k in MACHINE_REGISTRY_FIELDS if k in machine}
+            doc['campaign_id'] = campaign_id
+            doc['user_id'] = user_id
+            doc['updated_at'] = now
+            operations.append(UpdateOne(
+                {'machine_id': doc['machine_id']},
+                {'$set': doc, '$setOnInsert': {'registered_at': now}},
+                upsert=True
+            ))
+            machine_ids.append(doc['machine_id'])
+        
+        if not operations:
+            return 0
+        
+        self.machines.bulk_write(operations, ordered=False)
+        self.invalidate_machine_cache(machine_ids)
+        return len(operations)
+    
+    def get_machine(self, machine_id: str) -> Optional[Dict[str, Any]]:
+        """Get a registered machine by ID, served from the in-process cache when possible"""
+        with self._machine_cache_lock:
+            cached = self._machine_cache.get(machine_id)
+            if cached is not None:
+                self._machine_cache.move_to_end(machine_id)
+                return dict(cached)
+        
+        machine = self.machines.find_one({'machine_id': machine_id}, {'_id': 0})
+        
+        if machine is None:
+            machine = self._backfill_machine_from_campaign(machine_id)
+        
+        if machine is not None:
+            self._cache_machine(machine)
+        
+        return machine
+    
+    def _backfill_machine_from_campaign(self, machine_id: str) -> Optional[Dict[str, Any]]:
+        """Register a machine from a campaign created before the registry existed"""
+        campaign = self.campaigns.find_one(
+            {'machines.machine_id': machine_id},
+            {'_id': 0, 'campaign_id': 1, 'user_id': 1, 'machines.$': 1}
+        )
+        if not campaign or not campaign.get('machines'):
+            return None
+        
+        self.register_machines(
+            campaign['machines'],
+            campaign_id=campaign.get('campaign_id'),
+            user_id=campaign.get('user_id')
+        )
+        return self.machines.find_one({'machine_id': machine_id}, {'_id': 0})
+    
+    def _cache_machine(self, machine: Dict[str, Any]):
+        with self._machine_cache_lock:
+            self._machine_cache[machine['machine_id']] = dict(machine)
+            self._machine_cache.move_to_end(machine['machine_id'])
+            while len(self._machine_cache) > self.machine_cache_size:
+                self._machine_cache.popitem(last=False)
+    
+    def invalidate_machine_cache(self, machine_ids: Iterable[str] = None):
+        """Drop cached registry entries (all of them when no IDs are given)"""
+        with self._machine_cache_lock:
+            if machine_ids is None:
+                self._machine_cache.clear()
+                return
+            for machine_id in machine_ids:
+                self._machine_cache.pop(machine_id, None)
+    
     def create_progress(self, progress_data: Dict[str, Any]) -> Dict[str, Any]:
         progress_data['started_at'] = datetime.utcnow()
         progress_data['solved'] = False
@@ -117,9 +295,157 @@ class DatabaseManager:
         progress_data['_id'] = str(result.inserted_id)
         return progress_data
     
+    def create_progress_many(self, progress_docs: Iterable[Dict[str, Any]]) -> int:
+        """Insert progress records in one round trip, skipping ones that already exist"""
+        now = datetime.utcnow()
+        docs = [
+            dict(doc, started_at=now, solved=False, attempts=0)
+            for doc in progress_docs
+        ]
+        if not docs:
+            return 0
+        
+        try:
+            result = self.progress.insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Duplicate (user_id, machine_id) pairs are fine; anything else is not
+            if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nInserted', 0)
+    
+    def record_attempt(self, user_id: str, machine_id: str, campaign_id: str = None) -> Dict[str, Any]:
+        """Count an attempt, creating the progress record on first use (single upsert)"""
+        return self.progress.find_one_and_update(
+            {'user_id': user_id, 'machine_id': machine_id},
+            {
+                '$inc': {'attempts': 1},
+                '$setOnInsert': {
+                    'campaign_id': campaign_id or 'unknown',
+                    'started_at': datetime.utcnow(),
+                    'solved': False,
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def record_solve(self, user_id: str, machine_id: str, campaign_id: Optional[str], points: int,
+                     solve_time: int, submission_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply a correct flag submission atomically
+        
+        Marks the progress solved (only if it was not already), bumps the
+        campaign and user counters, completes an active campaign on its last machine
+        and records the submission. Concurrent submissions of the same flag
+        award points exactly once.
+        
+        Platform counters are bumped after the commit rather than inside the
+        transaction: every solve would otherwise write the same stats document
+        and conflict with concurrent solves. The periodic reconcile corrects
+        any drift should the process die in between.
+        
+        Returns {'first_solve': bool, 'campaign_completed': bool}
+        """
+        def apply(session=None) -> Tuple[Dict[str, Any], Dict[str, int]]:
+            now = datetime.utcnow()
+            outcome = {'first_solve': False, 'campaign_completed': False}
+            previous_status = None
+            
+            solved = self.progress.find_one_and_update(
+                {'user_id': user_id, 'machine_id': machine_id, 'solved': {'$ne': True}},
+                {'$set': {'solved': True, 'points_earned': points, 'solve_time': solve_time, 'completed_at': now}},
+                projection={'_id': 1},
+                session=session
+            )
+            
+            if solved is None:
+                submission_data['points_awarded'] = 0
+            else:
+                outcome['first_solve'] = True
+                submission_data['points_awarded'] = points
+                
+                if campaign_id and campaign_id != 'unknown':
+                    # Counters and completion in one pipeline update; only an
+                    # active campaign can complete (archived ones stay archived)
+                    completes = {'$and': [
+                        {'$eq': ['$status', 'active']},
+                        {'$gte': ['$machines_solved', '$machine_count']},
+                    ]}
+                    before = self.campaigns.find_one_and_update(
+                        {'campaign_id': campaign_id},
+                        [
+                            {'$set': {
+                                'machines_solved': {'$add': [{'$ifNull': ['$machines_solved', 0]}, 1]},
+                                'total_points': {'$add': [{'$ifNull': ['$total_points', 0]}, points]},
+                            }},
+                            {'$set': {
+                                'status': {'$cond': [completes, 'completed', '$status']},
+                                'completed_at': {'$cond': [
+                                    completes, {'$ifNull': ['$completed_at', now]}, '$completed_at'
+                                ]},
+                            }},
+                        ],
+                        projection={'status': 1, 'machines_solved': 1, 'machine_count': 1},
+                        return_document=ReturnDocument.BEFORE,
+                        session=session
+                    )
+                    if before is not None:
+                        previous_status = before.get('status')
+                        outcome['campaign_completed'] = (
+                            previous_status == 'active'
+                            and (before.get('machines_solved') or 0) + 1 >= (before.get('machine_count') or 0)
+                        )
+                
+                user_inc = {'total_points': points, 'machines_solved': 1}
+                if outcome['campaign_completed']:
+                    user_inc['campaigns_completed'] = 1
+                self.users.update_one({'user_id': user_id}, {'$inc': user_inc}, session=session)
+                self._record_points(user_id, points, now, session=session)
+            
+            submission_data['submitted_at'] = now
+            self.submissions.insert_one(submission_data, session=session)
+            
+            stats_inc = {'total_flags_submitted': 1}
+            if outcome['first_solve']:
+                stats_inc['total_solves'] = 1
+            if outcome['campaign_completed']:
+                stats_inc.update(self._status_counter_changes(previous_status, 'completed'))
+            return outcome, stats_inc
+        
+        if not self._transactions_available():
+            outcome, stats_inc = apply()
+        else:
+            with self.client.start_session() as session:
+                outcome, stats_inc = session.with_transaction(apply)
+        
+        self._bump_stats(stats_inc)
+        
+        # Only committed awards reach the in-memory ranking
+        if outcome['first_solve']:
+            self._index_points(user_id, points, submission_data['submitted_at'])
+        return outcome
+    
+    def _transactions_available(self) -> bool:
+        if self._supports_transactions is None:
+            try:
+                hello = self.client.admin.command('hello')
+                self._supports_transactions = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+            except OperationFailure:
+                self._supports_transactions = False
+        return self._supports_transactions
+    
     def get_progress(self, user_id: str, machine_id: str) -> Optional[Dict[str, Any]]:
         return self.progress.find_one({'user_id': user_id, 'machine_id': machine_id})
     
+    def get_progress_many(self, machine_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """A progress record per machine (any user's), for several machines in one query"""
+        machine_ids = list(machine_ids)
+        by_machine = {}
+        for progress in self.progress.find({'machine_id': {'$in': machine_ids}}, {'_id': 0}):
+            by_machine.setdefault(progress['machine_id'], progress)
+        return by_machine
+    
     def increment_attempts(self, user_id: str, machine_id: str) -> bool:
         result = self.progress.update_one(
             {'user_id': user_id, 'machine_id': machine_id},
@@ -129,9 +455,11 @@ class DatabaseManager:
     
     def mark_solved(self, user_id: str, machine_id: str, points: int, solve_time: int) -> bool:
         result = self.progress.update_one(
-            {'user_id': user_id, 'machine_id': machine_id},
+            {'user_id': user_id, 'machine_id': machine_id, 'solved': {'$ne': True}},
             {'$set': {'solved': True, 'points_earned': points, 'solve_time': solve_time, 'completed_at': datetime.utcnow()}}
         )
+        if result.modified_count > 0:
+            self._bump_stats({'total_solves': 1})
         return result.modified_count > 0
     
     def get_campaign_progress(self, user_id: str, campaign_id: str) -> List[Dict[str, Any]]:
@@ -145,10 +473,9 @@ class DatabaseManager:
         return result.modified_count > 0
     
     def complete_campaign(self, campaign_id: str) -> bool:
-        result = self.campaigns.update_one(
-            {'campaign_id': campaign_id},
-            {'$set': {'status': 'completed', 'completed_at': datetime.utcnow()}}
-        )
+        previous = self._set_campaign_status(campaign_id, 'completed', completed_at=datetime.utcnow())
+        if previous is None or previous == 'completed':
+            return False
         
         # Also increment user's campaigns_completed counter
         campaign = self.get_campaign(campaign_id)
@@ -158,49 +485,239 @@ class DatabaseManager:
                 {'$inc': {'campaigns_completed': 1}}
             )
         
-        return result.modified_count > 0
+        return True
+    
+    def archive_campaign(self, campaign_id: str) -> bool:
+        """Mark a campaign as torn down (its containers and ports are gone)"""
+        previous = self._set_campaign_status(campaign_id, 'archived', archived_at=datetime.utcnow())
+        return previous is not None and previous != 'archived'
+    
+    def activate_campaign(self, campaign_id: str) -> bool:
+        """Put a provisioning campaign live once all its machines serve requests"""
+        previous = self._set_campaign_status(
+            campaign_id, 'active', expected='provisioning', activated_at=datetime.utcnow()
+        )
+        return previous == 'provisioning'
+    
+    def fail_campaign(self, campaign_id: str, error: str) -> bool:
+        """
+        Mark a provisioning campaign as failed
+        
+        Its machines are dropped from the registry so their flags are no
+        longer accepted.
+        """
+        previous = self._set_campaign_status(
+            campaign_id, 'failed', expected='provisioning', failed_at=datetime.utcnow(), error=error
+        )
+        if previous != 'provisioning':
+            return False
+        
+        machine_ids = [m['machine_id'] for m in self.machines.find({'campaign_id': campaign_id}, {'machine_id': 1})]
+        self.machines.delete_many({'campaign_id': campaign_id})
+        self.invalidate_machine_cache(machine_ids)
+        return True
+    
+    def _set_campaign_status(self, campaign_id: str, status: str, expected: str = None,
+                             **fields) -> Optional[str]:
+        """
+        Change a campaign's status, keeping the status counters in step; returns the old status
+        
+        With `expected`, only a campaign currently in that status is changed.
+        """
+        query = {'campaign_id': campaign_id}
+        if expected is not None:
+            query['status'] = expected
+        before = self.campaigns.find_one_and_update(
+            query,
+            {'$set': dict(fields, status=status)},
+            projection={'status': 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return None
+        
+        previous = before.get('status')
+        stats_inc = self._status_counter_changes(previous, status)
+        if stats_inc:
+            self._bump_stats(stats_inc)
+        return previous
+    
+    @staticmethod
+    def _status_counter_changes(previous: Optional[str], status: str) -> Dict[str, int]:
+        """Stats counter increments for a campaign moving from one status to another"""
+        stats_inc = {}
+        if previous != status:
+            if previous in CAMPAIGN_STATUS_COUNTERS:
+                stats_inc[CAMPAIGN_STATUS_COUNTERS[previous]] = -1
+            if status in CAMPAIGN_STATUS_COUNTERS:
+                stats_inc[CAMPAIGN_STATUS_COUNTERS[status]] = 1
+        return stats_inc
     
     def record_submission(self, submission_data: Dict[str, Any]) -> Dict[str, Any]:
         submission_data['submitted_at'] = datetime.utcnow()
         result = self.submissions.insert_one(submission_data)
         submission_data['_id'] = str(result.inserted_id)
+        self._bump_stats({'total_flags_submitted': 1})
         return submission_data
     
     def get_user_submissions(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         return list(self.submissions.find({'user_id': user_id}).sort('submitted_at', -1).limit(limit))
     
     def get_leaderboard(self, limit: int = 100, timeframe: str = 'all_time') -> List[Dict[str, Any]]:
-        """Get leaderboard with optional timeframe filtering"""
+        """
+        Get leaderboard for a timeframe
         
-        # Build query based on timeframe
-        query = {}
-        if timeframe == 'weekly':
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            query = {'created_at': {'$gte': week_ago}}
-        elif timeframe == 'monthly':
-            month_ago = datetime.utcnow() - timedelta(days=30)
-            query = {'created_at': {'$gte': month_ago}}
+        Weekly and monthly boards rank points earned in the current calendar
+        week/month, taken from the per-period rollups written on each award.
+        """
+        if timeframe not in TIMEFRAMES:
+            timeframe = 'all_time'
+        period = period_key(timeframe)
+        self._ensure_leaderboard_loaded(period)
         
-        # Get users sorted by points
-        users = list(self.users.find(query).sort('total_points', -1).limit(limit))
+        top = self.leaderboard_index.top(period, limit)
+        users = {
+            user['user_id']: user
+            for user in self.users.find({'user_id': {'$in': [e['user_id'] for e in top]}}, {'_id': 0})
+        }
         
-        # Add rank to each user
-        for idx, user in enumerate(users, 1):
-            user['rank'] = idx
+        entries = []
+        for entry in top:
+            user = users.get(entry['user_id'])
+            if user is None:
+                continue
+            user['rank'] = entry['rank']
+            user['period_points'] = entry['points']
+            entries.append(user)
         
-        return users
+        return entries
     
     def get_user_rank(self, user_id: str) -> Optional[int]:
         """Get user's rank based on total points"""
-        user = self.get_user(user_id)
-        if not user:
+        period = period_key('all_time')
+        self._ensure_leaderboard_loaded(period)
+        
+        rank = self.leaderboard_index.rank(period, user_id)
+        if rank is not None:
+            return rank
+        
+        # Users without points rank behind everyone who has some
+        if not self.users.find_one({'user_id': user_id}, {'_id': 1}):
             return None
-        rank = self.users.count_documents({'total_points': {'$gt': user['total_points']}}) + 1
-        return rank
+        return self.leaderboard_index.rank_of_points(period, 0)
+    
+    def rebuild_leaderboard(self):
+        """
+        Rebuild the current leaderboard rollups from users and solve events
+        
+        All-time scores come from users.total_points; the current week and
+        month are summed from submissions that awarded points.
+        """
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'period': 'all_time', 'user_id': user['user_id']},
+                {'$set': {'points': user['total_points'], 'last_points_at': user.get('created_at', now)}},
+                upsert=True
+            )
+            for user in self.users.find(
+                {'total_points': {'$gt': 0}},
+                {'_id': 0, 'user_id': 1, 'total_points': 1, 'created_at': 1}
+            )
+        ]
+        
+        week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        
+        for timeframe, since in (('weekly', week_start), ('monthly', month_start)):
+            period = period_key(timeframe, now)
+            rollup = self.submissions.aggregate([
+                {'$match': {'points_awarded': {'$gt': 0}, 'submitted_at': {'$gte': since}}},
+                {'$group': {
+                    '_id': '$user_id',
+                    'points': {'$sum': '$points_awarded'},
+                    'last_points_at': {'$max': '$submitted_at'}
+                }}
+            ])
+            operations.extend(
+                UpdateOne(
+                    {'period': period, 'user_id': row['_id']},
+                    {'$set': {'points': row['points'], 'last_points_at': row['last_points_at']}},
+                    upsert=True
+                )
+                for row in rollup
+            )
+        
+        if operations:
+            self.leaderboard.bulk_write(operations, ordered=False)
+        
+        # Force a reload from the rebuilt rollups
+        for period in period_keys(now):
+            self.leaderboard_index.load(period, [], loaded_at=0.0)
+    
+    def _record_points(self, user_id: str, points: int, when: datetime, session=None):
+        """Add an award to every rollup period it falls in (one bulk write)"""
+        self.leaderboard.bulk_write(
+            [
+                UpdateOne(
+                    {'period': period, 'user_id': user_id},
+                    {'$inc': {'points': points}, '$set': {'last_points_at': when}},
+                    upsert=True
+                )
+                for period in period_keys(when)
+            ],
+            ordered=False,
+            session=session
+        )
+    
+    def _index_points(self, user_id: str, points: int, when: datetime):
+        for period in period_keys(when):
+            self.leaderboard_index.add_points(period, user_id, points, when)
+    
+    def _ensure_leaderboard_loaded(self, period: str):
+        """Load a period's rollup into memory if it is missing or older than the TTL"""
+        loaded_at = self.leaderboard_index.loaded_at(period)
+        if loaded_at and (self.leaderboard_ttl <= 0 or time.time() - loaded_at < self.leaderboard_ttl):
+            return
+        
+        with self._leaderboard_load_lock:
+            loaded_at = self.leaderboard_index.loaded_at(period)
+            if loaded_at and (self.leaderboard_ttl <= 0 or time.time() - loaded_at < self.leaderboard_ttl):
+                return
+            
+            # First use on a database that predates the rollups
+            if self.leaderboard.estimated_document_count() == 0 and \
+                    self.users.find_one({'total_points': {'$gt': 0}}, {'_id': 1}):
+                self.rebuild_leaderboard()
+            
+            started = time.time()
+            rows = self.leaderboard.find(
+                {'period': period},
+                {'_id': 0, 'user_id': 1, 'points': 1, 'last_points_at': 1}
+            )
+            self.leaderboard_index.load(period, rows, loaded_at=started)
+    
+    def ping(self) -> bool:
+        """Round trip to the server; raises if MongoDB is unreachable"""
+        self.client.admin.command('ping')
+        return True
     
     def get_platform_stats(self) -> Dict[str, Any]:
-        """Get overall platform statistics"""
-        return {
+        """Get overall platform statistics from the rollup document"""
+        snapshot = self.platform_stats.find_one({'_id': 'platform'})
+        if snapshot is None or 'reconciled_at' not in snapshot:
+            snapshot = self.reconcile_platform_stats()
+        
+        return {field: snapshot.get(field, 0) for field in PLATFORM_STAT_FIELDS}
+    
+    def reconcile_platform_stats(self) -> Dict[str, Any]:
+        """
+        Recount every platform counter from the source collections
+        
+        The counters are maintained incrementally; this corrects any drift
+        (e.g. documents written outside DatabaseManager).
+        """
+        counts = {
             'total_users': self.users.count_documents({}),
             'total_campaigns': self.campaigns.count_documents({}),
             'active_campaigns': self.campaigns.count_documents({'status': 'active'}),
@@ -208,26 +725,130 @@ class DatabaseManager:
             'total_solves': self.progress.count_documents({'solved': True}),
             'total_flags_submitted': self.submissions.count_documents({}),
         }
+        
+        now = datetime.utcnow()
+        self.platform_stats.update_one(
+            {'_id': 'platform'},
+            {'$set': dict(counts, reconciled_at=now, updated_at=now)},
+            upsert=True
+        )
+        return counts
+    
+    def _bump_stats(self, increments: Dict[str, int]):
+        """Apply counter deltas to the platform stats rollup"""
+        self.platform_stats.update_one(
+            {'_id': 'platform'},
+            {'$inc': increments, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
     
     def get_machine_stats(self, machine_id: str) -> Dict[str, Any]:
-        """Get statistics for a specific machine"""
-        total_attempts = self.progress.count_documents({'machine_id': machine_id})
-        unique_solvers = self.progress.count_documents({'machine_id': machine_id, 'solved': True})
+        """Get statistics for a specific machine (computed server-side)"""
+        facets = list(self.progress.aggregate([
+            {'$match': {'machine_id': machine_id}},
+            {'$facet': {
+                'totals': [
+                    {'$group': {
+                        '_id': None,
+                        'players': {'$sum': 1},
+                        'submissions': {'$sum': {'$ifNull': ['$attempts', 0]}},
+                        'solvers': {'$sum': {'$cond': ['$solved', 1, 0]}},
+                    }}
+                ],
+                'solve_times': [
+                    {'$match': {'solved': True, 'solve_time': {'$type': 'number'}}},
+                    {'$sort': {'solve_time': 1}},
+                    {'$group': {
+                        '_id': None,
+                        'average': {'$avg': '$solve_time'},
+                        'percentiles': {'$percentile': {
+                            'input': '$solve_time', 'p': [0.5, 0.9], 'method': 'approximate'
+                        }},
+                        'fastest': {'$first': {'user_id': '$user_id', 'solve_time': '$solve_time'}},
+                    }}
+                ],
+            }}
+        ]))[0]
+        
+        totals = facets['totals'][0] if facets['totals'] else {'players': 0, 'submissions': 0, 'solvers': 0}
+        times = facets['solve_times'][0] if facets['solve_times'] else None
         
-        # Calculate average solve time
-        solved_progress = list(self.progress.find({'machine_id': machine_id, 'solved': True}))
-        avg_solve_time = None
-        if solved_progress:
-            total_time = sum(p.get('solve_time', 0) for p in solved_progress)
-            avg_solve_time = total_time / len(solved_progress) if len(solved_progress) > 0 else None
+        hints = next(self.hints.aggregate([
+            {'$match': {'machine_id': machine_id}},
+            {'$group': {'_id': '$user_id', 'hints': {'$sum': 1}}},
+            {'$group': {'_id': None, 'hints_used': {'$sum': '$hints'}, 'users_with_hints': {'$sum': 1}}}
+        ]), {'hints_used': 0, 'users_with_hints': 0})
         
         return {
             'machine_id': machine_id,
-            'total_attempts': total_attempts,
-            'unique_solvers': unique_solvers,
-            'average_solve_time': avg_solve_time
+            'total_attempts': totals['players'],
+            'total_submissions': totals['submissions'],
+            'unique_solvers': totals['solvers'],
+            'solve_rate': round(totals['solvers'] / totals['players'], 4) if totals['players'] else None,
+            'average_solve_time': times['average'] if times else None,
+            'median_solve_time': times['percentiles'][0] if times else None,
+            'p90_solve_time': times['percentiles'][1] if times else None,
+            'fastest_solve': times['fastest'] if times else None,
+            'hint_usage': {
+                'hints_used': hints['hints_used'],
+                'users_with_hints': hints['users_with_hints'],
+            }
         }
     
+    def get_solve_rates(self, blueprint_id: str = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Solve rate per variant and per difficulty
+        
+        Progress rows are grouped per machine first, then joined to the machine
+        registry for variant/difficulty, so the join runs once per machine.
+        """
+        pipeline = [
+            {'$group': {
+                '_id': '$machine_id',
+                'players': {'$sum': 1},
+                'solvers': {'$sum': {'$cond': ['$solved', 1, 0]}},
+                'solve_time': {'$avg': {'$cond': ['$solved', '$solve_time', None]}},
+            }},
+            {'$lookup': {
+                'from': self.machines.name,
+                'localField': '_id',
+                'foreignField': 'machine_id',
+                'pipeline': [{'$project': {'_id': 0, 'variant': 1, 'difficulty': 1, 'blueprint_id': 1}}],
+                'as': 'machine'
+            }},
+            {'$unwind': '$machine'},
+        ]
+        if blueprint_id:
+            pipeline.append({'$match': {'machine.blueprint_id': blueprint_id}})
+        
+        def breakdown(field: str) -> List[Dict[str, Any]]:
+            return [
+                {'$group': {
+                    '_id': f'$machine.{field}',
+                    'machines': {'$sum': 1},
+                    'players': {'$sum': '$players'},
+                    'solvers': {'$sum': '$solvers'},
+                    'average_solve_time': {'$avg': '$solve_time'},
+                }},
+                {'$project': {
+                    '_id': 0,
+                    field: '$_id',
+                    'machines': 1,
+                    'players': 1,
+                    'solvers': 1,
+                    'average_solve_time': 1,
+                    'solve_rate': {'$round': [{'$divide': ['$solvers', '$players']}, 4]},
+                }},
+                {'$sort': {field: 1}},
+            ]
+        
+        pipeline.append({'$facet': {
+            'by_variant': breakdown('variant'),
+            'by_difficulty': breakdown('difficulty'),
+        }})
+        
+        return list(self.progress.aggregate(pipeline))[0]
+    
     def search_campaigns(self, user_id: str, search_term: str) -> List[Dict[str, Any]]:
         """Search user's campaigns by name"""
         query = {
@@ -237,31 +858,105 @@ class DatabaseManager:
         return list(self.campaigns.find(query).sort('created_at', -1))
     
     def get_campaign_statistics(self, campaign_id: str) -> Dict[str, Any]:
-        """Get detailed statistics for a campaign"""
-        campaign = self.get_campaign(campaign_id)
-        if not campaign:
-            return None
+        """Get detailed statistics for a campaign (one aggregation round trip)"""
+        results = list(self.campaigns.aggregate([
+            {'$match': {'campaign_id': campaign_id}},
+            {'$lookup': {
+                'from': self.progress.name,
+                'localField': 'campaign_id',
+                'foreignField': 'campaign_id',
+                'let': {'owner': '$user_id'},
+                'pipeline': [
+                    {'$match': {'$expr': {'$eq': ['$user_id', '$$owner']}}},
+                    {'$group': {
+                        '_id': None,
+                        'total_attempts': {'$sum': {'$ifNull': ['$attempts', 0]}},
+                        'solved_machines': {'$sum': {'$cond': ['$solved', 1, 0]}},
+                        'total_points': {'$sum': {'$ifNull': ['$points_earned', 0]}},
+                        'fastest_solve_time': {'$min': {'$cond': ['$solved', '$solve_time', None]}},
+                        'median_solve_time': {'$median': {
+                            'input': {'$cond': ['$solved', '$solve_time', None]},
+                            'method': 'approximate'
+                        }},
+                    }}
+                ],
+                'as': 'progress'
+            }},
+            {'$project': {
+                '_id': 0,
+                'campaign_id': 1,
+                'campaign_name': {'$ifNull': ['$campaign_name', 'Unknown']},
+                'machine_count': 1,
+                'status': {'$ifNull': ['$status', 'active']},
+                'created_at': 1,
+                'progress': {'$first': '$progress'},
+            }}
+        ]))
         
-        progress_list = self.get_campaign_progress(campaign['user_id'], campaign_id)
+        if not results:
+            return None
         
-        total_attempts = sum(p.get('attempts', 0) for p in progress_list)
-        solved_count = sum(1 for p in progress_list if p.get('solved', False))
-        total_points = sum(p.get('points_earned', 0) for p in progress_list)
+        campaign = results[0]
+        progress = campaign.get('progress') or {}
+        machine_count = campaign['machine_count']
+        solved_count = progress.get('solved_machines', 0)
         
         return {
             'campaign_id': campaign_id,
-            'campaign_name': campaign.get('campaign_name', 'Unknown'),
-            'total_machines': campaign['machine_count'],
+            'campaign_name': campaign['campaign_name'],
+            'total_machines': machine_count,
             'solved_machines': solved_count,
-            'total_attempts': total_attempts,
-            'total_points': total_points,
-            'completion_percentage': (solved_count / campaign['machine_count'] * 100) if campaign['machine_count'] > 0 else 0,
-            'status': campaign.get('status', 'active'),
+            'total_attempts': progress.get('total_attempts', 0),
+            'total_points': progress.get('total_points', 0),
+            'fastest_solve_time': progress.get('fastest_solve_time'),
+            'median_solve_time': progress.get('median_solve_time'),
+            'completion_percentage': (solved_count / machine_count * 100) if machine_count > 0 else 0,
+            'status': campaign['status'],
             'created_at': campaign.get('created_at')
         }
 
 
+class AsyncDatabaseManager:
+    """
+    Asyncio facade over DatabaseManager
+    
+    Exposes every public DatabaseManager method as a coroutine with the same
+    signature. Calls run on a dedicated thread pool sized to the MongoDB
+    connection pool, so awaiting handlers overlap their round trips instead
+    of blocking the event loop.
+    """
+    
+    def __init__(self, manager: DatabaseManager, max_workers: int = None):
+        self.manager = manager
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or manager.max_pool_size,
+            thread_name_prefix="hackforge-db"
+        )
+    
+    async def run(self, func, *args, **kwargs):
+        """Run any blocking database call (e.g. a raw collection query) off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    def __getattr__(self, name: str):
+        attr = getattr(self.manager, name)
+        if name.startswith('_') or not inspect.ismethod(attr):
+            return attr
+        
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
 _db_manager = None
+_async_db_manager = None
 
 def get_db() -> DatabaseManager:
     """Get singleton database manager instance"""
@@ -269,3 +964,10 @@ def get_db() -> DatabaseManager:
     if _db_manager is None:
         _db_manager = DatabaseManager()
     return _db_manager
+
+def get_async_db() -> AsyncDatabaseManager:
+    """Get singleton async facade over the shared database manager"""
+    global _async_db_manager
+    if _async_db_manager is None:
+        _async_db_manager = AsyncDatabaseManager(get_db())
+    return _async_db_manager
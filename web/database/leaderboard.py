@@ -0,0 +1,262 @@
+"""
+Leaderboard Index
+In-memory ranked scores per leaderboard period, updated incrementally on each solve
+"""
+
+import random
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+TIMEFRAMES = ('all_time', 'weekly', 'monthly')
+
+
+def period_key(timeframe: str, when: datetime = None) -> str:
+    """Rollup key for a timeframe, e.g. 'weekly:2026-W42' or 'monthly:2026-10'"""
+    when = when or datetime.utcnow()
+
+    if timeframe == 'all_time':
+        return 'all_time'
+    if timeframe == 'weekly':
+        year, week, _ = when.isocalendar()
+        return f"weekly:{year}-W{week:02d}"
+    if timeframe == 'monthly':
+        return f"monthly:{when.year}-{when.month:02d}"
+
+    raise ValueError(f"Unknown leaderboard timeframe: {timeframe}")
+
+
+def period_keys(when: datetime = None) -> List[str]:
+    """Every rollup key a point award at `when` contributes to"""
+    return [period_key(timeframe, when) for timeframe in TIMEFRAMES]
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next: List[Optional['_Node']] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class IndexableSkipList:
+    """
+    Sorted keys with O(log n) insert, remove and rank, and O(log n + k) slicing
+
+    Each forward link records how many elements it skips, so the position of
+    any key is the sum of the widths walked to reach it.
+    """
+
+    MAX_LEVELS = 32
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVELS)
+        self._levels = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key):
+        chain, positions = self._find(key)
+
+        levels = 1
+        while levels < self.MAX_LEVELS and random.random() < 0.5:
+            levels += 1
+
+        if levels > self._levels:
+            for level in range(self._levels, levels):
+                chain[level] = self._head
+                positions[level] = 0
+                self._head.width[level] = self._size + 1
+            self._levels = levels
+
+        node = _Node(key, levels)
+        position = positions[0] + 1
+        for level in range(levels):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            # Split the link previous -> old successor around the new node
+            node.width[level] = previous.width[level] - (position - positions[level]) + 1
+            previous.width[level] = position - positions[level]
+
+        for level in range(levels, self._levels):
+            chain[level].width[level] += 1
+
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        chain, _ = self._find(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            return False
+
+        for level in range(self._levels):
+            previous = chain[level]
+            if previous.next[level] is node:
+                previous.width[level] += node.width[level] - 1
+                previous.next[level] = node.next[level]
+            else:
+                previous.width[level] -= 1
+
+        self._size -= 1
+        return True
+
+    def count_less(self, key) -> int:
+        """Number of keys strictly smaller than `key`"""
+        _, positions = self._find(key)
+        return positions[0]
+
+    def slice(self, start: int, stop: int) -> List:
+        """Keys at positions [start, stop)"""
+        stop = min(stop, self._size)
+        if start >= stop:
+            return []
+
+        # Walk down to the node just before position `start`
+        node = self._head
+        position = 0
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and position + node.width[level] <= start:
+                position += node.width[level]
+                node = node.next[level]
+
+        keys = []
+        node = node.next[0]
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+    def _find(self, key) -> Tuple[List[_Node], List[int]]:
+        """Rightmost node before `key` on every level, and its position"""
+        chain = [self._head] * self.MAX_LEVELS
+        positions = [0] * self.MAX_LEVELS
+
+        node = self._head
+        position = 0
+        for level in reversed(range(self._levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+
+        return chain, positions
+
+
+class _PeriodScores:
+    """Scores of one rollup period: a ranked skip list plus user -> sort key"""
+
+    __slots__ = ('ranking', 'keys', 'loaded_at')
+
+    def __init__(self):
+        self.ranking = IndexableSkipList()
+        self.keys: Dict[str, Tuple] = {}
+        self.loaded_at = 0.0
+
+
+class LeaderboardIndex:
+    """
+    Ranked scores per rollup period
+
+    Entries are ordered by points (descending), then by who reached them
+    first. Ranks are competition ranks: users with equal points share a rank.
+    """
+
+    def __init__(self):
+        self._periods: Dict[str, _PeriodScores] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, period: str) -> bool:
+        with self._lock:
+            return period in self._periods
+
+    def loaded_at(self, period: str) -> Optional[float]:
+        with self._lock:
+            scores = self._periods.get(period)
+            return scores.loaded_at if scores else None
+
+    def load(self, period: str, rows: Iterable[Dict], loaded_at: float):
+        """Replace a period with rows of {user_id, points, last_points_at}"""
+        scores = _PeriodScores()
+        for row in rows:
+            key = self._sort_key(row['user_id'], row.get('points', 0), row.get('last_points_at'))
+            scores.keys[row['user_id']] = key
+            scores.ranking.insert(key)
+        scores.loaded_at = loaded_at
+
+        with self._lock:
+            self._periods[period] = scores
+            self._drop_stale_periods(period)
+
+    def add_points(self, period: str, user_id: str, points: int, when: datetime):
+        """Apply a point award to a loaded period (unloaded periods are skipped)"""
+        with self._lock:
+            scores = self._periods.get(period)
+            if scores is None:
+                return
+
+            old_key = scores.keys.get(user_id)
+            current = -old_key[0] if old_key else 0
+            if old_key:
+                scores.ranking.remove(old_key)
+
+            key = self._sort_key(user_id, current + points, when)
+            scores.keys[user_id] = key
+            scores.ranking.insert(key)
+
+    def top(self, period: str, limit: int) -> List[Dict]:
+        """Highest scores with competition ranks"""
+        with self._lock:
+            scores = self._periods.get(period)
+            if scores is None:
+                return []
+
+            entries = []
+            for index, key in enumerate(scores.ranking.slice(0, limit)):
+                points = -key[0]
+                if entries and entries[-1]['points'] == points:
+                    rank = entries[-1]['rank']
+                else:
+                    rank = index + 1
+                entries.append({'user_id': key[2], 'points': points, 'rank': rank})
+            return entries
+
+    def rank(self, period: str, user_id: str) -> Optional[int]:
+        """Competition rank of a user, or None if they have no score in the period"""
+        with self._lock:
+            scores = self._periods.get(period)
+            if scores is None or user_id not in scores.keys:
+                return None
+
+            points = -scores.keys[user_id][0]
+            return scores.ranking.count_less((-points,)) + 1
+
+    def rank_of_points(self, period: str, points: int) -> int:
+        """Rank a score of `points` would have in a loaded period"""
+        with self._lock:
+            scores = self._periods.get(period)
+            return (scores.ranking.count_less((-points,)) if scores else 0) + 1
+
+    def points(self, period: str, user_id: str) -> int:
+        with self._lock:
+            scores = self._periods.get(period)
+            key = scores.keys.get(user_id) if scores else None
+            return -key[0] if key else 0
+
+    @staticmethod
+    def _sort_key(user_id: str, points: int, when: Optional[datetime]) -> Tuple:
+        timestamp = when.timestamp() if isinstance(when, datetime) else float(when or 0)
+        return (-points, timestamp, user_id)
+
+    def _drop_stale_periods(self, current: str):
+        """Keep only the newest weekly/monthly period in memory (caller holds the lock)"""
+        prefix = current.split(':', 1)[0]
+        if prefix == 'all_time':
+            return
+        for period in [p for p in self._periods if p.startswith(prefix + ':') and p != current]:
+            del self._periods[period]
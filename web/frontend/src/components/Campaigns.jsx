@@ -340,11 +340,11 @@ const Campaigns = () => {
                           <Target className="w-5 h-5 text-gray-600 group-hover:text-orange-500 transition-colors" />
                         </div>
                         
-                        {machine.port && (
+                        {(machine.url || machine.port) && (
                           <div className="mt-2 p-2 rounded-lg bg-gray-900/50 border border-gray-800">
                             <p className="text-xs text-gray-500 mb-1">Access URL</p>
                             <code className="text-orange-500 text-sm">
-                              http://localhost:{machine.port}
+                              {machine.url || `http://localhost:${machine.port}`}
                             </code>
                           </div>
                         )}
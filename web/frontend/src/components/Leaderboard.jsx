@@ -139,7 +139,7 @@ const Leaderboard = () => {
                   {/* Points */}
                   <div className="text-right">
                     <div className="text-3xl font-bold text-orange-500">
-                      {entry.total_points || 0}
+                      {entry.period_points ?? entry.total_points ?? 0}
                     </div>
                     <p className="text-xs text-gray-400">points</p>
                   </div>
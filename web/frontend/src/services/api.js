@@ -45,7 +45,7 @@ class APIService {
 
   // Campaigns - ENHANCED
   async createCampaign(userId, campaignName, difficulty, count = null) {
-    return this.request('/api/campaigns', {
+    const job = await this.request('/api/campaigns', {
       method: 'POST',
       body: JSON.stringify({
         user_id: userId,
@@ -54,6 +54,33 @@ class APIService {
         count: count
       }),
     });
+
+    // Campaign builds run in the background - wait until every machine is up
+    return this.waitForJobResult(job.job_id);
+  }
+
+  // Build jobs
+  async getJob(jobId) {
+    return this.request(`/api/jobs/${jobId}`);
+  }
+
+  // Resolves once the job finished (its result is set earlier, at the 'saved'
+  // stage, before images are built and machines probed); rejects with the job error
+  async waitForJobResult(jobId, intervalMs = 1000) {
+    while (true) {
+      const job = await this.getJob(jobId);
+
+      if (job.status === 'failed') {
+        // The stage reached before the failure event
+        const stage = job.events?.length > 1 ? job.events[job.events.length - 2].stage : null;
+        throw new Error(`Campaign build failed${stage ? ` after ${stage}` : ''}: ${job.error || 'unknown error'}`);
+      }
+      if (job.status === 'completed') {
+        return { ...job.result, job_id: jobId, build_stage: job.stage };
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
   }
 
   // NEW: Get user's campaigns
@@ -88,6 +115,15 @@ class APIService {
     return this.request(`/api/machines/${machineId}/stats`);
   }
 
+  async getCampaignStats(campaignId) {
+    return this.request(`/api/campaigns/${campaignId}/stats`);
+  }
+
+  async getSolveRates(blueprintId = null) {
+    const query = blueprintId ? `?blueprint_id=${encodeURIComponent(blueprintId)}` : '';
+    return this.request(`/api/stats/solve-rates${query}`);
+  }
+
   // Flags
   async validateFlag(machineId, flag, userId) {
     return this.request('/api/flags/validate', {